@@ -4,9 +4,17 @@ except ImportError:
     pigpio = None
 import time
 import threading
+from SubsystemLog import get_logger
+import Metrics
+import Tracing
+from HardwareEvents import ChangeLog
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
+gpio_log = get_logger("gpio")
+
+read_lateness = Metrics.histogram("beambreak_read_lateness_seconds", "How late beam break reads run relative to read_interval", ("pin",))
+beam_changes = Metrics.counter("beambreak_changes", "Beam break state changes", ("pin",))
 
 class BeamBreak:
     """Class to manage a beam break sensor using pigpio."""
@@ -21,11 +29,16 @@ class BeamBreak:
         self.pi = pi
         self.pin = pin
 
-        self.last_break_time = time.time()
+        self.last_break_time = time.monotonic()
         self.beam_break_memory = beam_break_memory  # 200 ms
         self.read_interval = 0.05  # 50 ms
         self.read_timer = threading.Timer(self.read_interval, self._read_loop)
         self.state = False  # False = beam broken, True = beam not broken
+        self.last_change_ns = time.monotonic_ns()  # time.monotonic_ns() of the last state change
+        self.changes = ChangeLog("beambreak")  # Every state change, for the data file
+        self.next_read = time.monotonic()
+        self.read_lateness = read_lateness.labels(pin)
+        self.beam_changes = beam_changes.labels(pin)
 
         self.pi.set_mode(self.pin, pigpio.INPUT)
         self.pi.set_pull_up_down(self.pin, pigpio.PUD_UP)
@@ -33,26 +46,41 @@ class BeamBreak:
     def _read_loop(self):
         """Internal method to read the beam break state."""
         self.read_timer.cancel()
-        current_time = time.time()
+        current_time = time.monotonic()
+        self.read_lateness.observe(max(current_time - self.next_read, 0.0))
 
         reading = self.pi.read(self.pin)
         if reading == 0: # Beam is broken
             self.last_break_time = current_time
+            if self.state:
+                self.last_change_ns = self.changes.record("broken")
+                self.beam_changes.inc()
+                Tracing.instant("beam broken", "gpio", {"pin": self.pin})
+                gpio_log.debug("Beam broken on pin %s", self.pin)
             self.state = False
         elif current_time - self.last_break_time > self.beam_break_memory:
+            if not self.state:
+                self.last_change_ns = self.changes.record("restored")
+                self.beam_changes.inc()
+                Tracing.instant("beam restored", "gpio", {"pin": self.pin})
+                gpio_log.debug("Beam restored on pin %s", self.pin)
             self.state = True
 
+        self.next_read = time.monotonic() + self.read_interval
         self.read_timer = threading.Timer(self.read_interval, self._read_loop)
+        self.read_timer.name = f"beambreak {self.pin}"
         self.read_timer.start()
 
     def activate(self):
         """Start the beam break sensor reading loop."""
         self.read_timer.cancel()
+        self.next_read = time.monotonic() + self.read_interval
         self.read_timer = threading.Timer(self.read_interval, self._read_loop)
+        self.read_timer.name = f"beambreak {self.pin}"
         self.read_timer.start()
-        logger.debug("BeamBreak activated.")
+        gpio_log.debug("BeamBreak activated.")
 
     def deactivate(self):
         """Stop the beam break sensor reading loop."""
         self.read_timer.cancel()
-        logger.debug("BeamBreak deactivated.")
\ No newline at end of file
+        gpio_log.debug("BeamBreak deactivated.")
\ No newline at end of file
@@ -0,0 +1,334 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+import os
+import sys
+import mmap
+import json
+import struct
+from array import array
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+# File layout (little endian):
+#   MAGIC
+#   chunks, each: CHUNK_HEADER (type, rows, payload bytes) + payload padded to 8 bytes,
+#   so every column starts 8-byte aligned and can be mapped without copying
+#     b"HEAD": JSON session header
+#     b"STRS": JSON list of event names appended to the string table (codes assigned in order)
+#     b"EVTS": `rows` events stored column by column, see COLUMNS, followed by the UTF-8 bytes of
+#              the chunk's string and JSON payloads (addressed by their file offset and size)
+# Chunks are only ever appended, so a crashed session loses at most the unflushed rows.
+# Only event names are interned; payloads are unbounded in number, so they are never tabled.
+MAGIC = b"NC4BLOG2"
+CHUNK_HEADER = struct.Struct("<4sIQ")
+
+# (name, array typecode, numpy dtype) in on-disk order; 8-byte columns first keeps every column aligned
+COLUMNS = (
+    ("t_ns", "q", "<i8"),    # time.monotonic_ns() (or epoch ns for converted legacy files)
+    ("ival", "q", "<i8"),    # integer payload, or file offset of a string/JSON payload's bytes
+    ("fval", "d", "<f8"),    # float payload
+    ("trial", "i", "<i4"),   # number of the most recent StartTrial event, -1 before the first trial
+    ("size", "I", "<u4"),    # bytes of a string/JSON payload
+    ("code", "H", "<u2"),    # event name as a string table code
+    ("kind", "H", "<u2"),    # payload kind, see KIND_*
+)
+
+KIND_NONE = 0
+KIND_INT = 1
+KIND_FLOAT = 2
+KIND_STR = 3   # ival/size locate the UTF-8 payload
+KIND_JSON = 4  # ival/size locate the JSON encoded payload
+BLOB_KINDS = (KIND_STR, KIND_JSON)
+
+TRIAL_START_EVENT = "StartTrial"
+
+def _padding(nbytes):
+    return (-nbytes) % 8
+
+def encode_payload(data, blob: bytearray):
+    """
+    Return the (ival, fval, size, kind) columns for an event payload. String and JSON payloads
+    are appended to blob and ival is their offset in it; the caller rebases it once the blob's
+    position in the file is known.
+    """
+    if isinstance(data, bool) or isinstance(data, int):
+        if -(1 << 63) <= data < (1 << 63):
+            return int(data), 0.0, 0, KIND_INT
+        text, kind = json.dumps(data), KIND_JSON
+    elif isinstance(data, float):
+        return 0, data, 0, KIND_FLOAT
+    elif isinstance(data, str):
+        text, kind = data, KIND_STR
+    elif data is not None:
+        text, kind = json.dumps(data, default=str), KIND_JSON
+    else:
+        return 0, 0.0, 0, KIND_NONE
+    encoded = text.encode("utf-8", errors="surrogatepass")
+    offset = len(blob)
+    blob += encoded
+    return offset, 0.0, len(encoded), kind
+
+def decode_payload(buffer, ival: int, fval: float, size: int, kind: int):
+    """Inverse of encode_payload; buffer holds string/JSON payloads at absolute offset ival."""
+    if kind == KIND_INT:
+        return ival
+    if kind == KIND_FLOAT:
+        return fval
+    if kind in BLOB_KINDS:
+        text = bytes(buffer[ival:ival + size]).decode("utf-8", errors="surrogatepass")
+        return text if kind == KIND_STR else json.loads(text)
+    return None
+
+def encode_columns(columns: dict, blob_rows: array, base: int, pad_columns: bool = False) -> bytes:
+    """
+    Column data in COLUMNS order, to be followed directly by the payload blob. The ival of each
+    row in blob_rows is rebased from an offset in the blob to base + column bytes + that offset,
+    where the payload sits once the data is written at offset base.
+    """
+    nbytes = 0
+    for name, typecode, _ in COLUMNS:
+        column_bytes = len(columns[name]) * array(typecode).itemsize
+        nbytes += column_bytes + (_padding(column_bytes) if pad_columns else 0)
+    ival = columns["ival"]
+    for row in blob_rows:
+        ival[row] += base + nbytes
+    data = bytearray()
+    for name, _, _ in COLUMNS:
+        column = columns[name]
+        if sys.byteorder != "little":
+            column.byteswap()
+        column_bytes = column.tobytes()
+        data += column_bytes
+        if pad_columns:
+            data += b"\0" * _padding(len(column_bytes))
+    return bytes(data)
+
+class BinaryEventLogWriter:
+    """
+    Append-only columnar binary event log, written next to the JSON Lines data file.
+
+    Rows are buffered in array.array columns and appended as one EVTS chunk per flush().
+    Event names go into a string table that is appended as STRS chunks before the events that
+    first use them; string and JSON payloads are stored in the chunk itself, after the columns.
+    """
+    def __init__(self, filepath: str, chunk_rows: int = 4096):
+        self.filepath = filepath
+        self.chunk_rows = chunk_rows
+        self.strings = {}  # event name -> code
+        self.new_strings = []  # event names not yet written to the file
+        self.current_trial = -1
+        self.rows_written = 0
+        self.columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+        self.blob = bytearray()  # string/JSON payloads of the buffered rows
+        self.blob_rows = array("i")  # buffered rows whose ival is an offset into blob
+
+        self.file = open(self.filepath, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def _string_code(self, value: str) -> int:
+        code = self.strings.get(value)
+        if code is None:
+            code = len(self.strings)
+            if code > 0xFFFF:
+                raise OverflowError("Binary event log has more than 65536 distinct event names")
+            self.strings[value] = code
+            self.new_strings.append(value)
+        return code
+
+    def _write_chunk(self, chunk_type: bytes, rows: int, payload: bytes):
+        self.file.write(CHUNK_HEADER.pack(chunk_type, rows, len(payload)))
+        self.file.write(payload)
+        self.file.write(b"\0" * _padding(len(payload)))
+
+    def append(self, record: dict):
+        """Append one event record (or the {"header": ...} record) to the log."""
+        if "header" in record:
+            self._write_chunk(b"HEAD", 0, json.dumps(record["header"]).encode("utf-8"))
+            return
+
+        event = record.get("event")
+        data = record.get("data")
+        if event == TRIAL_START_EVENT and isinstance(data, int) and not isinstance(data, bool):
+            self.current_trial = data
+
+        code = self._string_code(str(event))
+        ival, fval, size, kind = encode_payload(data, self.blob)
+
+        columns = self.columns
+        if kind in BLOB_KINDS:
+            self.blob_rows.append(len(columns["t_ns"]))
+        columns["t_ns"].append(int(record.get("t_ns", 0)))
+        columns["ival"].append(ival)
+        columns["fval"].append(fval)
+        columns["trial"].append(self.current_trial)
+        columns["size"].append(size)
+        columns["code"].append(code)
+        columns["kind"].append(kind)
+
+        if len(columns["t_ns"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Append buffered rows as a chunk and flush the file."""
+        if self.new_strings:
+            self._write_chunk(b"STRS", len(self.new_strings), json.dumps(self.new_strings).encode("utf-8"))
+            self.new_strings = []
+        rows = len(self.columns["t_ns"])
+        if rows:
+            base = self.file.tell() + CHUNK_HEADER.size
+            self._write_chunk(b"EVTS", rows, encode_columns(self.columns, self.blob_rows, base) + self.blob)
+            self.rows_written += rows
+            self.columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+            self.blob = bytearray()
+            self.blob_rows = array("i")
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
+
+class BinaryEventLogReader:
+    """
+    Memory-mapped reader for binary event logs.
+
+    iter_column_chunks() yields zero-copy NumPy views of each chunk's columns straight from
+    the mapped file; iter_chunks() and read() return NumPy structured arrays.
+    """
+    def __init__(self, filepath: str):
+        if np is None:
+            logger.error("numpy is not available; cannot read binary event logs")
+            raise RuntimeError("numpy is not available; cannot read binary event logs")
+
+        self.filepath = filepath
+        self.header = {}
+        self.strings = []
+        self.chunks = []  # (offset of first column, rows)
+
+        self.file = open(self.filepath, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filepath} is not an NC4Touch binary event log (of format {MAGIC.decode()})")
+        self._scan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            try:
+                self.mm.close()
+            except BufferError:
+                pass  # column views are still in use; the map is released when they are
+        self.file.close()
+
+    @property
+    def dtype(self):
+        return np.dtype([(name, dtype) for name, _, dtype in COLUMNS])
+
+    @property
+    def num_rows(self):
+        return sum(rows for _, rows in self.chunks)
+
+    def _scan(self):
+        """Walk the chunk headers, loading the header and string table."""
+        pos = len(MAGIC)
+        end = len(self.mm)
+        while pos + CHUNK_HEADER.size <= end:
+            chunk_type, rows, nbytes = CHUNK_HEADER.unpack_from(self.mm, pos)
+            start = pos + CHUNK_HEADER.size
+            if start + nbytes > end:
+                logger.warning(f"Truncated {chunk_type!r} chunk at offset {pos} in {self.filepath}")
+                break
+            if chunk_type == b"EVTS":
+                self.chunks.append((start, rows))
+            elif chunk_type == b"STRS":
+                self.strings.extend(json.loads(bytes(self.mm[start:start + nbytes])))
+            elif chunk_type == b"HEAD":
+                self.header = json.loads(bytes(self.mm[start:start + nbytes]))
+            else:
+                logger.warning(f"Unknown chunk type {chunk_type!r} at offset {pos} in {self.filepath}")
+            pos = start + nbytes + _padding(nbytes)
+
+    def event_code(self, name: str):
+        """Return the code of an event name, or None if it never occurs."""
+        try:
+            return self.strings.index(name)
+        except ValueError:
+            return None
+
+    def iter_column_chunks(self):
+        """Yield a dict of zero-copy column views for each chunk."""
+        for offset, rows in self.chunks:
+            columns = {}
+            for name, _, dtype in COLUMNS:
+                column_dtype = np.dtype(dtype)
+                columns[name] = np.frombuffer(self.mm, dtype=column_dtype, count=rows, offset=offset)
+                offset += rows * column_dtype.itemsize
+            yield columns
+
+    def iter_chunks(self):
+        """Yield each chunk as a NumPy structured array."""
+        for columns in self.iter_column_chunks():
+            records = np.empty(len(columns["t_ns"]), dtype=self.dtype)
+            for name in records.dtype.names:
+                records[name] = columns[name]
+            yield records
+
+    def read(self):
+        """Return all events as a single NumPy structured array."""
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(chunks)
+
+    def payload(self, row):
+        """Decode the payload of one structured array row back to its Python value."""
+        return decode_payload(self.mm, int(row["ival"]), float(row["fval"]), int(row["size"]), int(row["kind"]))
+
+def convert_json_to_binary(json_path: str, binary_path: str = None) -> str:
+    """
+    Convert a JSON data file (JSON Lines or legacy concatenated JSON) to a binary event log.
+    Legacy "timestamp" strings are stored as wall clock nanoseconds since the epoch.
+    Returns the path of the binary log.
+    """
+    from analysis.DataReader import iter_data_file, legacy_timestamp_ns
+
+    if binary_path is None:
+        binary_path = os.path.splitext(json_path)[0] + ".nc4b"
+    if os.path.exists(binary_path):
+        os.remove(binary_path)
+
+    writer = BinaryEventLogWriter(binary_path)
+    try:
+        for record in iter_data_file(json_path):
+            if "header" not in record and "t_ns" not in record and "timestamp" in record:
+                record = dict(record, t_ns=legacy_timestamp_ns(record["timestamp"]))
+            writer.append(record)
+    finally:
+        writer.close()
+    logger.info(f"Converted {json_path} -> {binary_path} ({writer.rows_written} events)")
+    return binary_path
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert NC4Touch JSON data files to binary event logs.")
+    parser.add_argument("json_files", nargs="+", help="JSON data files to convert")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s:%(levelname)s] %(message)s")
+    for json_file in args.json_files:
+        try:
+            convert_json_to_binary(json_file)
+        except Exception as e:
+            logger.error(f"Error converting {json_file}: {e}")
@@ -2,6 +2,9 @@ try:
     import pigpio
 except ImportError:
     pigpio = None
+import time
+import Tracing
+from HardwareEvents import ChangeLog
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
 
@@ -19,6 +22,9 @@ class Buzzer:
         self.pin = pin
         self.volume = volume
         self.frequency = frequency
+        self.active = False
+        self.last_change_ns = time.monotonic_ns() # time.monotonic_ns() of the last activate/deactivate
+        self.changes = ChangeLog("buzzer") # Every activate/deactivate, for the data file
 
         self.pi.set_mode(self.pin, pigpio.OUTPUT)
         self.pi.set_PWM_dutycycle(self.pin, 0)  
@@ -28,9 +34,29 @@ class Buzzer:
     def activate(self):
         """Activate the buzzer."""
         self.pi.set_PWM_dutycycle(self.pin, self.volume)
+        self.active = True
+        self.last_change_ns = self.changes.record("on")
+        Tracing.instant("buzzer on", "gpio", {"pin": self.pin, "volume": self.volume})
         logger.debug(f"Buzzer activated")
 
+    def set_volume(self, volume: int):
+        """Set the buzzer volume (PWM duty cycle, 0-100)."""
+        self.volume = volume
+        logger.debug(f"Buzzer volume set to {self.volume}")
+
+        if self.active:
+            self.pi.set_PWM_dutycycle(self.pin, self.volume)
+
+    def set_frequency(self, frequency: int):
+        """Set the buzzer PWM frequency."""
+        self.frequency = frequency
+        self.pi.set_PWM_frequency(self.pin, self.frequency)
+        logger.debug(f"Buzzer frequency set to {self.frequency}")
+
     def deactivate(self):
         """Deactivate the buzzer."""
         self.pi.set_PWM_dutycycle(self.pin, 0)
+        self.active = False
+        self.last_change_ns = self.changes.record("off")
+        Tracing.instant("buzzer off", "gpio", {"pin": self.pin})
         logger.debug(f"Buzzer deactivated")
\ No newline at end of file
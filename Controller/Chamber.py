@@ -23,7 +23,10 @@ from BeamBreak import BeamBreak
 from Buzzer import Buzzer
 from M0Device import M0Device, M0Mode
 from Camera import Camera
+from SyncOutput import SyncOutput
+from SyncInput import SyncInput
 from Config import Config
+from HardwareWorker import step
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
@@ -51,25 +54,76 @@ class Chamber:
     # LED colors
     self.config.ensure_param("reward_led_color", [0, 255, 0])
     self.config.ensure_param("punishment_led_color", [255, 0, 0])
+    # TTL sync output, e.g. {"trial_start": [23], "reward_onset": [24]}. Empty disables sync output.
+    self.config.ensure_param("sync_output_pins", {})
+    self.config.ensure_param("sync_pulse_width_us", 1000)
+    self.config.ensure_param("sync_barcode_pin", None)
+    self.config.ensure_param("sync_barcode_bits", 16)
+    self.config.ensure_param("sync_barcode_bit_us", 5000)
+    # TTL sync input from external systems. Empty disables sync input.
+    self.config.ensure_param("sync_input_pins", [])
+    self.config.ensure_param("sync_input_edge", "rising")
+    self.config.ensure_param("sync_input_period", None) # Nominal external pulse period in seconds; estimated (and drift not reported) if None
+    self.config.ensure_param("watch_config", True) # Re-apply edits to the config file without a restart
 
     self.code_dir = os.path.dirname(os.path.abspath(__file__))
 
     self.pi = pigpio.pi() if pigpio is not None else None
 
+    self.sync_output = SyncOutput(pi=self.pi, event_pins=self.config["sync_output_pins"],
+                                  pulse_width_us=self.config["sync_pulse_width_us"],
+                                  barcode_pin=self.config["sync_barcode_pin"],
+                                  barcode_bits=self.config["sync_barcode_bits"],
+                                  barcode_bit_us=self.config["sync_barcode_bit_us"])
+    self.sync_input = SyncInput(pi=self.pi, pins=self.config["sync_input_pins"],
+                                edge=self.config["sync_input_edge"],
+                                period=self.config["sync_input_period"])
+
     # Initialize M0s
     self.m0s = [M0Device(pi = self.pi, id = f"M0_{i}", 
-                         reset_pin = self.config["reset_pins"][i]) for i in range(3)]
+                         reset_pin = self.config["reset_pins"][i],
+                         sync_output = self.sync_output) for i in range(3)]
 
     self.arduino_cli_discover()
 
-    self.reward_led = LED(pi=self.pi, rgb_pins=self.config["reward_LED_pins"], brightness=self.config["reward_led_brightness"], color=self.config["reward_led_color"])
-    self.punishment_led = LED(pi=self.pi, rgb_pins=self.config["punishment_LED_pins"], brightness=self.config["punishment_led_brightness"], color=self.config["punishment_led_color"])
-    self.house_led = LED(pi=self.pi, pin=self.config["house_LED_pin"], brightness=self.config["house_led_brightness"])
+    self.reward_led = LED(pi=self.pi, rgb_pins=self.config["reward_LED_pins"], brightness=self.config["reward_led_brightness"], color=self.config["reward_led_color"], name="reward_led")
+    self.punishment_led = LED(pi=self.pi, rgb_pins=self.config["punishment_LED_pins"], brightness=self.config["punishment_led_brightness"], color=self.config["punishment_led_color"], name="punishment_led")
+    self.house_led = LED(pi=self.pi, pin=self.config["house_LED_pin"], brightness=self.config["house_led_brightness"], name="house_led")
     self.beambreak = BeamBreak(pi=self.pi, pin=self.config["beambreak_pin"], beam_break_memory=self.config["beambreak_memory"])
     self.buzzer = Buzzer(pi=self.pi, pin=self.config["buzzer_pin"], volume=self.config["buzzer_volume"], frequency=self.config["buzzer_frequency"])
-    self.reward = Reward(pi=self.pi, pin=self.config["reward_pump_pin"])
+    self.reward = Reward(pi=self.pi, pin=self.config["reward_pump_pin"], sync_output=self.sync_output)
     self.camera = Camera(device=self.config["camera_device"])
+
+    self.config.subscribe(self.apply_config_changes)
+    if self.config["watch_config"]:
+      self.config.watch()
   
+  def apply_config_changes(self, changed: dict):
+    """Re-apply hardware settings changed in the config file. Pin, device and sync changes need a restart."""
+    setters = {
+      "reward_led_brightness": self.reward_led.set_brightness,
+      "punishment_led_brightness": self.punishment_led.set_brightness,
+      "house_led_brightness": self.house_led.set_brightness,
+      "reward_led_color": self.reward_led.set_color,
+      "punishment_led_color": self.punishment_led.set_color,
+      "buzzer_volume": self.buzzer.set_volume,
+      "buzzer_frequency": self.buzzer.set_frequency,
+      "beambreak_memory": lambda value: setattr(self.beambreak, "beam_break_memory", value),
+    }
+    for key, value in changed.items():
+      if key in setters:
+        setters[key](value)
+        logger.info(f"Applied {key} = {value}")
+      elif key == "watch_config":
+        self.config.watch() if value else self.config.stop_watching()
+      else:
+        logger.warning(f"Config change to {key} takes effect after a restart")
+
+  def hardware_logs(self):
+    """ChangeLogs of the devices whose timestamped changes and serial lines go into the data file."""
+    devices = self.m0s + [self.reward_led, self.punishment_led, self.house_led, self.beambreak, self.buzzer, self.reward]
+    return [device.changes for device in devices]
+
   def get_left_m0(self):
     """Returns the left M0 device (M0_0)"""
     try:
@@ -126,12 +180,14 @@ class Chamber:
       except Exception as e:
           logger.error(f"Error compiling sketch: {e}")
   
-  def arduino_cli_discover(self):
+  def arduino_cli_discover(self, operation=None):
     """
     Uses arduino-cli to discover connected boards.
     Looks for boards with VID: 0x3343 and PID: 0x8244 (DFRobot M0)
+    operation (a HardwareWorker.Operation) receives progress and can cancel between steps.
     """
     # Reset all the M0 boards in order before discovery
+    step(operation, 0.0, "Resetting M0 boards")
     self.m0_reset()
 
     # Poll until all expected boards appear or timeout (boards re-enumerate after reset)
@@ -140,6 +196,7 @@ class Chamber:
     self.discovered_boards = []
     while time.time() < deadline:
         time.sleep(1)
+        step(operation, 0.3 * (1 - (deadline - time.time()) / 10), f"Waiting for boards ({len(self.discovered_boards)}/{len(self.m0s)})")
         self.discovered_boards = []
         try:
             result = subprocess.run([f"~/bin/arduino-cli board list --format json"], capture_output=True, shell=True)
@@ -165,13 +222,15 @@ class Chamber:
     # Opening the port resets the SAMD21 via DTR, which triggers SD init.
     # We loop through lines until we see the ID broadcast or timeout.
     boot_timeout = 15  # seconds — enough for SD init retries
-    for port in self.discovered_boards:
+    for index, port in enumerate(self.discovered_boards):
+        step(operation, 0.3 + 0.7 * index / len(self.discovered_boards), f"Reading boot ID from {port}")
         board_id = None
         try:
             with serial.Serial(port, 115200, timeout=1) as ser:
                 logger.debug(f"Opened {port}, waiting for boot ID (up to {boot_timeout}s)...")
                 deadline = time.time() + boot_timeout
                 while time.time() < deadline:
+                    step(operation)
                     raw = ser.readline()
                     if not raw:
                         continue
@@ -251,14 +310,17 @@ class Chamber:
     """Initialize all M0 boards"""
     [m0.initialize() for m0 in self.m0s]
   
-  def m0_reopen_serial(self):
+  def m0_reopen_serial(self, operation=None):
     """Close and re-open serial connections to all M0 boards"""
+    step(operation, 0.0, "Closing serial ports")
     self.m0_close_serial()
     time.sleep(1)  # Wait a moment to ensure ports are released
+    step(operation, 0.5, "Opening serial ports")
     self.m0_open_serial()
   
-  def m0_close_serial(self):
+  def m0_close_serial(self, operation=None):
     """Close serial connections to all M0 boards"""
+    step(operation, 0.0, "Closing serial ports")
     [m0.stop_serial_comm() for m0 in self.m0s]
     [m0.close_port() for m0 in self.m0s]
   
@@ -267,14 +329,19 @@ class Chamber:
     [m0.open_port() for m0 in self.m0s]
     [m0.start_serial_comm() for m0 in self.m0s]
   
-  def m0_sync_images(self):
+  def m0_sync_images(self, operation=None):
     """Sync the image folders for all M0s"""
-    [m0.sync_image_folder() for m0 in self.m0s]
+    for index, m0 in enumerate(self.m0s):
+      step(operation, index / len(self.m0s), f"Syncing images to {m0.id}")
+      m0.sync_image_folder()
 
-  def m0_upload_sketches(self):
+  def m0_upload_sketches(self, operation=None):
     """Upload sketches to all M0s"""
+    step(operation, 0.0, "Compiling sketch")
     self.compile_sketch()
-    [m0.upload_sketch() for m0 in self.m0s]
+    for index, m0 in enumerate(self.m0s):
+      step(operation, (index + 1) / (len(self.m0s) + 1), f"Uploading sketch to {m0.id}")
+      m0.upload_sketch()
   
   def m0_clear(self):
     """Send the blank command to all M0s"""
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import threading
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+def sample_session(session) -> dict:
+    """Read the displayed state of a session's chamber and trainer as flat {field: value}."""
+    fields = {}
+    chamber = session.chamber
+    for m0 in getattr(chamber, "m0s", []):
+        mode = getattr(m0, "mode", None)
+        fields[f"m0.{m0.id}.port"] = getattr(m0, "port", None)
+        fields[f"m0.{m0.id}.mode"] = mode.name if mode is not None else None
+        fields[f"m0.{m0.id}.firmware"] = getattr(m0, "firmware_version", None)
+
+    fields["reward_led"] = bool(getattr(chamber.reward_led, "active", False))
+    fields["punishment_led"] = bool(getattr(chamber.punishment_led, "active", False))
+    fields["house_led"] = bool(getattr(chamber.house_led, "active", False))
+    fields["house_led_brightness"] = getattr(chamber.house_led, "brightness", None)
+    fields["pump"] = bool(getattr(chamber.reward, "state", False))
+    fields["beam"] = getattr(chamber.beambreak, "state", None)
+
+    trainer = getattr(session, "trainer", None)
+    state = getattr(trainer, "state", None)
+    fields["trainer_state"] = getattr(state, "name", None)
+    fields["session_running"] = getattr(trainer, "data_file", None) is not None  # From start_training to the end of the session
+    fields["trial"] = getattr(trainer, "current_trial", None)
+    fields["summary"] = trainer.get_session_summary() if trainer is not None else None
+    return fields
+
+# Fields sent to fleet dashboards by feed(); a small subset so many chambers stay cheap to watch
+FEED_FIELDS = ("trainer_state", "session_running", "trial", "summary", "operation", "operation_state", "loop_lag_ms")
+
+def is_feed_field(key: str) -> bool:
+    """FEED_FIELDS plus m0.<id>.port and m0.<id>.mode."""
+    return key in FEED_FIELDS or (key.startswith("m0.") and key.endswith((".port", ".mode")))
+
+class ChamberState:
+    """
+    Versioned model of the chamber and trainer state shown by the UI.
+
+    update() compares new values with the current ones; each changed field gets the next
+    version number and subscribers are called once with just the changed fields. Readers
+    that poll instead can ask for changes_since(version).
+    """
+    def __init__(self):
+        self.fields = {}
+        self.versions = {}  # field -> version of its last change
+        self.version = 0
+        self.epoch = os.urandom(4).hex()  # Changes on restart, so remote readers know to start over
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def update(self, fields: dict) -> dict:
+        """Apply new values and publish the ones that changed; returns them."""
+        with self.lock:
+            changed = {key: value for key, value in fields.items()
+                       if key not in self.fields or self.fields[key] != value}
+            if not changed:
+                return changed
+            self.version += 1
+            for key in changed:
+                self.versions[key] = self.version
+            self.fields.update(changed)
+            subscribers = list(self.subscribers)
+            self.changed.notify_all()
+
+        for callback in subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Removing chamber state subscriber {callback} after error: {e}")
+                self.unsubscribe(callback)
+        return changed
+
+    def changes_since(self, version: int):
+        """Return (current version, {field: value} changed after version)."""
+        with self.lock:
+            return self.version, {key: self.fields[key] for key, v in self.versions.items() if v > version}
+
+    def wait_for_changes(self, version: int, timeout: float, epoch: str = None):
+        """
+        Long-poll form of changes_since(): block up to timeout for changes after version.
+        A different epoch (or a version from the future) means the reader saw an earlier
+        run of this process, so it gets every field.
+        """
+        with self.lock:
+            if epoch != self.epoch or version > self.version:
+                version = 0
+            self.changed.wait_for(lambda: self.version > version, timeout)
+            return self.version, {key: self.fields[key] for key, v in self.versions.items() if v > version}
+
+    def feed(self, version: int = 0, epoch: str = None, timeout: float = 10.0, name: str = None) -> bytes:
+        """
+        Compact JSON delta of the feed fields for remote dashboards. Waits (up to timeout) for a
+        feed field to change, so LED or beam flicker doesn't wake idle dashboards.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            version, changes = self.wait_for_changes(version, max(deadline - time.monotonic(), 0.0), epoch)
+            epoch = self.epoch
+            changes = {key: value for key, value in changes.items() if is_feed_field(key)}
+            if changes or time.monotonic() >= deadline:
+                break
+        return json.dumps({"chamber": name, "epoch": self.epoch, "version": version, "changes": changes},
+                          separators=(",", ":"), default=str).encode()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.fields)
+
+    def subscribe(self, callback):
+        with self.lock:
+            if callback not in self.subscribers:
+                self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+class SessionStatePublisher:
+    """
+    Single sampler of a session's state: refresh() reads it once and publishes the changes to a ChamberState.
+    sources are extra callables returning {field: value} that are merged into each sample.
+    """
+    def __init__(self, session, state: ChamberState = None, sources: list = None):
+        self.session = session
+        self.state = state or ChamberState()
+        self.sources = list(sources or [])
+
+    def refresh(self) -> dict:
+        try:
+            fields = sample_session(self.session)
+            for source in self.sources:
+                fields.update(source())
+            return self.state.update(fields)
+        except Exception as e:
+            logger.error(f"Error sampling chamber state: {e}")
+            return {}
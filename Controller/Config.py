@@ -1,17 +1,129 @@
 import os
 import yaml
+import atexit
+import tempfile
+import threading
+from dataclasses import dataclass, make_dataclass
 from os.path import expanduser
-from typing import Any
+from typing import Any, Callable
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+# libyaml's C loader and dumper are much faster when PyYAML was built with them
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+
+DEFAULT_SAVE_DELAY = 0.5  # seconds without changes before the config file is written
+
+DEFAULT_UMASK = 0o022 # Assumed where the process umask can't be read
+
+_new_file_mode = None
+
+def new_file_mode() -> int:
+    """
+    Mode a newly created config file gets (mkstemp always creates 0600): 0666 less the umask.
+    The umask is read from /proc once, when first needed; os.umask() can only read it by
+    changing it for the whole process, which races with other threads creating files.
+    """
+    global _new_file_mode
+    if _new_file_mode is None:
+        umask = DEFAULT_UMASK
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("Umask:"):
+                        umask = int(line.split()[1], 8)
+                        break
+        except (OSError, ValueError):
+            pass
+        _new_file_mode = 0o666 & ~umask
+    return _new_file_mode
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
 
+@dataclass(frozen=True, slots=True)
+class Param:
+    """One typed parameter of a ParamSchema: a cast applied to the raw value, its default and an optional validator."""
+    type: Callable = None
+    default: Any = None
+    validator: Callable = None  # Returns True for valid (cast) values
+    doc: str = ""
+
+class ParamSchema:
+    """
+    A named set of Params compiled once into a frozen, slotted dataclass.
+    build() casts and validates raw config values into an instance of it; a missing value
+    falls back to the (cast) default, and one that cannot be cast or fails validation is
+    logged and replaced by the default.
+    """
+    def __init__(self, name: str, params: dict):
+        self.name = name
+        self.params = dict(params)
+        self.snapshot_class = make_dataclass(name, [(key, Any) for key in self.params], frozen=True, slots=True)
+
+    def extend(self, params: dict):
+        """Return a new schema with params added (or overridden)."""
+        return ParamSchema(self.name, {**self.params, **params})
+
+    def build(self, values: dict):
+        fields = {}
+        for key, param in self.params.items():
+            value = values.get(key)
+            if value is None:
+                value = param.default
+            if value is None:
+                fields[key] = None
+                continue
+            try:
+                value = self._cast(param, value)
+                if param.validator is not None and not param.validator(value):
+                    raise ValueError("failed validation")
+            except Exception as e:
+                logger.warning(f"{self.name}: invalid value {values.get(key)!r} for {key} ({e}); using default {param.default!r}")
+                value = self._cast(param, param.default)
+            fields[key] = value
+        return self.snapshot_class(**fields)
+
+    @staticmethod
+    def _cast(param: Param, value):
+        cast = param.type
+        if value is None or cast is None or (isinstance(cast, type) and isinstance(value, cast)):
+            return value
+        return cast(value)
+
 class Config:
     """
     This class manages the configuration of the session, chamber and trainer
+
+    Changes mark the config dirty and the file is written once changes stop arriving for
+    save_delay seconds (0 writes synchronously on every change). Writes go to a temporary
+    file that is renamed over the config file, so a crash never leaves it truncated.
+    Pending changes are also written by flush() and at interpreter exit.
+
+    version increases on every change; snapshot(schema) returns the typed snapshot for the
+    current version, rebuilding it only after a change.
+
+    watch() follows edits to the config file (watchfiles/inotify, or mtime polling without
+    it): reload() applies the keys whose value changed in the file in one step and passes
+    them to subscribers as {key: new value}. Edits are diffed against the file contents last
+    loaded or written, so the config's own writes never echo back as changes.
     """
-    def __init__(self, config: dict = {}, config_file: str | None = None):
+    def __init__(self, config: dict = {}, config_file: str | None = None, save_delay: float | None = None):
         self.explicit_keys = set()
+        self.save_delay = DEFAULT_SAVE_DELAY if save_delay is None else save_delay
+        self.dirty = False
+        self.lock = threading.RLock()  # guards config, dirty and save_timer
+        self.write_lock = threading.Lock()  # serializes writes so an older snapshot never lands last
+        self.save_timer = None
+        self.version = 0
+        self.snapshots = {}  # ParamSchema -> (version, snapshot)
+        self.file_values = {}  # Contents of the config file as last loaded or written
+        self.subscribers = []
+        self.watch_thread = None
+        self.watch_stop = threading.Event()
         
         if not isinstance(config, dict):
             logger.error("config must be a dictionary")
@@ -30,8 +142,12 @@ class Config:
         return self.config.get(key)
     
     def __setitem__(self, key, value):
-        self.config[key] = value
-        self.explicit_keys.add(key)
+        with self.lock:
+            self.explicit_keys.add(key)
+            if key in self.config and self.config[key] == value:
+                return
+            self.config[key] = value
+            self.version += 1
         logger.debug(f"Config updated: {key} = {value}")
         self.save_config_file()
 
@@ -40,32 +156,130 @@ class Config:
             logger.error("config must be a dictionary")
             return
         
-        self.config.update(config)
-        self.explicit_keys.update(config.keys())
+        with self.lock:
+            self.explicit_keys.update(config.keys())
+            if all(key in self.config and self.config[key] == value for key, value in config.items()):
+                return
+            self.config.update(config)
+            self.version += 1
         logger.debug(f"Config updated: {config}")
         self.save_config_file()
     
+    def _read_file(self, config_file):
+        """Return the file's top-level dictionary, or None if it cannot be read."""
+        try:
+            with open(config_file, "r") as f:
+                loaded_config = yaml.load(f, Loader=YAML_LOADER) or {}
+        except Exception as e:
+            logger.error(f"Error loading config file {config_file}: {e}")
+            return None
+        if not isinstance(loaded_config, dict):
+            logger.error(f"Config file {config_file} must contain a dictionary at the top level.")
+            return None
+        return loaded_config
+
     def update_with_file(self, config_file):
         if os.path.isfile(config_file):
-            try:
-                with open(config_file, "r") as f:
-                    loaded_config = yaml.safe_load(f) or {}
-                    if not isinstance(loaded_config, dict):
-                        logger.error(f"Config file {config_file} must contain a dictionary at the top level.")
-                        loaded_config = {}
+            loaded_config = self._read_file(config_file)
+            if loaded_config is not None:
+                with self.lock:
                     self.config.update(loaded_config)
                     self.explicit_keys.update(loaded_config.keys())
-                    self.config_file = config_file
-                    self.save_config_file()
-            except Exception as e:
-                logger.error(f"Error loading config file {config_file}: {e}")
-                loaded_config = {}
+                    self.file_values = dict(loaded_config)
+                    self.version += 1
+                self.config_file = config_file
         else:
             logger.warning(f"Config file {config_file} does not exist.")
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        """Call callback({key: new value}) after a reload changes any keys."""
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def reload(self) -> dict:
+        """
+        Re-read the config file and apply the keys edited since it was last loaded or written.
+        A file that fails to parse is ignored as a whole. Returns the changed keys.
+        """
+        if not self.config_file or not os.path.isfile(self.config_file):
+            return {}
+        loaded_config = self._read_file(self.config_file)
+        if loaded_config is None:
+            return {}
+
+        with self.lock:
+            edited = {key: value for key, value in loaded_config.items()
+                      if key not in self.file_values or self.file_values[key] != value}
+            self.file_values = dict(loaded_config)
+            changed = {key: value for key, value in edited.items()
+                       if key not in self.config or self.config[key] != value}
+            if changed:
+                self.config.update(changed)
+                self.explicit_keys.update(changed.keys())
+                self.version += 1
+        if not changed:
+            return {}
+
+        logger.info(f"Reloaded {self.config_file}: {changed}")
+        for callback in list(self.subscribers):
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Error in config subscriber {callback}: {e}")
+        return changed
+
+    def watch(self, poll_interval: float = 1.0):
+        """Start reloading the config file whenever it changes, on a daemon thread."""
+        if not self.config_file or (self.watch_thread is not None and self.watch_thread.is_alive()):
+            return
+        self.watch_stop.clear()
+        target = self._watch_events if watchfiles is not None else self._watch_polling
+        self.watch_thread = threading.Thread(target=target, args=(poll_interval,),
+                                             name=f"ConfigWatch-{os.path.basename(self.config_file)}", daemon=True)
+        self.watch_thread.start()
+
+    def stop_watching(self):
+        self.watch_stop.set()
+        if self.watch_thread is not None and self.watch_thread is not threading.current_thread():
+            self.watch_thread.join(timeout=2.0)
+        self.watch_thread = None
+
+    def _watch_events(self, poll_interval):
+        # Watch the directory: atomic saves replace the file, which would end a watch on the file itself
+        path = os.path.abspath(self.config_file)
+        directory = os.path.dirname(path)
+        try:
+            for changes in watchfiles.watch(directory, stop_event=self.watch_stop, debounce=100, step=20,
+                                            watch_filter=lambda change, changed_path: changed_path == path):
+                self.reload()
+        except Exception as e:
+            logger.warning(f"File watching failed for {path} ({e}); polling instead")
+            self._watch_polling(poll_interval)
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.config_file)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def _watch_polling(self, poll_interval):
+        signature = self._file_signature()
+        while not self.watch_stop.wait(poll_interval):
+            current = self._file_signature()
+            if current != signature:
+                signature = current
+                self.reload()
     
     def ensure_param(self, param: str, default_value):
         if param not in self.config:
-            self.config[param] = default_value
+            with self.lock:
+                self.config[param] = default_value
+                self.version += 1
             logger.debug(f"Config parameter {param} not found. Setting to default value: {default_value}")
             self.save_config_file()
         # else:
@@ -73,13 +287,81 @@ class Config:
 
     def has_explicit_param(self, param: str):
         return param in self.explicit_keys
+
+    def snapshot(self, schema: ParamSchema):
+        """Typed, immutable view of the schema's parameters, cached until the config changes."""
+        cached = self.snapshots.get(schema)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        with self.lock:
+            version = self.version
+            snapshot = schema.build(self.config)
+            self.snapshots[schema] = (version, snapshot)
+        return snapshot
         
     def save_config_file(self):
-        if self.config_file:
-            try:
-                with open(self.config_file, "w") as f:
-                    yaml.dump(self.config, f)
-            except Exception as e:
-                logger.error(f"Error saving config file {self.config_file}: {e}")
+        """Mark the config dirty and schedule a write after save_delay seconds."""
+        if not self.config_file:
+            logger.debug("No config file to save to.")
+            return
+        if self.save_delay <= 0:
+            with self.lock:
+                self.dirty = True
+            self.flush()
+            return
+        with self.lock:
+            self.dirty = True
+            self._schedule_save(self.save_delay)
+
+    def _schedule_save(self, delay: float):
+        """(Re)start the save timer and make sure pending changes are written at exit. Call with self.lock held."""
+        if self.save_timer is not None:
+            self.save_timer.cancel()
         else:
-            logger.warning("No config file to save to.")
\ No newline at end of file
+            atexit.register(self.flush)
+        self.save_timer = threading.Timer(delay, self.flush)
+        self.save_timer.daemon = True
+        self.save_timer.start()
+
+    def flush(self):
+        """Write pending changes to the config file now."""
+        with self.write_lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+                atexit.unregister(self.flush)
+            if not self.dirty or not self.config_file:
+                return
+            self.dirty = False
+            snapshot = dict(self.config)
+
+        directory = os.path.dirname(self.config_file) or "."
+        try:
+            try:
+                mode = os.stat(self.config_file).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = new_file_mode()
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(self.config_file))
+            try:
+                with os.fdopen(fd, "w") as f:
+                    os.chmod(f.fileno(), mode)  # Keep the config file's mode across the replace
+                    yaml.dump(snapshot, f, Dumper=YAML_DUMPER)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.config_file)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except Exception as e:
+            with self.lock:
+                # Retry later, and at exit at the latest
+                self.dirty = True
+                self._schedule_save(max(self.save_delay, DEFAULT_SAVE_DELAY))
+            logger.error(f"Error saving config file {self.config_file}: {e}")
+            return
+        with self.lock:
+            self.file_values = snapshot
\ No newline at end of file
@@ -0,0 +1,277 @@
+import io
+import os
+import csv
+import json
+import time
+import queue
+import atexit
+import weakref
+import threading
+import Metrics
+import Tracing
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+_STOP = object()  # sentinel telling the writer thread to drain and exit
+
+events_written = Metrics.counter("events_written", "Event records written to data files", ("writer",))
+bytes_written = Metrics.counter("event_bytes_written", "Bytes written to data files", ("writer",))
+write_errors = Metrics.counter("event_write_errors", "Data file write, sync and encode errors", ("writer",))
+flush_latency = Metrics.histogram("event_flush_seconds", "Time to write and flush one batch", ("writer",))
+fsync_latency = Metrics.histogram("event_fsync_seconds", "Time to fsync a data file", ("writer",))
+_open_writers = weakref.WeakSet()
+
+def _queue_metrics():
+    writers = list(_open_writers)
+    yield "event_queue_depth", "gauge", "Event records waiting for the writer thread", \
+        [({"writer": type(w).__name__, "file": os.path.basename(w.filepath)}, w.queue_depth) for w in writers]
+
+Metrics.add_collector(_queue_metrics)
+
+def total_queue_depth() -> int:
+    """Event records waiting across all open writers."""
+    return sum(w.queue_depth for w in list(_open_writers))
+
+class EventWriter:
+    """
+    Writes event records to a JSON Lines file from a background thread.
+
+    write() only puts the record on a queue.SimpleQueue (a lock-free C queue), so the
+    trainer tick never waits on the data file, which usually lives on a network share.
+    The writer thread encodes records as one JSON object per line, writes them in batches,
+    flushes after every batch and fsyncs at most every fsync_interval seconds. stop() and
+    interpreter exit drain the queue and fsync before the file is closed.
+
+    The file is written unbuffered, so after a failed write exactly the bytes that did not
+    reach the file are kept and retried with the next batch. If they still can't be written
+    after stop_retry seconds of stopping, they are logged as lost and left in pending.
+
+    If binary_log (a BinaryEventLogWriter) is given, every record is also appended to it on
+    the writer thread; its chunks are flushed on the fsync cadence.
+    """
+    def __init__(self, filepath: str, batch_size: int = 256, flush_interval: float = 0.1,
+                 fsync_interval: float = 1.0, binary_log = None, stop_retry: float = 5.0):
+        self.filepath = filepath
+        self.binary_log = binary_log
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # max time a record waits in the queue
+        self.fsync_interval = fsync_interval  # 0 fsyncs after every batch
+        self.stop_retry = stop_retry  # how long stopping keeps retrying unwritten bytes
+
+        self.queue = queue.SimpleQueue()
+        self.file = None
+        self.thread = None
+        self.pending = b""  # encoded bytes that failed to write and will be retried
+
+        # Metrics
+        self.events_written = 0
+        self.bytes_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.max_queue_depth = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.last_fsync_latency = 0.0
+        self.max_fsync_latency = 0.0
+        self.last_fsync_time = 0.0
+        kind = type(self).__name__
+        self.metrics = {"events": events_written.labels(kind), "bytes": bytes_written.labels(kind),
+                        "errors": write_errors.labels(kind), "flush": flush_latency.labels(kind),
+                        "fsync": fsync_latency.labels(kind)}
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    @property
+    def is_open(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def __bool__(self):
+        return self.is_open
+
+    def start(self):
+        """Open the file and start the writer thread."""
+        if self.is_open:
+            logger.warning(f"Event writer for {self.filepath} already started.")
+            return
+        self.file = open(self.filepath, "wb", buffering=0)
+        self.last_fsync_time = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name=f"EventWriter-{os.path.basename(self.filepath)}", daemon=True)
+        self.thread.start()
+        _open_writers.add(self)
+        atexit.register(self.stop)
+
+    def write(self, record: dict):
+        """Queue a record for writing. Safe to call from any thread."""
+        self.queue.put(record)
+
+    def stop(self, timeout: float = 10.0):
+        """Drain the queue, fsync and close the file."""
+        atexit.unregister(self.stop)
+        if not self.is_open:
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.error(f"Event writer for {self.filepath} did not stop within {timeout}s; "
+                         f"{self.queue_depth} events not written.")
+            return
+        self.thread = None
+        _open_writers.discard(self)
+
+    def get_metrics(self):
+        """Return a snapshot of the writer metrics."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "events_written": self.events_written,
+            "bytes_written": self.bytes_written,
+            "batches_written": self.batches_written,
+            "write_errors": self.write_errors,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "last_fsync_latency": self.last_fsync_latency,
+            "max_fsync_latency": self.max_fsync_latency,
+        }
+
+    def _run(self):
+        """Writer thread: collect batches from the queue and write them."""
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+                depth = self.queue.qsize() + 1
+                if depth > self.max_queue_depth:
+                    self.max_queue_depth = depth
+                while True:
+                    if record is _STOP:
+                        stopping = True
+                        break
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        break
+                    record = self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            if batch or self.pending:
+                self._write_batch(batch, force_fsync=stopping)
+            elif stopping:
+                self._fsync()
+
+        # The share may still be down: keep retrying what is left for a while before giving up
+        deadline = time.monotonic() + self.stop_retry
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(self.flush_interval)
+            self._write_batch([], force_fsync=True)
+        if self.pending:
+            logger.error(f"{len(self.pending)} bytes of events could not be written to {self.filepath} and are lost")
+
+        try:
+            self.file.close()
+        except Exception as e:
+            logger.error(f"Error closing data file {self.filepath}: {e}")
+        self.file = None
+
+        if self.binary_log is not None:
+            try:
+                self.binary_log.close()
+            except Exception as e:
+                logger.error(f"Error closing binary event log {self.binary_log.filepath}: {e}")
+
+    def _encode(self, record):
+        try:
+            return json.dumps(record) + "\n"
+        except (TypeError, ValueError) as e:
+            logger.error(f"Could not encode event {record!r}: {e}")
+            return json.dumps(record, default=str) + "\n"
+
+    def _write_batch(self, batch, force_fsync=False):
+        if self.binary_log is not None:
+            for record in batch:
+                try:
+                    self.binary_log.append(record)
+                except Exception as e:  # Skip only this record; the rest of the batch still goes in
+                    self.write_errors += 1
+                    self.metrics["errors"].inc()
+                    logger.error(f"Error writing to binary event log {self.binary_log.filepath}: {e}")
+
+        data = self.pending + "".join(self._encode(record) for record in batch).encode("utf-8")
+        start = time.monotonic()
+        written = 0
+        try:
+            while written < len(data):
+                written += self.file.write(data[written:]) or 0
+        except Exception as e:
+            # Keep only what did not reach the file and retry it with the next batch, e.g. while the network share recovers
+            self.write_errors += 1
+            self.metrics["errors"].inc()
+            self.pending = data[written:]
+            self.bytes_written += written
+            self.metrics["bytes"].inc(written)
+            logger.error(f"Error writing to data file {self.filepath}: {e}")
+            return
+        self.pending = b""
+        end = time.monotonic()
+        latency = end - start
+        Tracing.complete("flush", "data", int(start * 1e9), int(end * 1e9), {"events": len(batch), "bytes": len(data)})
+        self.last_flush_latency = latency
+        if latency > self.max_flush_latency:
+            self.max_flush_latency = latency
+        self.events_written += len(batch)
+        self.bytes_written += written
+        self.batches_written += 1
+        self.metrics["flush"].observe(latency)
+        self.metrics["events"].inc(len(batch))
+        self.metrics["bytes"].inc(written)
+
+        if force_fsync or time.monotonic() - self.last_fsync_time >= self.fsync_interval:
+            self._fsync()
+
+    def _fsync(self):
+        start = time.monotonic()
+        try:
+            if self.binary_log is not None:
+                self.binary_log.flush()
+            os.fsync(self.file.fileno())
+        except Exception as e:
+            self.write_errors += 1
+            self.metrics["errors"].inc()
+            logger.error(f"Error syncing data file {self.filepath}: {e}")
+        self.last_fsync_time = time.monotonic()
+        latency = self.last_fsync_time - start
+        Tracing.complete("fsync", "data", int(start * 1e9), int(self.last_fsync_time * 1e9))
+        self.metrics["fsync"].observe(latency)
+        self.last_fsync_latency = latency
+        if latency > self.max_fsync_latency:
+            self.max_fsync_latency = latency
+
+class CsvRowWriter(EventWriter):
+    """
+    EventWriter that writes dict rows as CSV lines under a header row, for compact sidecars
+    such as the per-trial summary. Keys not in fieldnames are ignored.
+    """
+    def __init__(self, filepath: str, fieldnames: list, **kwargs):
+        super().__init__(filepath, **kwargs)
+        self.fieldnames = list(fieldnames)
+        self.buffer = io.StringIO()
+        self.csv_writer = csv.DictWriter(self.buffer, fieldnames=self.fieldnames, extrasaction="ignore", lineterminator="\n")
+
+    def start(self):
+        if not self.is_open:
+            self.csv_writer.writeheader()
+            self.pending = self._take_buffer().encode("utf-8")  # written by the writer thread with the first batch
+        super().start()
+
+    def _take_buffer(self):
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+
+    def _encode(self, record):
+        self.csv_writer.writerow(record)
+        return self._take_buffer()
@@ -0,0 +1,236 @@
+# Fleet dashboard: one page showing every chamber's trainer, trial, link health and alarms
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from nicegui import ui
+except ImportError:
+    ui = None
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+DEFAULT_PORT = 8081 # Chamber WebUI port
+POLL_TIMEOUT = 10.0 # Longest a chamber holds a /api/state request open
+OFFLINE_AFTER = 2 * POLL_TIMEOUT # Seconds without a response before a link counts as offline
+LOOP_LAG_ALARM_MS = 250 # Chamber UI event loop lag worth flagging
+STALL_ALARM = 600.0 # Seconds a running session may stay on one trial
+UI_UPDATE_INTERVAL = 0.5 # Seconds between dashboard refreshes; only changed chambers are redrawn
+
+class ChamberLink:
+    """
+    Follows one chamber's /api/state feed with long-polls: each request returns only the
+    fields changed since the last version seen, or waits until something changes.
+    """
+    def __init__(self, host: str, port: int = DEFAULT_PORT, poll_timeout: float = POLL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.poll_timeout = poll_timeout
+        self.name = None
+        self.fields = {} # Replaced, never mutated, so the UI can read it without a lock
+        self.epoch = None
+        self.version = 0
+        self.revision = 0 # Local change counter, bumped on every received delta or link change
+        self.connected = False
+        self.error = None
+        self.last_seen = None
+        self.trial_changed = time.monotonic()
+        self.bytes_received = 0
+        self.responses = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/state"
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name=f"ChamberLink-{self.host}", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        failures = 0
+        while not self.stop_event.is_set():
+            try:
+                self.poll()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if self.connected or self.error is None:
+                    logger.warning(f"Lost link to {self.name or self.host}: {e}")
+                    self.revision += 1
+                self.connected = False
+                self.error = str(e)
+                self.stop_event.wait(min(2 ** failures, 30))
+
+    def poll(self, timeout: float = None):
+        """One feed request; applies and returns the changed fields."""
+        timeout = self.poll_timeout if timeout is None else timeout
+        query = f"since={self.version}&timeout={timeout}" + (f"&epoch={self.epoch}" if self.epoch else "")
+        with urllib.request.urlopen(f"{self.url}?{query}", timeout=timeout + 5) as response:
+            body = response.read()
+        feed = json.loads(body)
+        self.bytes_received += len(body)
+        self.responses += 1
+        self.last_seen = time.monotonic()
+        fields = self.fields if feed["epoch"] == self.epoch else {} # After a restart the response has the full state
+        self.name = feed.get("chamber") or self.name
+        self.epoch = feed["epoch"]
+        self.version = feed["version"]
+        changes = feed["changes"]
+        if "trial" in changes or "session_running" in changes:
+            self.trial_changed = self.last_seen
+        self.fields = {**fields, **changes}
+        if changes or not self.connected:
+            if not self.connected:
+                logger.info(f"Connected to {self.name or self.host}")
+            self.connected = True
+            self.error = None
+            self.revision += 1
+        return changes
+
+    def online(self, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self.connected and self.last_seen is not None and now - self.last_seen < OFFLINE_AFTER
+
+    def alarms(self, now: float = None) -> list:
+        """Conditions an operator should look at, as short strings."""
+        now = time.monotonic() if now is None else now
+        if not self.online(now):
+            return [f"offline: {self.error}" if self.error else "offline"]
+        alarms = []
+        for key, value in sorted(self.fields.items()):
+            if key.startswith("m0.") and key.endswith(".port") and value is None:
+                alarms.append(f"{key.split('.')[1]} not connected")
+        if (self.fields.get("loop_lag_ms") or 0) >= LOOP_LAG_ALARM_MS:
+            alarms.append(f"UI loop lag {self.fields['loop_lag_ms']} ms")
+        if self.fields.get("operation_state") == "failed":
+            alarms.append(f"{self.fields.get('operation')} failed")
+        # Only while a session runs: a loaded trainer sits in IDLE (or END_TRAINING) indefinitely
+        if self.fields.get("session_running") and now - self.trial_changed > STALL_ALARM:
+            alarms.append(f"no new trial for {(now - self.trial_changed) / 60:.0f} min")
+        return alarms
+
+def parse_host(entry: str, port: int = DEFAULT_PORT):
+    """'host' or 'host:port' -> (host, port)."""
+    host, _, entry_port = entry.partition(":")
+    return host, int(entry_port) if entry_port else port
+
+def scan(prefix: str, first: int, last: int, port: int = DEFAULT_PORT, timeout: float = 1.0) -> list:
+    """Probe prefix.first .. prefix.last for chamber feeds; returns the hosts that answered."""
+    def probe(host):
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}/api/state?timeout=0", timeout=timeout) as response:
+                return host if "epoch" in json.loads(response.read()) else None
+        except Exception:
+            return None
+
+    hosts = [f"{prefix}.{octet}" for octet in range(first, last + 1)]
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        found = [host for host in executor.map(probe, hosts) if host is not None]
+    logger.info(f"Found {len(found)} chamber(s) in {prefix}.{first}-{last}: {found}")
+    return found
+
+class Fleet:
+    """The set of ChamberLinks the dashboard follows."""
+    def __init__(self, hosts: list = (), port: int = DEFAULT_PORT, poll_timeout: float = POLL_TIMEOUT):
+        self.links = []
+        for entry in hosts:
+            self.add(*parse_host(entry, port), poll_timeout=poll_timeout)
+
+    def add(self, host: str, port: int = DEFAULT_PORT, poll_timeout: float = POLL_TIMEOUT) -> ChamberLink:
+        link = ChamberLink(host, port, poll_timeout)
+        self.links.append(link)
+        return link
+
+    def start(self):
+        [link.start() for link in self.links]
+
+    def stop(self):
+        [link.stop() for link in self.links]
+
+    @property
+    def bytes_received(self) -> int:
+        return sum(link.bytes_received for link in self.links)
+
+class FleetDashboard:
+    """NiceGUI page with one card per chamber, redrawn only when that chamber's feed or alarms change."""
+    def __init__(self, fleet: Fleet):
+        self.fleet = fleet
+        self.fleet.start()
+
+    def init_ui(self):
+        ui.label("Chamber Fleet").style('font-size: 24px; font-weight: bold; text-align: center; margin-top: 20px;')
+        cards = []
+        with ui.row():
+            for link in self.fleet.links:
+                with ui.card().style('width: 320px;'):
+                    elements = {
+                        "name": ui.label(link.host).style('font-size: 18px; font-weight: bold;'),
+                        "link": ui.label("Link: connecting"),
+                        "state": ui.label("State: -"),
+                        "trial": ui.label("Trial: -"),
+                        "m0s": ui.label("M0: -"),
+                        "alarms": ui.label("").style('color: red;'),
+                    }
+                cards.append((link, elements, {"revision": None, "alarms": None, "online": None}))
+
+        def refresh():
+            now = time.monotonic()
+            for link, elements, shown in cards:
+                alarms = link.alarms(now)
+                online = link.online(now)
+                if (link.revision, alarms, online) == (shown["revision"], shown["alarms"], shown["online"]):
+                    continue
+                shown.update(revision=link.revision, alarms=alarms, online=online)
+                self.render(link, elements, alarms, online)
+
+        refresh()
+        ui.timer(UI_UPDATE_INTERVAL, refresh)
+
+    def render(self, link, elements, alarms, online):
+        fields = link.fields
+        elements["name"].set_text(f"{link.name or link.host} ({link.host})")
+        elements["link"].set_text("Link: online" if online else "Link: offline")
+        elements["state"].set_text(f"State: {fields.get('trainer_state') or 'idle'}")
+        summary = fields.get("summary") or {}
+        accuracy = f"{100 * summary['accuracy']:.0f}%" if summary.get("accuracy") is not None else "-"
+        elements["trial"].set_text(f"Trial: {fields.get('trial') if fields.get('trial') is not None else '-'}  "
+                                   f"Accuracy: {accuracy}")
+        modes = [f"{key.split('.')[1]}: {value or '-'}" for key, value in sorted(fields.items())
+                 if key.startswith("m0.") and key.endswith(".mode")]
+        elements["m0s"].set_text("M0 " + ", ".join(modes) if modes else "M0: -")
+        elements["alarms"].set_text("; ".join(alarms))
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard for a fleet of chamber WebUIs.")
+    parser.add_argument("--hosts", nargs="*", default=[], help="Chamber hosts, as host or host:port")
+    parser.add_argument("--scan", help="Address range to probe, e.g. 192.168.1.11-40")
+    parser.add_argument("--chamber-port", type=int, default=DEFAULT_PORT, help="Chamber WebUI port")
+    parser.add_argument("--port", type=int, default=8090, help="Dashboard port")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s:%(name)s] %(message)s')
+
+    hosts = list(args.hosts)
+    if args.scan:
+        address, _, last = args.scan.rpartition("-")
+        prefix, _, first = address.rpartition(".")
+        hosts += [h for h in scan(prefix, int(first), int(last), args.chamber_port) if h not in hosts]
+    if not hosts:
+        parser.error("No chambers given or found; use --hosts or --scan")
+
+    dashboard = FleetDashboard(Fleet(hosts, args.chamber_port))
+    ui.page("/")(dashboard.init_ui)
+    ui.run(port=args.port, title="Chamber Fleet", show=False, reload=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 10000 # Changes kept per device between drains; older ones are dropped
+
+class ChangeLog:
+    """
+    Bounded log of one device's state changes (and serial lines) as (t_ns, state) pairs,
+    stamped with time.monotonic_ns() when they happen.
+
+    A device's last_*_ns attribute only holds the latest change, so changes between two
+    trainer ticks were lost; these are kept until Trainer.write_event() drains them into
+    the data file as HardwareEvent records. deque appends and pops are atomic, so
+    devices record from their own threads without a lock.
+    """
+    __slots__ = ("device", "entries")
+
+    def __init__(self, device: str, capacity: int = DEFAULT_CAPACITY):
+        self.device = device
+        self.entries = deque(maxlen=capacity)
+
+    def record(self, state, t_ns: int = None) -> int:
+        """Record a change; returns its t_ns."""
+        t_ns = time.monotonic_ns() if t_ns is None else t_ns
+        self.entries.append((t_ns, state))
+        return t_ns
+
+    def drain(self) -> list:
+        """Remove and return the recorded changes, oldest first."""
+        entries = []
+        try:
+            while True:
+                entries.append(self.entries.popleft())
+        except IndexError:
+            return entries
+
+def drain_all(logs) -> list:
+    """Drain several ChangeLogs into {"t_ns", "device", "state"} dicts in time order."""
+    changes = [{"t_ns": t_ns, "device": log.device, "state": state} for log in logs for t_ns, state in log.drain()]
+    changes.sort(key=lambda change: change["t_ns"])
+    return changes
@@ -0,0 +1,171 @@
+import time
+import asyncio
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import Metrics
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+operation_duration = Metrics.histogram("hardware_operation_seconds", "Duration of hardware worker operations", ("operation", "state"),
+                                       buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+loop_lag = Metrics.histogram("ui_loop_lag_seconds", "How late the UI event loop wakes from a short sleep")
+
+class OperationCancelled(Exception):
+    """Raised inside an operation at its next progress report after cancel() was requested."""
+
+class Operation:
+    """A blocking hardware operation submitted to a HardwareWorker, with progress and cancellation."""
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "queued"  # queued, running, done, failed or cancelled
+        self.progress = 0.0
+        self.message = ""
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.cancel_requested = threading.Event()
+
+    def step(self, progress: float = None, message: str = None):
+        """Report progress from inside the operation; raises OperationCancelled if cancellation was requested."""
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+            logger.debug(f"{self.name}: {message}")
+        if self.cancel_requested.is_set():
+            raise OperationCancelled(f"{self.name} cancelled")
+
+    def cancel(self):
+        """Request cancellation; takes effect at the operation's next step()."""
+        self.cancel_requested.set()
+
+    @property
+    def active(self) -> bool:
+        return self.state in ("queued", "running")
+
+def step(operation, progress: float = None, message: str = None):
+    """Report progress to operation if there is one; for functions that also run without a worker."""
+    if operation is not None:
+        operation.step(progress, message)
+
+class HardwareWorker:
+    """
+    Runs blocking chamber operations (discovery, uploads, image sync, serial reopen) on one
+    dedicated thread, off the UI event loop. Only one operation runs at a time: submit()
+    refuses a new one while another is active, since they all drive the same M0 boards.
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="HardwareWorker")
+        self.lock = threading.Lock()
+        self.current = None  # The most recent Operation
+        self.history = []  # Finished operations, newest last
+
+    @property
+    def busy(self) -> bool:
+        current = self.current
+        return current is not None and current.active
+
+    def submit(self, name: str, fn, *args, **kwargs):
+        """
+        Run fn(*args, operation=<Operation>, **kwargs) on the worker thread.
+        Returns the Operation, or None if another operation is still active.
+        """
+        with self.lock:
+            if self.busy:
+                logger.warning(f"Cannot start {name}: {self.current.name} is still running")
+                return None
+            operation = Operation(name)
+            self.current = operation
+            operation.future = self.executor.submit(self._run, operation, fn, args, kwargs)
+        return operation
+
+    def _run(self, operation, fn, args, kwargs):
+        operation.state = "running"
+        operation.started = time.monotonic()
+        logger.info(f"Started {operation.name}")
+        try:
+            result = fn(*args, operation=operation, **kwargs)
+            operation.state = "done"
+            operation.progress = 1.0
+            return result
+        except OperationCancelled:
+            operation.state = "cancelled"
+            raise
+        except Exception as e:
+            operation.state = "failed"
+            operation.error = e
+            logger.error(f"{operation.name} failed: {e}")
+            raise
+        finally:
+            operation.finished = time.monotonic()
+            operation_duration.labels(operation.name, operation.state).observe(operation.finished - operation.started)
+            logger.info(f"{operation.name} {operation.state} after {operation.finished - operation.started:.1f}s")
+            self.history = (self.history + [operation])[-20:]
+
+    def cancel(self):
+        """Request cancellation of the active operation, if any."""
+        current = self.current
+        if current is not None and current.active:
+            current.cancel()
+            logger.info(f"Cancellation requested for {current.name}")
+
+    def status(self) -> dict:
+        """Current operation as displayable fields."""
+        current = self.current
+        if current is None:
+            return {"operation": None, "operation_state": None, "operation_progress": None}
+        return {"operation": current.name, "operation_state": current.state,
+                "operation_progress": f"{100 * current.progress:.0f}% {current.message}".strip()}
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+class LoopLagMonitor:
+    """
+    Measures how late an asyncio event loop wakes up from a short sleep; sustained lag
+    means something is blocking the loop (and every client's UI with it).
+    """
+    def __init__(self, interval: float = 0.1, warn_lag: float = 0.25, window: float = 10.0):
+        self.interval = interval
+        self.warn_lag = warn_lag
+        self.window = window
+        self.last_lag = 0.0
+        self.samples = collections.deque()  # (time, lag) within the last window seconds
+        self.task = None
+
+    def start(self):
+        """Start monitoring the running loop; call from within it (e.g. an app startup hook)."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            lag = max(now - start - self.interval, 0.0)
+            self.last_lag = lag
+            loop_lag.observe(lag)
+            self.samples.append((now, lag))
+            while now - self.samples[0][0] > self.window:
+                self.samples.popleft()
+            if lag > self.warn_lag:
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+    @property
+    def max_lag(self) -> float:
+        return max((lag for _, lag in self.samples), default=0.0)
+
+    def status(self) -> dict:
+        """Worst lag over the window, in 10 ms steps so it only changes when it matters."""
+        return {"loop_lag_ms": int(round(self.max_lag * 100)) * 10}
@@ -2,13 +2,17 @@ try:
     import pigpio
 except ImportError:
     pigpio = None
+import time
+import Tracing
+from HardwareEvents import ChangeLog
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
 
 class LED:
     """Class to control an LED using PWM on a Raspberry Pi."""
     def __init__(self, pi: pigpio.pi = None, pin: int = 21, rgb_pins: list = None, 
-                 frequency: int = 5000, range: int = 255, brightness: int = 140, color: tuple = (255, 255, 255)):
+                 frequency: int = 5000, range: int = 255, brightness: int = 140, color: tuple = (255, 255, 255),
+                 name: str = "LED"):
         if pi is None and pigpio is not None:
             pi = pigpio.pi()
         if pigpio is not None and not isinstance(pi, pigpio.pi):
@@ -17,11 +21,14 @@ class LED:
 
         self.pi = pi
         self.pin = pin
+        self.name = name  # Shown in traces
         self.frequency = frequency
         self.range = range
         self.brightness = brightness
         self.color = color  # Default to white
         self.active = False # Default to inactive
+        self.last_change_ns = time.monotonic_ns() # time.monotonic_ns() of the last activate/deactivate
+        self.changes = ChangeLog(name) # Every activate/deactivate, for the data file
 
         # Check if RGB pins are provided
         if rgb_pins is not None and len(rgb_pins) == 3:
@@ -77,6 +84,7 @@ class LED:
         # If pigpio isn't available, simulate activation and log
         if self.pi is None:
             self.active = True
+            self.last_change_ns = self.changes.record("on")
             logger.warning("pigpio not available; LED.activate() simulated")
             return
 
@@ -89,6 +97,8 @@ class LED:
             self.pi.set_PWM_dutycycle(self.pin, self.brightness)
 
         self.active = True
+        self.last_change_ns = self.changes.record("on")
+        Tracing.instant(f"{self.name} on", "gpio", {"brightness": self.brightness, "color": self.color})
         logger.debug("LED activated")
     
     def deactivate(self):
@@ -96,6 +106,7 @@ class LED:
         # If pigpio isn't available, simulate deactivation and log
         if self.pi is None:
             self.active = False
+            self.last_change_ns = self.changes.record("off")
             logger.warning("pigpio not available; LED.deactivate() simulated")
             return
 
@@ -107,4 +118,6 @@ class LED:
             self.pi.set_PWM_dutycycle(self.pin, 0)
 
         self.active = False
+        self.last_change_ns = self.changes.record("off")
+        Tracing.instant(f"{self.name} off", "gpio")
         logger.debug(f"LED deactivated")
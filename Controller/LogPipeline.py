@@ -0,0 +1,144 @@
+import queue
+import atexit
+import threading
+import collections
+from logging.handlers import QueueHandler, QueueListener
+
+import logging
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler for a bounded queue that counts and drops records when the queue is full."""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the arguments now, in case they change before the listener gets to the record,
+        # but leave formatting (timestamps, exception text) to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1  # Single int increment; a lost update only undercounts
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Wait for room; the default put_nowait fails on a full queue
+
+class _FanoutHandler(logging.Handler):
+    """Passes each record to the pipeline's current handlers, honouring their levels."""
+    def __init__(self, pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+        self.reported = 0
+
+    def handle(self, record):
+        dropped = self.pipeline.queue_handler.dropped
+        if dropped != self.reported:
+            warning = logging.LogRecord(self.pipeline.logger.name, logging.WARNING, __file__, 0,
+                                        f"Log queue full: dropped {dropped - self.reported} records "
+                                        f"({dropped} total)", None, None)
+            self.reported = dropped
+            self._dispatch(warning)
+        self._dispatch(record)
+        return True
+
+    def _dispatch(self, record):
+        for handler in self.pipeline.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+class LogPipeline:
+    """
+    Routes a logger through a bounded queue drained by a QueueListener thread, so callers
+    (serial loops, trainer ticks) never wait on console, file or UI I/O.
+
+    The logger gets a single DroppingQueueHandler; the real handlers are attached with
+    add_handler() and run on the listener thread. When the queue is full new records are
+    dropped and counted, and a warning with the count is logged once the queue drains.
+    The logger's level follows the lowest handler level, so filtered records are rejected
+    before a LogRecord is even created.
+    """
+    def __init__(self, logger: logging.Logger, max_queue: int = 10000):
+        self.logger = logger
+        self.handlers = []  # Replaced, never mutated, so the listener can iterate without a lock
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.listener = _Listener(self.queue, _FanoutHandler(self))
+        self.logger.addHandler(self.queue_handler)
+        self.listener.start()
+        self.running = True
+        atexit.register(self.stop)
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped
+
+    def add_handler(self, handler: logging.Handler):
+        with self.lock:
+            if handler not in self.handlers:
+                self.handlers = self.handlers + [handler]
+            self._update_level()
+
+    def remove_handler(self, handler: logging.Handler):
+        with self.lock:
+            self.handlers = [h for h in self.handlers if h is not handler]
+            self._update_level()
+
+    def set_handler_level(self, handler: logging.Handler, level):
+        with self.lock:
+            handler.setLevel(level)
+            self._update_level()
+
+    def _update_level(self):
+        levels = [h.level for h in self.handlers]
+        # NOTSET on the logger would defer to the root logger, so floor at 1 (everything)
+        self.logger.setLevel(max(min(levels), 1) if levels else logging.WARNING)
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        if self.running:
+            self.running = False
+            self.listener.stop()
+        for handler in self.handlers:
+            handler.flush()
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the most recent formatted records in memory for any number of readers, so
+    records are formatted once however many clients display them. Each record gets a
+    sequence number; readers poll read() with the last number they saw.
+    """
+    def __init__(self, capacity: int = 1000, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.records = collections.deque(maxlen=capacity)  # (seq, levelno, text)
+        self.seq = 0
+
+    def emit(self, record):
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self.seq += 1
+            self.records.append((self.seq, record.levelno, text))
+
+    def read(self, after: int, level: int = logging.NOTSET, limit: int = None):
+        """Return (last seq, [texts]) for records after seq `after` at or above level, oldest first."""
+        with self.lock:
+            seq = self.seq
+            entries = []
+            for entry in reversed(self.records):
+                if entry[0] <= after:
+                    break
+                entries.append(entry)
+        texts = [text for _, levelno, text in reversed(entries) if levelno >= level]
+        if limit is not None:
+            texts = texts[-limit:]
+        return seq, texts
@@ -17,12 +17,24 @@ import subprocess
 import threading
 import queue
 from helpers import wait_for_dmesg
+from SubsystemLog import get_logger
+import Metrics
+import Tracing
+from HardwareEvents import ChangeLog
 from enum import Enum
 import os
 from pathlib import Path
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
+serial_log = get_logger("serial")
+
+commands_sent = Metrics.counter("m0_commands_sent", "Commands written to an M0", ("m0",))
+lines_received = Metrics.counter("m0_lines_received", "Lines read from an M0", ("m0",))
+touches = Metrics.counter("m0_touches", "TOUCH lines read from an M0", ("m0",))
+serial_errors = Metrics.counter("m0_serial_errors", "Serial read or write errors", ("m0",))
+response_latency = Metrics.histogram("m0_response_latency_seconds", "Time from writing a command to the next line read", ("m0",))
+command_queue_depth = Metrics.gauge("m0_command_queue_depth", "Commands waiting to be written to an M0", ("m0",))
 
 class M0Mode(Enum):
     UNINITIALIZED = 0
@@ -37,7 +49,8 @@ class M0Device:
     """
 
     def __init__(self, pi: pigpio.pi = None, id: str = None, reset_pin: int = None,
-                 port: str = None, baudrate: int = 115200, location: str = None):
+                 port: str = None, baudrate: int = 115200, location: str = None,
+                 sync_output = None):
         if pigpio is not None and not isinstance(pi, pigpio.pi):
             logger.error("pi must be an instance of pigpio.pi")
             raise ValueError("pi must be an instance of pigpio.pi")
@@ -48,17 +61,24 @@ class M0Device:
         self.port= port
         self.baudrate = baudrate
         self.location = location
+        self.sync_output = sync_output  # optional SyncOutput pulsed on SHOW and TOUCH
 
         self.ser = None
         self.ud_mount_loc = None
 
         self.stop_flag = threading.Event()
-        self.cmd_queue = queue.Queue()  # to store commands to send to the M0
+        self.cmd_queue = queue.Queue()  # (command, time.monotonic_ns() it was queued) to send to the M0
         self.serial_comm_loop_interval = 0.1  # seconds
         self.firmware_version = "0.0.0"
 
         self.is_touched = False
 
+        # time.monotonic_ns() of serial traffic
+        self.last_cmd_ns = None  # last command written
+        self.last_line_ns = None  # last line read
+        self.last_touch_ns = None  # last TOUCH line read
+        self.changes = ChangeLog(self.id)  # Every command written and line read, for the data file
+
         self.cmd = ""
 
         self.code_dir = os.path.dirname(os.path.abspath(__file__))
@@ -145,7 +165,7 @@ class M0Device:
             time.sleep(1)  # give some time for the serial port to be ready
             
             self.stop_flag.clear()
-            self.thread = threading.Thread(target=self.serial_comm_loop, daemon=True)
+            self.thread = threading.Thread(target=self.serial_comm_loop, name=f"{self.id} serial", daemon=True)
             self.thread.start()
 
             self.mode = M0Mode.SERIAL_COMM
@@ -179,17 +199,26 @@ class M0Device:
         Continuously reads lines from the serial port and puts them in the message queue.
         """
         logger.info(f"[{self.id}] Starting serial comm loop.")
+        awaiting_response = False  # A command was written and no line has been read since
         while not self.stop_flag.is_set():
+            command_queue_depth.labels(self.id).set(self.cmd_queue.qsize())
             if not self.cmd_queue.empty():
                 # logger.debug(f"[{self.id}] Writing to serial port: {self.cmd}")
                 try:
-                    self.cmd = self.cmd_queue.get()
+                    self.cmd, queued_ns = self.cmd_queue.get()
                     msg = (self.cmd + "\n").encode("utf-8")
                     # self.ser.reset_input_buffer()
                     # self.ser.reset_output_buffer()
                     self.ser.write(msg)
-                    logger.info(f"[{self.id}] -> {self.cmd}")
+                    self.last_cmd_ns = self.changes.record(f"-> {self.cmd}")
+                    awaiting_response = True
+                    commands_sent.labels(self.id).inc()
+                    Tracing.complete(f"-> {self.cmd}", "serial", queued_ns, self.last_cmd_ns, {"m0": self.id})  # From queued to written
+                    if self.sync_output is not None and self.cmd == "SHOW":
+                        self.sync_output.trigger("stimulus_show")
+                    serial_log.info("[%s] -> %s", self.id, self.cmd)
                 except Exception as e:
+                    serial_errors.labels(self.id).inc()
                     logger.error(f"[{self.id}] Error writing to serial port: {e}")
             
             time.sleep(0.01)  # small delay to allow command to be sent before reading response
@@ -200,14 +229,28 @@ class M0Device:
                     # Read a line from the serial port
                     line = self.ser.readline().decode("utf-8", errors="ignore").strip()
                     if line:
-                        logger.info(f"[{self.id}] <- {line}")
+                        self.last_line_ns = self.changes.record(f"<- {line}")
+                        lines_received.labels(self.id).inc()
+                        if awaiting_response:
+                            response_latency.labels(self.id).observe((self.last_line_ns - self.last_cmd_ns) / 1e9)
+                            Tracing.complete(f"{self.cmd} response", "serial", self.last_cmd_ns, self.last_line_ns, {"m0": self.id, "line": line})
+                            awaiting_response = False
+                        else:
+                            Tracing.instant(f"<- {line}", "serial", {"m0": self.id})
+                        serial_log.info("[%s] <- %s", self.id, line)
                         
                         if line.startswith("TOUCH"):
+                            self.last_touch_ns = self.last_line_ns
+                            touches.labels(self.id).inc()
+                            Tracing.instant("TOUCH", "touch", {"m0": self.id, "line": line})
+                            if self.sync_output is not None:
+                                self.sync_output.trigger("touch")
                             self.is_touched = True
-                            logger.debug(f"[{self.id}] Touch detected.")
+                            serial_log.debug("[%s] Touch detected.", self.id)
 
                         if line.startswith("ID:"):
                             self.id = line.split("ID:")[1]
+                            self.changes.device = self.id
                             logger.info(f"[{self.id}] Updated device ID from serial message.")                        
                         
                         if line.startswith("VERSION:"):
@@ -215,6 +258,7 @@ class M0Device:
                             logger.info(f"[{self.id}] Updated firmware version from serial message: {self.firmware_version}")
 
             except Exception as e:
+                serial_errors.labels(self.id).inc()
                 logger.error(f"[{self.id}] Error reading from serial port: {e}")
                 # re-open self.ser here
                 # self._attempt_reopen()
@@ -231,7 +275,7 @@ class M0Device:
         """
         logger.info(f"[{self.id}] Sending command: {cmd}")
         if self.mode == M0Mode.SERIAL_COMM:
-            self.cmd_queue.put(cmd)
+            self.cmd_queue.put((cmd, time.monotonic_ns()))
             time.sleep(0.2)  # small delay to allow command to be processed
         else:
             logger.error(f"[{self.id}] Cannot send command in mode {self.mode}.")
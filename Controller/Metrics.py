@@ -0,0 +1,240 @@
+import re
+import time
+import bisect
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+# Seconds; suits tick jitter, serial round trips and file writes alike
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Counter:
+    """Monotonic count. inc() is a plain attribute add: under the GIL a rare lost update only undercounts."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name):
+        yield name + "_total", (), self.value
+
+class Gauge:
+    """Value that goes up and down."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def samples(self, name):
+        yield name, (), self.value
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() bisects the bucket bounds and bumps one count;
+    the cumulative counts Prometheus expects are only computed when scraped.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def samples(self, name):
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            yield name + "_bucket", (("le", format_value(bound)),), cumulative
+        yield name + "_sum", (), self.sum
+        yield name + "_count", (), cumulative
+
+KINDS = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+class Metric:
+    """
+    A named metric with optional labels. labels(...) returns the child for one set of
+    label values; hot paths should fetch their child once and keep it.
+    """
+    def __init__(self, name: str, help: str, kind: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}  # (label value strings) -> child; replaced, never mutated, so scrapes can iterate it
+        self.lookup = {}  # Label values as passed to labels() -> child
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self.lookup.get(values)
+        if child is None:
+            child = self._child(values)
+        return child
+
+    def _child(self, values):
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        with self.lock:
+            child = self.children.get(key)
+            if child is None:
+                child = Histogram(self.buckets) if self.kind == "histogram" else KINDS[self.kind]()
+                self.children = {**self.children, key: child}
+            self.lookup[values] = child
+        return child
+
+    def remove(self, *values):
+        key = tuple(str(v) for v in values)
+        with self.lock:
+            self.children = {k: child for k, child in self.children.items() if k != key}
+            self.lookup = {k: child for k, child in self.lookup.items() if tuple(str(v) for v in k) != key}
+
+    def collect(self):
+        for values, child in self.children.items():
+            for name, extra, value in child.samples(self.name):
+                yield name, tuple(zip(self.labelnames, values)) + extra, value
+
+class Registry:
+    """
+    Metrics of one process, rendered in the Prometheus text format. Besides metrics updated
+    where things happen, collectors are called at scrape time for values that are cheaper
+    to read on demand (queue depths, thread inventory).
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []  # fn() -> iterable of (name, kind, help, [(labels dict, value)])
+        self.lock = threading.Lock()
+
+    def register(self, name, help, kind, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Return the metric called name, creating it on first use; repeated calls share it."""
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = Metric(name, help, kind, labelnames, buckets)
+                self.metrics[name] = metric
+            elif metric.kind != kind or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered as {metric.kind} {metric.labelnames}")
+        # Without labels hand back the single child, so callers can inc()/observe() directly
+        return metric if labelnames else metric.labels()
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(name, help, "counter", labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(name, help, "gauge", labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(name, help, "histogram", labelnames, buckets)
+
+    def add_collector(self, collector):
+        with self.lock:
+            if collector not in self.collectors:
+                self.collectors.append(collector)
+
+    def remove_collector(self, collector):
+        with self.lock:
+            if collector in self.collectors:
+                self.collectors.remove(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += [format_sample(name, labels, value) for name, labels, value in metric.collect()]
+        for collector in list(self.collectors):
+            try:
+                for name, kind, help, samples in collector():
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                    lines += [format_sample(name, tuple(labels.items()), value) for labels, value in samples]
+            except Exception as e:
+                logger.error(f"Metrics collector {collector} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def format_sample(name, labels, value) -> str:
+    if not labels:
+        return f"{name} {format_value(value)}"
+    text = ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+    return f"{name}{{{text}}} {format_value(value)}"
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def thread_inventory():
+    """Live threads grouped by name without their counter ("Thread-7 (_read_loop)" -> "Thread (_read_loop)"), and pending Timers."""
+    groups = {}
+    timers = 0
+    for thread in threading.enumerate():
+        timers += isinstance(thread, threading.Timer)
+        group = re.sub(r"[-_]\d+(?=$| \()", "", thread.name)
+        groups[group] = groups.get(group, 0) + 1
+    yield "controller_threads", "gauge", "Live threads by name", [({"name": name}, count) for name, count in sorted(groups.items())]
+    yield "controller_timers_active", "gauge", "Pending threading.Timer threads", [({}, timers)]
+
+start_time = time.time()
+
+def process_info():
+    yield "process_start_time_seconds", "gauge", "Start time of the process since the epoch", [({}, start_time)]
+
+# The process-wide registry and shortcuts to it
+registry = Registry()
+registry.add_collector(thread_inventory)
+registry.add_collector(process_info)
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+add_collector = registry.add_collector
+remove_collector = registry.remove_collector
+render = registry.render
+
+def serve(port: int = 9100, host: str = "0.0.0.0"):
+    """Serve /metrics on a daemon thread, for processes without the WebUI; returns the server."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
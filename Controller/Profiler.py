@@ -0,0 +1,213 @@
+import os
+import re
+import sys
+import time
+import random
+import threading
+import collections
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+DEFAULT_INTERVAL = 0.01 # Seconds between stack samples
+DEFAULT_DURATION = 60.0 # Profiles stop by themselves after this many seconds
+MAX_OVERHEAD = 0.02 # Fraction of one CPU the sampler may use before it samples less often
+MAX_DEPTH = 64 # Frames kept per stack, innermost first
+STATE_FUNCTIONS = ("run_training",) # Stacks through these get tagged with the trainer state
+MIN_CPU_SHARE = 0.01 # Threads using less of a CPU than this between samples count as idle
+MIN_SWITCH_INTERVAL = 0.0005 # Floor for the GIL switch interval while profiling
+
+def thread_group(name: str) -> str:
+    """Thread name without its counter, so one-shot Timer threads of the same loop add up."""
+    return re.sub(r"[-_]\d+(?=$| \()", "", name)
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread from a background thread and counts them as
+    collapsed stacks (root;...;leaf count), the input format of flamegraph.pl and speedscope.
+
+    Each stack is rooted at its thread group (see thread_group), and stacks passing through
+    a STATE_FUNCTIONS frame get a [state:<name>] frame from state_source(), so time can be
+    read per trainer state and per M0 serial thread. Where per-thread CPU clocks exist
+    (Linux), threads that used under MIN_CPU_SHARE of a CPU since the previous sample are
+    left out, so threads idling in sleep() or readline() don't drown out the busy ones, and
+    the CPU seconds of each thread group are totalled. Sampling intervals are jittered so
+    periodic loops can't line up with them, and the GIL switch interval is shortened while
+    profiling (the default 5 ms would let a busy thread finish most ticks before the
+    sampler gets the GIL, hiding them). The sampler times its own CPU use and lengthens
+    its interval while it would use more than max_overhead of a CPU, so it can stay on
+    during a live session; it stops by itself after duration seconds.
+    """
+    def __init__(self, interval: float = DEFAULT_INTERVAL, duration: float = DEFAULT_DURATION,
+                 state_source=None, max_overhead: float = MAX_OVERHEAD, max_depth: int = MAX_DEPTH):
+        self.interval = interval
+        self.duration = duration
+        self.state_source = state_source
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.stacks = collections.Counter()
+        self.labels = {} # code object -> label, so each function is formatted once
+        self.cpu_clocks = hasattr(time, "pthread_getcpuclockid")
+        self.cpu_last = {} # thread ident -> CPU seconds at the previous sample
+        self.last_sample = None # time.monotonic() of the previous sample
+        self.cpu_time = collections.Counter() # thread group -> CPU seconds while profiling
+        self.idle = 0 # Thread samples skipped because the thread used no CPU
+        self.samples = 0
+        self.sample_time = 0.0 # CPU seconds spent taking samples
+        self.switch_interval = None # GIL switch interval to restore
+        self.started = None
+        self.stopped = None
+        self.current_interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.on_finish = [] # Called with the profiler after it stops
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            logger.warning("Profiler already running")
+            return
+        self.stop_event.clear()
+        self.started = time.monotonic()
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.switch_interval, max(self.interval / 10, MIN_SWITCH_INTERVAL)))
+        self.thread = threading.Thread(target=self._run, name="Profiler", daemon=True)
+        self.thread.start()
+        logger.info(f"Profiler started: every {self.interval * 1000:.0f} ms for up to {self.duration:.0f} s")
+
+    def stop(self, wait: bool = True):
+        """Stop sampling; with wait, also wait for the sampler thread to finish writing up."""
+        self.stop_event.set()
+        if wait and self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        deadline = self.started + self.duration
+        while not self.stop_event.is_set() and time.monotonic() < deadline:
+            start = time.thread_time()
+            self.sample(own)
+            cost = time.thread_time() - start
+            self.sample_time += cost
+            # Keep cost / (cost + wait) under max_overhead
+            self.current_interval = max(self.interval, cost / self.max_overhead - cost)
+            self.stop_event.wait(self.current_interval * random.uniform(0.5, 1.5))
+        self.stopped = time.monotonic()
+        sys.setswitchinterval(self.switch_interval)
+        logger.info(f"Profiler stopped after {self.stopped - self.started:.1f} s, {self.samples} samples")
+        for callback in self.on_finish:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Error finishing profile: {e}")
+
+    def sample(self, skip: int = None):
+        """Take one sample of every thread except skip (a thread ident)."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        state = None
+        labels = self.labels
+        now = time.monotonic()
+        min_cpu = MIN_CPU_SHARE * (now - self.last_sample) if self.last_sample is not None else 0.0
+        self.last_sample = now
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            group = thread_group(names.get(ident, f"thread {ident}"))
+            if self.cpu_clocks:
+                cpu = self._cpu(ident)
+                previous = self.cpu_last.get(ident)
+                self.cpu_last[ident] = cpu
+                if previous is None or cpu is None:
+                    continue
+                self.cpu_time[group] += cpu - previous
+                if cpu - previous <= min_cpu:
+                    self.idle += 1
+                    continue
+            frames = []
+            tagged = False
+            while frame is not None and len(frames) < self.max_depth:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                frames.append(label)
+                if code.co_name in STATE_FUNCTIONS and not tagged and self.state_source is not None:
+                    if state is None:
+                        state = self._state()
+                    frames.append(f"[state:{state}]")
+                    tagged = True
+                frame = frame.f_back
+            frames.append(group)
+            self.stacks[";".join(reversed(frames))] += 1
+        self.samples += 1
+
+    @staticmethod
+    def _cpu(ident):
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (OSError, ValueError, OverflowError):
+            return None  # Thread exited between enumerating and reading its clock
+
+    def _state(self) -> str:
+        try:
+            return str(self.state_source())
+        except Exception:
+            return "unknown"
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "frame;frame;... samples" line each."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 20) -> str:
+        """Time per thread group, per trainer state and per function (self and total), as text."""
+        elapsed = (self.stopped or time.monotonic()) - self.started
+        total = sum(self.stacks.values()) or 1
+        groups, states, leaves, inclusive = (collections.Counter() for _ in range(4))
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            groups[frames[0]] += count
+            for frame in frames:
+                if frame.startswith("[state:"):
+                    states[frame[7:-1]] += count
+            if len(frames) > 1:
+                leaves[frames[-1]] += count
+            for frame in set(frames[1:]):
+                if not frame.startswith("[state:"):
+                    inclusive[frame] += count
+
+        def table(title, counter, denominator, n=top):
+            lines = [title]
+            lines += [f"  {100 * count / denominator:6.1f}%  {count:>7}  {name}" for name, count in counter.most_common(n)]
+            return lines + [""]
+
+        overhead = self.sample_time / elapsed if elapsed > 0 else 0.0
+        lines = [f"Profile of {elapsed:.1f} s: {self.samples} samples "
+                 f"(interval {self.interval * 1000:.0f} ms, last {self.current_interval * 1000:.1f} ms), "
+                 f"sampler overhead {100 * overhead:.2f}% of one CPU", ""]
+        if self.cpu_clocks:
+            lines += [f"CPU seconds by thread ({self.idle} idle thread samples skipped):"]
+            lines += [f"  {seconds:8.3f}s  {100 * seconds / elapsed:5.1f}% of a CPU  {name}"
+                      for name, seconds in self.cpu_time.most_common()] + [""]
+        lines += table("Busy thread samples by thread:", groups, total, n=None)
+        if states:
+            lines += table("Trainer tick samples by state:", states, sum(states.values()), n=None)
+        lines += table(f"Top {top} functions by self samples:", leaves, total)
+        lines += table(f"Top {top} functions by total samples:", inclusive, total)
+        return "\n".join(lines)
+
+    def write(self, directory: str, prefix: str = "profile") -> tuple:
+        """Write <prefix>_<time>.collapsed and <prefix>_<time>_summary.txt to directory; returns both paths."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}")
+        with open(base + ".collapsed", "w") as f:
+            f.write(self.collapsed())
+        with open(base + "_summary.txt", "w") as f:
+            f.write(self.summary())
+        logger.info(f"Profile written to {base}.collapsed and {base}_summary.txt")
+        return base + ".collapsed", base + "_summary.txt"
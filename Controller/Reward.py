@@ -3,12 +3,14 @@ try:
 except ImportError:
     pigpio = None
 import time
+import Tracing
+from HardwareEvents import ChangeLog
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
 
 class Reward:
-    def __init__(self, pi=None, pin=27):
+    def __init__(self, pi=None, pin=27, sync_output=None):
         if pi is None and pigpio is not None:
             pi = pigpio.pi()
         if pigpio is None:
@@ -24,6 +26,9 @@ class Reward:
         self.pi = pi
         self.pin = pin
         self.state = False
+        self.last_change_ns = time.monotonic_ns() # time.monotonic_ns() of the last pump on/off
+        self.changes = ChangeLog("reward") # Every pump on/off, for the data file
+        self.sync_output = sync_output
 
         """PWM set up"""
         mode_status = self.pi.set_mode(self.pin, pigpio.OUTPUT)
@@ -61,6 +66,11 @@ class Reward:
         if status != 0:
             logger.error("Failed to start reward pump on pin %s (status=%s)", self.pin, status)
             raise RuntimeError(f"Failed to start reward pump on pin {self.pin}")
+        if self.sync_output is not None and not self.state:
+            self.sync_output.trigger("reward_onset")
+        if not self.state:
+            self.last_change_ns = self.changes.record("on")
+            Tracing.instant("reward on", "gpio", {"pin": self.pin})
         self.state = True
 
     def stop(self):
@@ -69,4 +79,7 @@ class Reward:
         if status != 0:
             logger.error("Failed to stop reward pump on pin %s (status=%s)", self.pin, status)
             raise RuntimeError(f"Failed to stop reward pump on pin {self.pin}")
+        if self.state:
+            self.last_change_ns = self.changes.record("off")
+            Tracing.instant("reward off", "gpio", {"pin": self.pin})
         self.state = False
\ No newline at end of file
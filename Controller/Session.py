@@ -2,6 +2,7 @@ import os
 import sys
 import time
 import yaml
+import signal
 import threading
 
 # Local modules
@@ -9,23 +10,43 @@ from Chamber import Chamber
 from trainers import Trainer, get_trainer_class
 from Config import Config
 from Virtual.VirtualChamber import VirtualChamber
+from analysis.Export import export_session_async
+from LogPipeline import LogPipeline
+import SubsystemLog
+import Metrics
+from EventWriter import total_queue_depth
+from TimeSeriesStore import TimeSeriesStore, TimeSeriesSampler, histogram_mean, gauge_total, cpu_temperature
+from Profiler import SamplingProfiler
+import Tracing
 
 import logging
 from logging.handlers import TimedRotatingFileHandler
 session_logger = logging.getLogger('session_logger')
 session_logger.setLevel(logging.DEBUG)
 
+# Handlers run on a listener thread behind a bounded queue, so logging never blocks the caller
+log_pipeline = LogPipeline(session_logger)
+
 # Create a stream handler for logging to the console
 stream_handler = logging.StreamHandler(stream=sys.stdout)
 stream_handler.setLevel(logging.DEBUG)
 formatter = logging.Formatter('[%(asctime)s:%(filename)s@%(lineno)d:%(funcName)s:%(levelname)s] %(message)s')
 stream_handler.setFormatter(formatter)
-session_logger.addHandler(stream_handler)
+log_pipeline.add_handler(stream_handler)
 
 # File handler is configured in Session.__init__ once chamber_name is known
 
 logger = logging.getLogger(f"session_logger.{__name__}")
 
+tick_duration = Metrics.histogram("session_tick_duration_seconds", "Time spent in one trainer tick")
+tick_lateness = Metrics.histogram("session_tick_lateness_seconds", "How late trainer ticks start relative to run_interval")
+
+def log_pipeline_metrics():
+    yield "log_queue_depth", "gauge", "Records waiting in the log queue", [({}, log_pipeline.queue.qsize())]
+    yield "log_records_dropped_total", "counter", "Log records dropped because the queue was full", [({}, log_pipeline.dropped)]
+
+Metrics.add_collector(log_pipeline_metrics)
+
 #TODO: Make camera reinitialization more reliable
 
 class Session:
@@ -54,6 +75,18 @@ class Session:
         self.config.ensure_param("chamber_name", "Chamber0")
         self.config.ensure_param("session_start_time", None)
         self.config.ensure_param("virtual_mode", False)  # Enable virtual chamber for testing
+        self.config.ensure_param("export_on_stop", True)  # Export a per-trial CSV in the background when training stops
+        self.config.ensure_param("watch_config", True)  # Apply edits to the session config file without a restart
+        self.config.ensure_param("log_levels", dict(SubsystemLog.DEFAULT_LEVELS))  # Level per subsystem: serial, gpio, trainer, ui
+        self.config.ensure_param("timeseries_dir", "~/timeseries")  # Local ring files of key metrics, kept for 30 days
+        self.config.ensure_param("profile_interval", 0.01)  # Seconds between profiler stack samples
+        self.config.ensure_param("profile_duration", 60)  # Profiles stop by themselves after this many seconds
+        self.config.ensure_param("trace_enabled", False)  # Record a timeline of ticks, serial traffic, GPIO and data file writes (a long session's trace is tens of MB)
+        self.config.ensure_param("trace_buffer_events", Tracing.DEFAULT_CAPACITY)  # Events kept per thread; older ones are overwritten
+        self.config.ensure_param("trace_on_stop", True)  # Export the trace to the log directory when training stops
+        SubsystemLog.set_levels(self.config["log_levels"])
+        Tracing.tracer.capacity = self.config["trace_buffer_events"]
+        Tracing.tracer.enabled = self.config["trace_enabled"]
         
         # Initialize directories in case they don't exist
         os.makedirs(self.config["data_dir"], exist_ok=True)
@@ -65,21 +98,22 @@ class Session:
         current_time = self.config["session_start_time"]
         log_dir = os.path.join(os.getcwd(), "log")
         os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
         self.session_log_file = os.path.join(
             log_dir,
             f"{current_time}_{self.config['chamber_name']}_session_log.log",
         )
 
-        for handler in list(session_logger.handlers):
+        for handler in list(log_pipeline.handlers):
             if isinstance(handler, (logging.FileHandler, TimedRotatingFileHandler)):
-                session_logger.removeHandler(handler)
+                log_pipeline.remove_handler(handler)
 
         file_handler = TimedRotatingFileHandler(
             self.session_log_file, when="midnight", interval=1, backupCount=30
         )
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
-        session_logger.addHandler(file_handler)
+        log_pipeline.add_handler(file_handler)
         logger.info("Initializing session logger...")
 
         chamber_config = {
@@ -98,10 +132,41 @@ class Session:
         self.set_trainer_name(self.config["trainer_name"])
         self.session_timer = threading.Timer(0.1, self.trainer.run_training)
         self.priming_timer = threading.Timer(0.1, self.run_priming)
-        self.priming_start_time = time.time()
+        self.priming_start_time = time.monotonic()
+        self.next_tick = time.monotonic()  # When the next trainer tick is due, for the lateness metric
+        self.trace_state = None  # Trainer state on the trace's state track, and when it was entered
+        self.trace_state_ns = time.monotonic_ns()
+        self.last_trace = None  # Path of the last exported trace
 
         # Video Recording
         self.is_video_recording = False
+
+        # Key metrics recorded every second, so transient problems can be looked at later
+        self.timeseries = TimeSeriesStore(self.config["timeseries_dir"])
+        self.timeseries_sampler = TimeSeriesSampler(self.timeseries, {
+            "tick_lateness_ms": histogram_mean("session_tick_lateness_seconds", 1000.0),
+            "tick_duration_ms": histogram_mean("session_tick_duration_seconds", 1000.0),
+            "serial_rtt_ms": histogram_mean("m0_response_latency_seconds", 1000.0),
+            "beambreak_lateness_ms": histogram_mean("beambreak_read_lateness_seconds", 1000.0),
+            "cpu_temperature_c": cpu_temperature,
+            "log_queue_depth": log_pipeline.queue.qsize,
+            "event_queue_depth": total_queue_depth,
+            "m0_command_queue_depth": gauge_total("m0_command_queue_depth"),
+            "threads": threading.active_count,
+        })
+        self.timeseries_sampler.start()
+
+        # On-demand profiling, toggled from the WebUI or with `kill -USR1 <pid>`
+        self.profiler = None
+        self.last_profile = None  # Paths of the last written profile
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.toggle_profiling())
+        except (ValueError, AttributeError) as e:
+            logger.debug(f"Profiler signal not available: {e}")
+
+        self.config.subscribe(self.apply_config_changes)
+        if self.config["watch_config"]:
+            self.config.watch()
     
     def __del__(self):
         """Clean up the session by stopping timers and copying log files."""
@@ -111,6 +176,10 @@ class Session:
             self.session_timer.cancel()
         if hasattr(self, 'priming_timer') and self.priming_timer.is_alive():
             self.priming_timer.cancel()
+        if hasattr(self, 'timeseries_sampler'):
+            self.timeseries_sampler.stop()
+        if hasattr(self, 'profiler'):
+            self.stop_profiling()
         # Copy log file to data directory
         if hasattr(self, 'config') and hasattr(self, 'session_log_file') and os.path.isfile(self.session_log_file):
             try:
@@ -123,6 +192,83 @@ class Session:
         if hasattr(self, 'config'):
             self.config["session_start_time"] = None
     
+    def apply_config_changes(self, changed: dict):
+        """Pass session config edits that trainers read while running on to the current trainer."""
+        if "log_levels" in changed:
+            SubsystemLog.set_levels(changed["log_levels"])
+        if "trace_enabled" in changed:
+            Tracing.tracer.enabled = changed["trace_enabled"]
+        live = {key: changed[key] for key in ("iti_duration", "export_on_stop") if key in changed}
+        if live and isinstance(getattr(self, "trainer", None), Trainer):
+            self.trainer.config.update_with_dict(live)
+            logger.info(f"Applied {live} to the running trainer")
+        # run_interval is read on every tick; the remaining keys apply at the next start_training()
+
+    def set_log_level(self, subsystem, level):
+        """Change a subsystem's log level now and remember it in the session config."""
+        try:
+            SubsystemLog.set_level(subsystem, level)
+        except ValueError as e:
+            logger.error(str(e))
+            return
+        self.config["log_levels"] = {**(self.config["log_levels"] or {}), subsystem: level}
+        logger.info(f"Log level for {subsystem} set to {level}")
+
+    @property
+    def profiling(self) -> bool:
+        return self.profiler is not None and self.profiler.running
+
+    def start_profiling(self, duration: float = None, interval: float = None):
+        """Sample all threads for duration seconds, then write collapsed stacks and a summary to the log directory."""
+        if self.profiling:
+            logger.warning("Profiler already running")
+            return
+        self.profiler = SamplingProfiler(interval=interval or self.config["profile_interval"],
+                                         duration=duration or self.config["profile_duration"],
+                                         state_source=lambda: getattr(getattr(self.trainer, "state", None), "name", None))
+        self.profiler.on_finish.append(self.write_profile)
+        self.profiler.start()
+
+    def stop_profiling(self):
+        """Stop the profiler early; the profile is still written."""
+        if self.profiling:
+            self.profiler.stop(wait=False)  # May run in a signal handler
+
+    def toggle_profiling(self):
+        if self.profiling:
+            self.stop_profiling()
+        else:
+            self.start_profiling()
+
+    def write_profile(self, profiler):
+        self.last_profile = profiler.write(self.log_dir, prefix=f"{self.config['chamber_name']}_profile")
+
+    def trace_trainer_state(self):
+        """Close the trainer state span on the state track when the state has changed (or on export)."""
+        state = getattr(getattr(self.trainer, "state", None), "name", None)
+        now = time.monotonic_ns()
+        if self.trace_state is not None:
+            Tracing.complete(self.trace_state, "trainer", self.trace_state_ns, now, track="trainer state")
+        self.trace_state = state
+        self.trace_state_ns = now
+
+    def set_tracing(self, enabled: bool):
+        """Turn trace recording on or off now and remember it in the session config."""
+        self.config["trace_enabled"] = bool(enabled)
+        Tracing.tracer.enabled = bool(enabled)
+        logger.info(f"Tracing {'enabled' if enabled else 'disabled'}")
+
+    def export_trace(self):
+        """Write everything traced so far to the log directory as Chrome trace JSON (open in ui.perfetto.dev)."""
+        self.trace_trainer_state()
+        chamber_name = self.config["chamber_name"]
+        filepath = os.path.join(self.log_dir, f"{chamber_name}_trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        try:
+            self.last_trace = Tracing.export(filepath, process_name=chamber_name)
+        except Exception as e:
+            logger.error(f"Error exporting trace: {e}")
+        return self.last_trace
+
     def set_chamber_name(self, chamber_name):
         if chamber_name:
             self.config["chamber_name"] = chamber_name
@@ -142,19 +288,40 @@ class Session:
                           "iti_duration": self.config["iti_duration"],
                           "trainer_seq_dir": self.config["trainer_seq_dir"],
                           "trainer_seq_file": self.config["trainer_seq_file"],
-                          "data_dir": self.config["data_dir"]}
+                          "data_dir": self.config["data_dir"],
+                          "export_on_stop": self.config["export_on_stop"]}
         self.trainer.config.update_with_dict(trainer_config)
-        self.trainer.start_training()
+        # Each session's trace starts empty, so exports don't carry earlier sessions (or the idle time between them)
+        Tracing.tracer.clear()
+        self.trace_state = None
+        with Tracing.span("start_training", "session", {"trainer": self.config["trainer_name"]}):
+            self.trainer.start_training()
+        self.trace_trainer_state()
 
         self.session_timer.cancel()
+        self.next_tick = time.monotonic() + self.config["run_interval"]
         self.session_timer = threading.Timer(self.config["run_interval"], self.run_training)
+        self.session_timer.name = "session tick"
         self.session_timer.start()
         logger.info("Training session started.")
     
     def run_training(self):
         self.session_timer.cancel()
+        start_ns = time.monotonic_ns()
+        start = start_ns / 1e9
+        tick_lateness.observe(max(start - self.next_tick, 0.0))
         self.trainer.run_training()
+        end_ns = time.monotonic_ns()
+        end = end_ns / 1e9
+        tick_duration.observe(end - start)
+        if Tracing.tracer.enabled:
+            state = getattr(getattr(self.trainer, "state", None), "name", None)
+            Tracing.complete("tick", "trainer", start_ns, end_ns, {"state": state})
+            if state != self.trace_state:
+                self.trace_trainer_state()
+        self.next_tick = end + self.config["run_interval"]
         self.session_timer = threading.Timer(self.config["run_interval"], self.run_training)
+        self.session_timer.name = "session tick"
         self.session_timer.start()
     
     def toggle_video_recording(self):
@@ -252,29 +419,35 @@ class Session:
         else:
             logger.error("No Rodent name entered.")
 
-    def export_data(self):
+    def export_data(self, columnar=False):
+        """Export the trainer's most recent data file to a per-trial CSV on a background thread."""
         if not self.trainer:
             logger.error("No trainer to export data from.")
-            return
-        if not self.trainer.trial_data:
-            logger.warning("No trial data to export.")
-            return
-        
-        datetime_str = time.strftime("%Y%m%d_%H%M%S")
-        data_csv_file = os.path.join(self.data_dir, f"{datetime_str}_{self.chamber.chamber_name}_{self.rodent_name}_data.csv")
-        self.trainer.export_results_csv(data_csv_file)
-        logger.info(f"Data exported to {data_csv_file}")
+            return None
+        data_filepath = getattr(self.trainer, "data_filepath", None)
+        if not data_filepath or not os.path.isfile(data_filepath):
+            logger.warning("No data file to export.")
+            return None
+        if self.trainer.data_file:
+            # The export would replace the trial summary CSV the trainer is still writing
+            logger.error("Training is still running; stop it before exporting (the trial summary CSV is kept live).")
+            return None
+        return export_session_async(data_filepath, columnar=columnar, trainer=self.config["trainer_name"])
 
     def stop_training(self):
         if self.trainer:
             self.session_timer.cancel()
-            self.trainer.stop_training()
+            with Tracing.span("stop_training", "session"):
+                self.trainer.stop_training()
             logger.info("Training session ended.")
+            if self.config["trace_on_stop"] and Tracing.tracer.enabled:
+                # Encoding a long session's trace takes a few seconds; don't hold up the caller
+                threading.Thread(target=self.export_trace, name="TraceExport", daemon=True).start()
         else:
             logger.warning("No training session to stop.")
 
     def start_priming(self):
-        self.priming_start_time = time.time()
+        self.priming_start_time = time.monotonic()
         self.priming_timer.cancel()
         self.priming_timer = threading.Timer(0.1, self.run_priming)
         self.priming_timer.start()
@@ -283,7 +456,7 @@ class Session:
     
     def run_priming(self):
         self.priming_timer.cancel()
-        if time.time() - self.priming_start_time < self.config["priming_duration"]:
+        if time.monotonic() - self.priming_start_time < self.config["priming_duration"]:
             self.priming_timer = threading.Timer(self.config["run_interval"], self.run_priming)
             self.priming_timer.start()
 
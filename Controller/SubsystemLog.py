@@ -0,0 +1,89 @@
+import time
+import threading
+
+import logging
+
+# Subsystems with their own runtime-adjustable level, logged as session_logger.<subsystem>
+SUBSYSTEMS = ("serial", "gpio", "trainer", "ui")
+DEFAULT_LEVELS = {subsystem: "INFO" for subsystem in SUBSYSTEMS}
+
+class SubsystemLogger:
+    """
+    Logging facade for hot paths, bound to one subsystem's logger.
+
+    Calls check the level before doing anything else and format %-style arguments lazily,
+    so a disabled call costs one cached level lookup. every=seconds rate-limits a message:
+    repeats of the same key (the format string by default) within the interval are
+    suppressed and counted, and the next emitted line reports how many were dropped.
+    """
+    __slots__ = ("subsystem", "logger", "repeats", "lock")
+
+    def __init__(self, subsystem: str):
+        self.subsystem = subsystem
+        self.logger = logging.getLogger(f"session_logger.{subsystem}")
+        self.repeats = {}  # key -> [time of last emitted line, suppressed count]
+        self.lock = threading.Lock()
+
+    def is_enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, msg, *args, every: float = None, key=None):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, args, every, key)
+
+    def info(self, msg, *args, every: float = None, key=None):
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, args, every, key)
+
+    def warning(self, msg, *args, every: float = None, key=None):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, args, every, key)
+
+    def error(self, msg, *args, every: float = None, key=None):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, args, every, key)
+
+    def _log(self, level, msg, args, every, key):
+        if every is not None:
+            now = time.monotonic()
+            key = msg if key is None else key
+            with self.lock:
+                repeat = self.repeats.get(key)
+                if repeat is not None and now - repeat[0] < every:
+                    repeat[1] += 1
+                    return
+                suppressed = repeat[1] if repeat is not None else 0
+                self.repeats[key] = [now, 0]
+            if suppressed:
+                msg = f"{msg} (repeated {suppressed} more times)"
+        # stacklevel=3 attributes the record to the caller of debug()/info()/...
+        self.logger.log(level, msg, *args, stacklevel=3)
+
+_loggers = {}
+
+def get_logger(subsystem: str) -> SubsystemLogger:
+    """Return the shared SubsystemLogger for a subsystem."""
+    if subsystem not in _loggers:
+        _loggers[subsystem] = SubsystemLogger(subsystem)
+    return _loggers[subsystem]
+
+def set_level(subsystem: str, level):
+    """Set a subsystem's level by name ("DEBUG") or number; takes effect immediately."""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level for {subsystem}: {level}")
+    logging.getLogger(f"session_logger.{subsystem}").setLevel(level)
+
+def set_levels(levels: dict):
+    """Apply {subsystem: level}, logging (not raising) on invalid entries."""
+    for subsystem, level in (levels or {}).items():
+        try:
+            set_level(subsystem, level)
+        except ValueError as e:
+            logging.getLogger(f"session_logger.{__name__}").error(str(e))
+
+def get_levels() -> dict:
+    """Current level name of each subsystem."""
+    return {subsystem: logging.getLevelName(logging.getLogger(f"session_logger.{subsystem}").getEffectiveLevel())
+            for subsystem in SUBSYSTEMS}
@@ -0,0 +1,260 @@
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+import time
+import threading
+from array import array
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+TICK_WRAP = 1 << 32  # pigpio ticks are unsigned 32-bit microseconds
+
+def fit_line(x, y):
+    """Least-squares fit of y = intercept + slope * x. Returns (intercept, slope, rms residual)."""
+    n = len(x)
+    if n < 2:
+        return None
+    # Center the data first; timestamps in ns are too large for naive sums of squares
+    x0, y0 = x[0], y[0]
+    xs = [v - x0 for v in x]
+    ys = [v - y0 for v in y]
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((v - mean_x) ** 2 for v in xs)
+    if sxx == 0:
+        return None
+    sxy = sum((a - mean_x) * (b - mean_y) for a, b in zip(xs, ys))
+    slope = sxy / sxx
+    intercept = (y0 + mean_y) - slope * (x0 + mean_x)
+    rms = (sum((b - (mean_y + slope * (a - mean_x))) ** 2 for a, b in zip(xs, ys)) / n) ** 0.5
+    return intercept, slope, rms
+
+def external_to_host(mapping: dict, external_s: float) -> int:
+    """Convert a time on the external pulse clock (seconds) to host time.monotonic_ns()."""
+    return int(round(mapping["offset_ns"] + mapping["slope"] * external_s * 1e9))
+
+def host_to_external(mapping: dict, host_ns: int) -> float:
+    """Convert a host time.monotonic_ns() value to a time on the external pulse clock (seconds)."""
+    return (host_ns - mapping["offset_ns"]) / mapping["slope"] / 1e9
+
+class SyncInput:
+    """
+    Class to capture TTL edges from external systems (camera strobes, frame clocks, other chambers).
+
+    Edges are timestamped by the pigpio daemon with its microsecond tick and stored in an
+    array-backed ring buffer. The tick is related to time.monotonic_ns() through anchor samples
+    taken periodically while capturing, and at session end fit_clock_mapping() fits a linear
+    mapping (offset plus drift) between the host monotonic clock and each pin's pulse train:
+
+        host_ns = offset_ns + slope * external_s * 1e9
+
+    where external_s is pulse_index * period on the external clock.
+    """
+    def __init__(self, pi=None, pins: list = None, edge: str = "rising", capacity: int = 65536,
+                 period: float = None, anchor_interval: float = 10.0):
+        """Initialize the SyncInput. period is the nominal pulse period in seconds (estimated, without drift, if None)."""
+        if pi is None and pigpio is not None:
+            pi = pigpio.pi()
+        if pigpio is not None and not isinstance(pi, pigpio.pi):
+            logger.error("pi must be an instance of pigpio.pi")
+            raise ValueError("pi must be an instance of pigpio.pi")
+        if edge not in ("rising", "falling", "both"):
+            logger.error(f"Invalid sync input edge '{edge}'")
+            raise ValueError("edge must be 'rising', 'falling' or 'both'")
+
+        self.pi = pi
+        self.pins = [pins] if isinstance(pins, int) else list(pins or [])
+        self.edge = edge
+        self.capacity = int(capacity)
+        self.period = period
+        self.anchor_interval = anchor_interval
+
+        # Ring buffer of captured edges
+        self.ticks = array("q", bytes(8 * self.capacity))  # unwrapped pigpio ticks (us)
+        self.levels = array("b", bytes(self.capacity))
+        self.edge_pins = array("B", bytes(self.capacity))
+        self.count = 0  # total edges captured; the ring holds the last `capacity`
+
+        # (unwrapped tick, monotonic_ns) pairs relating the pigpio clock to the host clock
+        self.anchors = []
+
+        self.lock = threading.Lock()
+        self.last_raw_tick = None
+        self.last_tick = 0
+        self.callbacks = []
+        self.anchor_timer = threading.Timer(self.anchor_interval, self._anchor_loop)
+        self.capturing = False
+
+        if self.pi is None:
+            if self.pins:
+                logger.warning("pigpio not available; sync input disabled")
+            self.pins = []
+            return
+
+        for pin in self.pins:
+            self.pi.set_mode(pin, pigpio.INPUT)
+            self.pi.set_pull_up_down(pin, pigpio.PUD_DOWN)
+
+    def __del__(self):
+        self.stop()
+
+    @property
+    def enabled(self):
+        return bool(self.pins)
+
+    def _unwrap(self, raw_tick: int) -> int:
+        """Extend a 32-bit tick to 64 bits. Must be called with self.lock held."""
+        if self.last_raw_tick is None:
+            self.last_tick = raw_tick
+        else:
+            # Signed difference so slightly out-of-order ticks do not count as a wrap
+            delta = ((raw_tick - self.last_raw_tick + (TICK_WRAP >> 1)) % TICK_WRAP) - (TICK_WRAP >> 1)
+            self.last_tick += delta
+        self.last_raw_tick = raw_tick
+        return self.last_tick
+
+    def _edge_callback(self, gpio, level, tick):
+        """pigpio callback, runs on the pigpio notification thread."""
+        if level > 1:
+            return  # watchdog timeout, not an edge
+        with self.lock:
+            i = self.count % self.capacity
+            self.ticks[i] = self._unwrap(tick)
+            self.levels[i] = level
+            self.edge_pins[i] = gpio
+            self.count += 1
+
+    def sample_anchor(self, tries: int = 5):
+        """Record a (tick, monotonic_ns) pair, keeping the sample with the shortest round trip."""
+        best = None
+        for _ in range(tries):
+            before = time.monotonic_ns()
+            raw_tick = self.pi.get_current_tick()
+            after = time.monotonic_ns()
+            if best is None or after - before < best[0]:
+                best = (after - before, raw_tick, (before + after) // 2)
+        with self.lock:
+            self.anchors.append((self._unwrap(best[1]), best[2]))
+
+    def _anchor_loop(self):
+        """Periodically sample anchors; this also keeps tick unwrapping valid between sparse edges."""
+        self.anchor_timer.cancel()
+        try:
+            self.sample_anchor()
+        except Exception as e:
+            logger.error(f"Error sampling sync input anchor: {e}")
+        self.anchor_timer = threading.Timer(self.anchor_interval, self._anchor_loop)
+        self.anchor_timer.start()
+
+    def start(self):
+        """Clear the ring buffer and start capturing edges."""
+        if not self.enabled:
+            return
+        self.stop()
+        with self.lock:
+            self.count = 0
+            self.anchors = []
+            self.last_raw_tick = None
+        self.sample_anchor()
+
+        edge = {"rising": pigpio.RISING_EDGE, "falling": pigpio.FALLING_EDGE, "both": pigpio.EITHER_EDGE}[self.edge]
+        self.callbacks = [self.pi.callback(pin, edge, self._edge_callback) for pin in self.pins]
+        self.anchor_timer = threading.Timer(self.anchor_interval, self._anchor_loop)
+        self.anchor_timer.start()
+        self.capturing = True
+        logger.info(f"Sync input capturing on pins {self.pins} ({self.edge} edges)")
+
+    def stop(self):
+        """Stop capturing edges. Captured edges are kept until the next start()."""
+        if not getattr(self, "capturing", False):
+            return
+        self.anchor_timer.cancel()
+        for callback in self.callbacks:
+            callback.cancel()
+        self.callbacks = []
+        self.sample_anchor()
+        self.capturing = False
+        logger.info(f"Sync input stopped after {self.count} edges")
+
+    def get_edges(self, pin: int = None, level: int = None):
+        """Return (ticks, levels, pins) lists of the buffered edges in capture order."""
+        with self.lock:
+            n = min(self.count, self.capacity)
+            start = self.count - n
+            order = [(start + k) % self.capacity for k in range(n)]
+            edges = [(self.ticks[i], self.levels[i], self.edge_pins[i]) for i in order]
+        if pin is not None:
+            edges = [e for e in edges if e[2] == pin]
+        if level is not None:
+            edges = [e for e in edges if e[1] == level]
+        return [e[0] for e in edges], [e[1] for e in edges], [e[2] for e in edges]
+
+    def tick_to_host_fit(self):
+        """Fit monotonic_ns = intercept + slope * tick from the anchors."""
+        with self.lock:
+            anchors = list(self.anchors)
+        if len(anchors) < 2:
+            return None
+        return fit_line([a[0] for a in anchors], [a[1] for a in anchors])
+
+    def fit_clock_mapping(self, pin: int):
+        """
+        Fit the linear clock mapping between the host monotonic clock and the pulse train on pin.
+        Returns a dict suitable for external_to_host()/host_to_external(), or None.
+
+        Drift can only be measured against the external clock's nominal period (sync_input_period).
+        Without one, the period is estimated from the edges in host time, so the slope is ~1
+        whatever the drift and drift_ppm is None.
+        """
+        tick_fit = self.tick_to_host_fit()
+        if tick_fit is None:
+            logger.warning("Not enough anchors to relate pigpio ticks to the host clock")
+            return None
+        intercept, tick_slope, _ = tick_fit
+
+        level = None if self.edge == "both" else (1 if self.edge == "rising" else 0)
+        ticks, _, _ = self.get_edges(pin=pin, level=level)
+        if len(ticks) < 2:
+            logger.warning(f"Not enough sync input edges on pin {pin} to fit a clock mapping")
+            return None
+        host_ns = [intercept + tick_slope * t for t in ticks]
+
+        # Assign each edge its index in the external pulse train; gaps count as missed pulses
+        intervals = sorted(b - a for a, b in zip(host_ns, host_ns[1:]))
+        period_ns = self.period * 1e9 if self.period else intervals[len(intervals) // 2]
+        if period_ns <= 0:
+            return None
+        indices = [round((h - host_ns[0]) / period_ns) for h in host_ns]
+        external_s = [k * period_ns / 1e9 for k in indices]
+
+        fit = fit_line(external_s, host_ns)
+        if fit is None:
+            return None
+        offset_ns, slope_ns, rms_ns = fit
+        slope = slope_ns / 1e9
+        return {
+            "pin": pin,
+            "edges": len(ticks),
+            "missed_pulses": indices[-1] + 1 - len(set(indices)),
+            "period_s": period_ns / 1e9,
+            "offset_ns": int(round(offset_ns)),
+            "slope": slope,
+            "drift_ppm": (slope - 1) * 1e6 if self.period else None,
+            "residual_rms_ns": rms_ns,
+            "tick_to_host": {"intercept_ns": intercept, "ns_per_tick": tick_slope},
+        }
+
+    def fit_clock_mappings(self):
+        """Fit clock mappings for all configured pins."""
+        mappings = []
+        for pin in self.pins:
+            mapping = self.fit_clock_mapping(pin)
+            if mapping is not None:
+                drift = (f"drift {mapping['drift_ppm']:.2f} ppm" if mapping["drift_ppm"] is not None
+                         else f"drift unknown (no sync_input_period; estimated period {mapping['period_s'] * 1000:.3f} ms)")
+                logger.info(f"Sync input pin {pin}: {mapping['edges']} edges, {drift}, "
+                            f"residual {mapping['residual_rms_ns'] / 1000:.1f} us")
+                mappings.append(mapping)
+        return mappings
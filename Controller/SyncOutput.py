@@ -0,0 +1,229 @@
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+import time
+import threading
+from collections import deque
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+# Event types understood by SyncOutput. Hardware classes trigger these directly.
+SYNC_EVENT_TYPES = ("trial_start", "stimulus_show", "touch", "reward_onset")
+
+# Default mapping from trainer event names (Trainer.write_event) to sync event types.
+DEFAULT_TRAINER_EVENTS = {
+    "StartTrial": "trial_start",
+}
+
+PULSE_CAPACITY = 10000 # Pulse records kept for the data file; older ones are dropped when no session drains them
+
+class SyncOutput:
+    """
+    Class to emit TTL sync pulses for external acquisition systems using pigpio waves.
+
+    Pulses are generated by the pigpio daemon's DMA wave engine, so the pulse width is
+    hardware-timed and the rising edge is emitted as soon as the daemon receives the
+    command. One wave is pre-built per event type at startup so triggering a pulse is a
+    single socket command.
+
+    When a barcode pin is configured, every trial_start pulse is followed by the trial
+    number encoded as a barcode on that pin:
+      start marker (2 bit widths high, 1 bit width low), then barcode_bits data bits LSB
+      first (high = 1), then the line is returned low.
+
+    The pigpio tick and time.monotonic_ns() of every pulse are kept in a bounded queue which
+    the trainer drains into the data file (see Trainer.write_event).
+    """
+    def __init__(self, pi=None, event_pins: dict = None, pulse_width_us: int = 1000,
+                 barcode_pin: int = None, barcode_bits: int = 16, barcode_bit_us: int = 5000,
+                 trainer_events: dict = None):
+        """Initialize the SyncOutput. event_pins maps sync event types to a pin or list of pins."""
+        if pi is None and pigpio is not None:
+            pi = pigpio.pi()
+        if pigpio is not None and not isinstance(pi, pigpio.pi):
+            logger.error("pi must be an instance of pigpio.pi")
+            raise ValueError("pi must be an instance of pigpio.pi")
+
+        self.pi = pi
+        self.pulse_width_us = int(pulse_width_us)
+        self.barcode_pin = barcode_pin
+        self.barcode_bits = int(barcode_bits)
+        self.barcode_bit_us = int(barcode_bit_us)
+        self.trainer_events = dict(DEFAULT_TRAINER_EVENTS if trainer_events is None else trainer_events)
+
+        self.event_pins = {}
+        for event_type, pins in (event_pins or {}).items():
+            if event_type not in SYNC_EVENT_TYPES:
+                logger.warning(f"Unknown sync event type '{event_type}'; expected one of {SYNC_EVENT_TYPES}")
+                continue
+            if pins is None:
+                continue
+            pins = [pins] if isinstance(pins, int) else list(pins)
+            if pins:
+                self.event_pins[event_type] = pins
+
+        self.lock = threading.Lock()  # pigpio wave operations are not re-entrant
+        self.pulses = deque(maxlen=PULSE_CAPACITY)  # (event_type, t_ns, tick, pins, trial, delayed) records waiting to be logged
+        self.waves = {}  # event type -> pre-built pigpio wave id
+        self.barcode_wave = None
+        self.retired_waves = []  # previous barcode waves, deleted once no wave is transmitting or queued
+
+        if self.pi is None:
+            if self.event_pins or self.barcode_pin is not None:
+                logger.warning("pigpio not available; sync output disabled")
+            self.event_pins = {}
+            self.barcode_pin = None
+            return
+
+        for pin in self.output_pins():
+            self.pi.set_mode(pin, pigpio.OUTPUT)
+            self.pi.write(pin, 0)
+
+        self.build_waves()
+        if self.event_pins:
+            logger.info(f"Sync output enabled: {self.event_pins}, barcode pin: {self.barcode_pin}")
+
+    def __del__(self):
+        """Clean up the pre-built waves."""
+        self.clear_waves()
+
+    @property
+    def enabled(self):
+        return bool(self.event_pins)
+
+    def output_pins(self):
+        """Return the set of all pins driven by this SyncOutput."""
+        pins = {pin for pins in self.event_pins.values() for pin in pins}
+        if self.barcode_pin is not None:
+            pins.add(self.barcode_pin)
+        return sorted(pins)
+
+    def build_waves(self):
+        """
+        Pre-build one pulse wave per configured event type.
+        The pigpio daemon is shared (e.g. with other chambers' processes), so only this
+        SyncOutput's own waves are ever deleted, never all of them with wave_clear().
+        """
+        with self.lock:
+            self._delete_waves()
+            for event_type, pins in self.event_pins.items():
+                mask = 0
+                for pin in pins:
+                    mask |= 1 << pin
+                self.pi.wave_add_new()  # Start from no pending pulses; created waves are kept
+                self.pi.wave_add_generic([
+                    pigpio.pulse(mask, 0, self.pulse_width_us),
+                    pigpio.pulse(0, mask, 0),
+                ])
+                self.waves[event_type] = self.pi.wave_create()
+
+    def _wave_ids(self):
+        return list(self.waves.values()) + self.retired_waves + ([self.barcode_wave] if self.barcode_wave is not None else [])
+
+    def _delete_waves(self):
+        """Stop (if one of them is transmitting) and delete this SyncOutput's waves. Must be called with self.lock held."""
+        ids = self._wave_ids()
+        if ids and self.pi.wave_tx_at() in ids:
+            self.pi.wave_tx_stop()
+        for wave_id in ids:
+            self.pi.wave_delete(wave_id)
+        self.waves = {}
+        self.barcode_wave = None
+        self.retired_waves = []
+
+    def _delete_retired_waves(self):
+        """Delete retired barcode waves unless a wave is transmitting or queued. Must be called with self.lock held."""
+        if self.retired_waves and not self.pi.wave_tx_busy():
+            for wave_id in self.retired_waves:
+                self.pi.wave_delete(wave_id)
+            self.retired_waves = []
+
+    def clear_waves(self):
+        """Delete all waves created by this SyncOutput."""
+        if getattr(self, "pi", None) is None or not (getattr(self, "waves", None) or getattr(self, "retired_waves", None)
+                                                      or getattr(self, "barcode_wave", None) is not None):
+            return
+        try:
+            with self.lock:
+                self._delete_waves()
+        except Exception as e:
+            logger.error(f"Error clearing sync waves: {e}")
+
+    def _send(self, wave_id):
+        """Send a wave and return (tick, delayed). Must be called with self.lock held."""
+        delayed = False
+        if self.pi.wave_tx_busy():
+            # A barcode is still being transmitted; queue behind it instead of aborting it.
+            delayed = True
+            self.pi.wave_send_using_mode(wave_id, pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+        else:
+            self.pi.wave_send_once(wave_id)
+        return self.pi.get_current_tick(), delayed
+
+    def trigger(self, event_type: str, trial: int = None):
+        """Emit the pulse configured for event_type. Returns the pigpio tick of the pulse or None."""
+        wave_id = self.waves.get(event_type)
+        if wave_id is None:
+            return None
+
+        try:
+            with self.lock:
+                self._delete_retired_waves()
+                tick, delayed = self._send(wave_id)
+                self.pulses.append((event_type, time.monotonic_ns(), tick, self.event_pins[event_type], trial, delayed))
+                if event_type == "trial_start" and self.barcode_pin is not None and trial is not None:
+                    self._send_barcode(int(trial))
+        except Exception as e:
+            logger.error(f"Error sending sync pulse for {event_type}: {e}")
+            return None
+
+        if delayed:
+            logger.warning(f"Sync pulse for {event_type} delayed behind barcode (tick {tick})")
+        return tick
+
+    def _send_barcode(self, value: int):
+        """Build and queue the barcode wave for value. Must be called with self.lock held."""
+        mask = 1 << self.barcode_pin
+        bit = self.barcode_bit_us
+        pulses = [pigpio.pulse(mask, 0, 2 * bit), pigpio.pulse(0, mask, bit)]
+        for i in range(self.barcode_bits):
+            if (value >> i) & 1:
+                pulses.append(pigpio.pulse(mask, 0, bit))
+            else:
+                pulses.append(pigpio.pulse(0, mask, bit))
+        pulses.append(pigpio.pulse(0, mask, 0))
+
+        if self.barcode_wave is not None:
+            # It may still be transmitting, or chained behind another wave, so it is deleted later
+            self.retired_waves.append(self.barcode_wave)
+            self.barcode_wave = None
+            self._delete_retired_waves()
+        self.pi.wave_add_new()
+        self.pi.wave_add_generic(pulses)
+        self.barcode_wave = self.pi.wave_create()
+        # Always queued behind the trial_start pulse that precedes it
+        self.pi.wave_send_using_mode(self.barcode_wave, pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+        self.pulses.append(("barcode", time.monotonic_ns(), self.pi.get_current_tick(), [self.barcode_pin], value, False))
+
+    def on_trainer_event(self, event: str, data=None):
+        """Trigger the pulse mapped to a trainer event name, if any."""
+        event_type = self.trainer_events.get(event)
+        if event_type is None:
+            return None
+        trial = data if isinstance(data, int) and not isinstance(data, bool) else None
+        return self.trigger(event_type, trial=trial)
+
+    def drain_pulses(self):
+        """Return and remove all pulse records logged since the last call, with the t_ns each was sent at."""
+        records = []
+        while self.pulses:
+            event_type, t_ns, tick, pins, trial, delayed = self.pulses.popleft()
+            record = {"type": event_type, "t_ns": t_ns, "tick": tick, "pins": pins}
+            if trial is not None:
+                record["trial"] = trial
+            if delayed:
+                record["delayed"] = True
+            records.append(record)
+        return records
@@ -0,0 +1,238 @@
+import os
+import re
+import mmap
+import time
+import atexit
+import struct
+import threading
+import Metrics
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+# File layout (little endian), one file per series:
+#   HEADER: magic, number of levels
+#   LEVEL for each level: resolution in seconds, capacity in slots
+#   the slots of each level in turn, each SLOT: slot start (epoch seconds), min, max, sum, count
+# A value lands in slot (t // resolution) % capacity of every level, so each level is a ring
+# covering resolution * capacity seconds; a slot whose start time is outside that window is stale.
+# The current slot of each level is rewritten in place on every record, so the file is always
+# up to date and nothing is ever read back on the recording path.
+MAGIC = b"NC4TSER1"
+HEADER = struct.Struct("<8sI4x")
+LEVEL = struct.Struct("<II")
+SLOT = struct.Struct("<qdddI4x")
+
+# (resolution seconds, slots): 1 s for an hour, 1 min for a day, 1 h for 30 days
+LEVELS = ((1, 3600), (60, 1440), (3600, 720))
+
+def _series_filename(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".tsr"
+
+class TimeSeries:
+    """One metric's ring files of min/max/sum/count slots at each level, memory-mapped."""
+    def __init__(self, filepath: str, levels=LEVELS):
+        self.filepath = filepath
+        self.levels = tuple(levels)
+        self.lock = threading.Lock()
+        size = HEADER.size + LEVEL.size * len(self.levels) + SLOT.size * sum(cap for _, cap in self.levels)
+
+        exists = os.path.exists(filepath) and os.path.getsize(filepath) == size
+        if exists:
+            with open(filepath, "rb") as f:
+                magic, count = HEADER.unpack(f.read(HEADER.size))
+                stored = tuple(LEVEL.unpack(f.read(LEVEL.size)) for _ in range(count))
+            exists = magic == MAGIC and stored == self.levels
+            if not exists:
+                logger.warning(f"Time series file {filepath} has a different layout; starting it over")
+
+        with open(filepath, "r+b" if exists else "w+b") as f:
+            if not exists:
+                f.write(HEADER.pack(MAGIC, len(self.levels)))
+                for level in self.levels:
+                    f.write(LEVEL.pack(*level))
+                f.truncate(size)
+            self.map = mmap.mmap(f.fileno(), size)
+
+        # Byte offset of each level's first slot, and the slot being filled at each level
+        self.offsets = []
+        offset = HEADER.size + LEVEL.size * len(self.levels)
+        for _, capacity in self.levels:
+            self.offsets.append(offset)
+            offset += SLOT.size * capacity
+        self.current = [None] * len(self.levels)  # [offset, start, min, max, sum, count]
+
+    def record(self, value: float, t: float = None):
+        """Fold value into the current slot of every level."""
+        t = time.time() if t is None else t
+        with self.lock:
+            for i, (resolution, capacity) in enumerate(self.levels):
+                start = int(t) - int(t) % resolution
+                slot = self.current[i]
+                if slot is None or slot[1] != start:
+                    offset = self.offsets[i] + SLOT.size * ((start // resolution) % capacity)
+                    previous = SLOT.unpack_from(self.map, offset)
+                    if previous[0] == start and previous[4]:
+                        slot = [offset, start, previous[1], previous[2], previous[3], previous[4]]  # Resumed after a restart
+                    else:
+                        slot = [offset, start, value, value, 0.0, 0]
+                    self.current[i] = slot
+                if value < slot[2]:
+                    slot[2] = value
+                if value > slot[3]:
+                    slot[3] = value
+                slot[4] += value
+                slot[5] += 1
+                SLOT.pack_into(self.map, slot[0], *slot[1:])
+
+    def level_for(self, start: float, end: float) -> int:
+        """Finest level whose ring still covers start (give or take a slot, so "the last 24 h" stays at 1 min)."""
+        for i, (resolution, capacity) in enumerate(self.levels):
+            if end - start <= resolution * (capacity + 1):
+                return i
+        return len(self.levels) - 1
+
+    def query(self, start: float, end: float = None, level: int = None) -> list:
+        """[(slot start, min, mean, max)] between start and end, oldest first."""
+        end = time.time() if end is None else end
+        level = self.level_for(start, end) if level is None else level
+        resolution, capacity = self.levels[level]
+        lower = max(start - resolution, end - resolution * capacity)  # Slots overlapping start, within the ring
+        offset = self.offsets[level]
+        with self.lock:
+            data = self.map[offset:offset + SLOT.size * capacity]
+        points = [(t, lo, total / count, hi) for t, lo, hi, total, count in SLOT.iter_unpack(data)
+                  if count and lower < t <= end]
+        points.sort()
+        return points
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.map.closed:
+                self.map.flush()
+                self.map.close()
+
+class TimeSeriesStore:
+    """
+    Directory of TimeSeries, one per metric name, for looking back at controller metrics
+    without an external scraper. Each series takes a fixed amount of disk regardless of age.
+    """
+    def __init__(self, directory: str, levels=LEVELS):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.levels = tuple(levels)
+        self.series = {}
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def get(self, name: str, create: bool = True) -> TimeSeries:
+        """The series for name, opening its file; None if create is False and it has no file yet."""
+        series = self.series.get(name)
+        if series is None:
+            with self.lock:
+                series = self.series.get(name)
+                if series is None:
+                    filepath = os.path.join(self.directory, _series_filename(name))
+                    if not create and not os.path.exists(filepath):
+                        return None
+                    series = TimeSeries(filepath, self.levels)
+                    self.series = {**self.series, name: series}
+        return series
+
+    def record(self, name: str, value: float, t: float = None):
+        self.get(name).record(value, t)
+
+    def query(self, name: str, start: float, end: float = None, level: int = None) -> list:
+        """Points of a series (see TimeSeries.query); an empty list for a series never recorded."""
+        series = self.get(name, create=False)
+        return series.query(start, end, level) if series is not None else []
+
+    def names(self) -> list:
+        """Series recorded so far, including ones from earlier runs."""
+        names = set(self.series)
+        names.update(f[:-len(".tsr")] for f in os.listdir(self.directory) if f.endswith(".tsr"))
+        return sorted(names)
+
+    def flush(self):
+        for series in list(self.series.values()):
+            series.flush()
+
+    def close(self):
+        atexit.unregister(self.close)
+        for series in list(self.series.values()):
+            series.close()
+
+def histogram_mean(name: str, scale: float = 1.0):
+    """Source giving the mean of everything a Metrics histogram observed since the last call, or None."""
+    last = {"sum": None, "count": None}
+
+    def source():
+        metric = Metrics.registry.metrics.get(name)
+        if metric is None:
+            return None
+        children = list(metric.children.values())
+        total, count = sum(c.sum for c in children), sum(c.count for c in children)
+        previous_total, previous_count = last["sum"], last["count"]
+        last.update(sum=total, count=count)
+        if previous_count is None or count <= previous_count:
+            return None
+        return scale * (total - previous_total) / (count - previous_count)
+    return source
+
+def gauge_total(name: str):
+    """Source giving the sum of a Metrics gauge over its labels, or None if it doesn't exist yet."""
+    def source():
+        metric = Metrics.registry.metrics.get(name)
+        if metric is None or not metric.children:
+            return None
+        return sum(child.value for child in metric.children.values())
+    return source
+
+def cpu_temperature(path: str = "/sys/class/thermal/thermal_zone0/temp"):
+    """CPU temperature in degrees C, or None where the thermal zone doesn't exist."""
+    try:
+        with open(path) as f:
+            return int(f.read()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+class TimeSeriesSampler:
+    """Records {name: source()} into a TimeSeriesStore every interval seconds; None values are skipped."""
+    def __init__(self, store: TimeSeriesStore, sources: dict = None, interval: float = 1.0):
+        self.store = store
+        self.sources = dict(sources or {})
+        self.interval = interval
+        self.timer = threading.Timer(self.interval, self._sample)
+        self.running = False
+
+    def add_source(self, name: str, source):
+        self.sources = {**self.sources, name: source}
+
+    def start(self):
+        self.timer.cancel()
+        self.running = True
+        self.timer = threading.Timer(self.interval, self._sample)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self):
+        self.running = False
+        self.timer.cancel()
+        self.store.flush()
+
+    def _sample(self):
+        t = time.time()
+        for name, source in self.sources.items():
+            try:
+                value = source()
+                if value is not None:
+                    self.store.record(name, float(value), t)
+            except Exception as e:
+                logger.error(f"Error sampling {name} for the time series store: {e}")
+        if self.running:
+            self.timer = threading.Timer(self.interval - time.time() % self.interval, self._sample)
+            self.timer.daemon = True
+            self.timer.start()
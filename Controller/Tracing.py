@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import threading
+import collections
+from Profiler import thread_group
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+DEFAULT_CAPACITY = 100000 # Events kept per track; older ones are overwritten
+
+class Track:
+    """Ring of (phase, name, category, t_ns, dur_ns, args) events for one thread (or Timer loop)."""
+    __slots__ = ("name", "tid", "events", "owner")
+
+    def __init__(self, name: str, tid: int, capacity: int):
+        self.name = name
+        self.tid = tid
+        self.events = collections.deque(maxlen=capacity)
+        self.owner = None # Thread recording to it; None for named tracks
+
+class Span:
+    """Context manager recording a complete event from __enter__ to __exit__."""
+    __slots__ = ("tracer", "name", "category", "args", "start", "track")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.track = self.tracer.track()  # Taken at the start, so a track is never handed on while a span is open
+        self.start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.monotonic_ns()
+        self.track.events.append(("X", self.name, self.category, self.start, end - self.start, self.args))
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class Tracer:
+    """
+    Records spans and instant events for a timeline of everything the controller does,
+    exported as Chrome trace JSON (chrome://tracing, ui.perfetto.dev).
+
+    Each thread appends to its own bounded deque, found through a threading.local, so
+    recording takes no lock; only the first event of a new thread takes one, to register
+    its track. Threads are grouped by name without the counter (Profiler.thread_group), and
+    a thread takes over a track of its group once the track's last thread has ended, so each
+    Timer loop keeps one track however many threads it goes through, while threads of a
+    group that run at the same time get a track each and their spans never overlap. Events can
+    also go to a named track, such as the trainer state timeline. Times are
+    time.monotonic_ns(), the clock of the data file's t_ns, so a trace lines up with the
+    session's events.
+    """
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, enabled: bool = True):
+        self.capacity = capacity # Applies to tracks registered after it changes
+        self.enabled = enabled
+        self.tracks = {} # Track name -> Track; replaced, never mutated, so export can iterate it
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.generation = 0 # Bumped by clear(), so threads look their track up again
+
+    def track(self, name: str = None) -> Track:
+        """The calling thread's track, or the named one."""
+        if name is None:
+            track = getattr(self.local, "track", None)
+            if track is not None and self.local.generation == self.generation:
+                return track
+            track = self._register_thread(threading.current_thread())
+            self.local.track = track
+            self.local.generation = self.generation
+            return track
+        track = self.tracks.get(name)
+        return track if track is not None else self._register(name)
+
+    def _register(self, name: str) -> Track:
+        with self.lock:
+            track = self.tracks.get(name)
+            if track is None:
+                track = Track(name, len(self.tracks) + 1, self.capacity)
+                self.tracks = {**self.tracks, name: track}
+        return track
+
+    def _register_thread(self, thread) -> Track:
+        """The first track of thread's group whose thread has ended, or a new one: "group", "group (2)", ..."""
+        group = thread_group(thread.name)
+        with self.lock:
+            name, lane = group, 1
+            while True:
+                track = self.tracks.get(name)
+                if track is None:
+                    track = Track(name, len(self.tracks) + 1, self.capacity)
+                    self.tracks = {**self.tracks, name: track}
+                    break
+                if track.owner is not None and not track.owner.is_alive():
+                    break
+                lane += 1
+                name = f"{group} ({lane})"
+            track.owner = thread
+        return track
+
+    def span(self, name: str, category: str, args: dict = None):
+        """with tracer.span("name", "category"): ... records how long the block took."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def instant(self, name: str, category: str, args: dict = None, track: str = None):
+        if self.enabled:
+            self.track(track).events.append(("i", name, category, time.monotonic_ns(), 0, args))
+
+    def complete(self, name: str, category: str, start_ns: int, end_ns: int = None, args: dict = None, track: str = None):
+        """Record a span whose start (and end) the caller already measured with time.monotonic_ns()."""
+        if self.enabled:
+            end_ns = time.monotonic_ns() if end_ns is None else end_ns
+            self.track(track).events.append(("X", name, category, start_ns, end_ns - start_ns, args))
+
+    def clear(self):
+        with self.lock:
+            self.tracks = {}
+            self.generation += 1
+
+    def events(self, process_name: str = None) -> list:
+        """All recorded events as Chrome trace event dicts, with thread (and process) name metadata."""
+        pid = os.getpid()
+        events = []
+        if process_name:
+            events.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": process_name}})
+        for track in list(self.tracks.values()):
+            events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": track.tid, "args": {"name": track.name}})
+            events.append({"ph": "M", "name": "thread_sort_index", "pid": pid, "tid": track.tid, "args": {"sort_index": track.tid}})
+            for phase, name, category, t_ns, dur_ns, args in list(track.events):  # Copied under the GIL
+                event = {"ph": phase, "name": name, "cat": category, "ts": t_ns / 1000, "pid": pid, "tid": track.tid}
+                if phase == "X":
+                    event["dur"] = dur_ns / 1000
+                else:
+                    event["s"] = "t"
+                if args:
+                    event["args"] = args
+                events.append(event)
+        return events
+
+    def export(self, filepath: str, process_name: str = None) -> str:
+        """Write the trace as Chrome trace JSON; returns filepath."""
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        events = self.events(process_name)
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                # ts is time.monotonic_ns() / 1000; this converts it to wall clock time
+                "wall_clock_anchor": {"time_ns": time.time_ns(), "monotonic_ns": time.monotonic_ns()},
+                # Tracks whose ring filled up, so their oldest events were overwritten
+                "truncated_tracks": [t.name for t in list(self.tracks.values()) if len(t.events) == t.events.maxlen],
+            },
+        }
+        text = json.dumps(trace, separators=(",", ":"), default=str)  # dumps() uses the C encoder, dump() doesn't
+        with open(filepath, "w") as f:
+            f.write(text)
+        logger.info(f"Trace of {len(events)} events written to {filepath}")
+        return filepath
+
+# The process-wide tracer and shortcuts to it; Session turns it on with trace_enabled
+tracer = Tracer(enabled=False)
+span = tracer.span
+instant = tracer.instant
+complete = tracer.complete
+export = tracer.export
@@ -17,7 +17,7 @@ class VirtualBeamBreak:
 
     def __init__(self, pi=None, pin=4, beam_break_memory=0.2):
         self.pin = pin
-        self.last_break_time = time.time()
+        self.last_break_time = time.monotonic()
         self.beam_break_memory = beam_break_memory
         self.read_interval = 0.05
         self.read_timer = None
@@ -31,7 +31,7 @@ class VirtualBeamBreak:
         if not self._is_active:
             return
 
-        current_time = time.time()
+        current_time = time.monotonic()
 
         # Check if memory time has expired
         if current_time - self.last_break_time > self.beam_break_memory:
@@ -69,7 +69,7 @@ class VirtualBeamBreak:
             duration: If provided, automatically restore beam after this many seconds.
                      If None, beam stays broken until manually restored.
         """
-        self.last_break_time = time.time()
+        self.last_break_time = time.monotonic()
         self.state = 0
         logger.info("Virtual beam broken")
 
@@ -77,7 +77,7 @@ class VirtualBeamBreak:
             def restore_beam():
                 time.sleep(duration)
                 # Only restore if memory has expired
-                if time.time() - self.last_break_time > self.beam_break_memory:
+                if time.monotonic() - self.last_break_time > self.beam_break_memory:
                     self.state = 1
                     logger.info("Virtual beam automatically restored")
 
@@ -86,7 +86,7 @@ class VirtualBeamBreak:
     def simulate_restore(self):
         """Manually restore the beam (simulate animal leaving)."""
         # Set last_break_time far enough in the past that memory expires
-        self.last_break_time = time.time() - (self.beam_break_memory + 0.1)
+        self.last_break_time = time.monotonic() - (self.beam_break_memory + 0.1)
         self.state = 1
         logger.info("Virtual beam manually restored")
 
@@ -142,7 +142,7 @@ class VirtualChamber:
         """Virtual method - no compilation needed."""
         logger.info("Virtual Chamber: Sketch compilation skipped (virtual mode)")
 
-    def arduino_cli_discover(self):
+    def arduino_cli_discover(self, operation=None):
         """Virtual method - simulates board discovery."""
         logger.info("Virtual Chamber: Board discovery skipped (virtual mode)")
         self.discovered_boards = [f"VIRTUAL_PORT_{i}" for i in range(3)]
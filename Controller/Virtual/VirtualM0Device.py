@@ -88,6 +88,7 @@ class VirtualM0Device:
         self.stop_flag.clear()
         self._virtual_read_thread = threading.Thread(
             target=self._virtual_read_loop,
+            name=f"{self.id} serial",
             daemon=True
         )
         self._virtual_read_thread.start()
@@ -31,13 +31,13 @@ class VirtualReward:
     def dispense(self):
         """Turn on the pump (start dispensing)."""
         self._is_dispensing = True
-        self._dispense_start_time = time.time()
+        self._dispense_start_time = time.monotonic()
         logger.info("Virtual Reward pump DISPENSING")
 
     def stop(self):
         """Stop the pump."""
         if self._is_dispensing:
-            duration = time.time() - self._dispense_start_time if self._dispense_start_time else 0
+            duration = time.monotonic() - self._dispense_start_time if self._dispense_start_time else 0
             self._total_dispensed += 1
             logger.info(f"Virtual Reward pump STOPPED (dispensed for {duration:.2f}s)")
         self._is_dispensing = False
@@ -49,7 +49,7 @@ class VirtualReward:
         """Get current pump state."""
         current_duration = 0
         if self._is_dispensing and self._dispense_start_time:
-            current_duration = time.time() - self._dispense_start_time
+            current_duration = time.monotonic() - self._dispense_start_time
 
         return {
             'is_dispensing': self._is_dispensing,
@@ -1,14 +1,22 @@
 # Create a WebUI using NiceUI that replicates the functionality of TUI
-from nicegui import ui
+from nicegui import ui, app
+from fastapi import Response
 from datetime import datetime
 import logging
 import asyncio
 
 from trainers import get_trainers
 from helpers import get_ip_address, get_best_ip_address
-from Session import Session
+from Session import Session, log_pipeline
+from LogPipeline import RingBufferHandler
+from ChamberState import SessionStatePublisher
+from HardwareWorker import HardwareWorker, LoopLagMonitor, OperationCancelled
+from TimeSeriesStore import histogram_mean
 from file_picker import file_picker
 from M0Device import M0Mode, M0Device
+import SubsystemLog
+import Metrics
+import Tracing
 import time
 
 import logging
@@ -17,21 +25,18 @@ logger = logging.getLogger(f"session_logger.{__name__}")
 
 #TODO: Work on the UI to make it more user friendly and visually appealing
 
-class LogElementHandler(logging.Handler):
-    """A logging handler that emits messages to a log element.
-        https://nicegui.io/documentation/log    
-    """
+LOG_UPDATE_INTERVAL = 0.5 # Seconds between batched log updates to each client
+LOG_MAX_LINES = 10 # Lines shown in each client's log element
+STATE_SAMPLE_INTERVAL = 0.1 # Seconds between samples of the chamber state; clients only get the changes
+STATE_FEED_TIMEOUT = 10.0 # Longest a fleet dashboard's /api/state request waits for a change
+METRICS_PLOT_INTERVAL = 60.0 # Seconds between refreshes of the metrics history plot
+METRICS_PLOT_RANGES = {"1 h": 3600, "24 h": 86400, "30 d": 30 * 86400}
 
-    def __init__(self, element: ui.log, level: int = logging.NOTSET) -> None:
-        self.element = element
-        super().__init__(level)
-
-    def emit(self, record: logging.LogRecord) -> None:
-        try:
-            msg = self.format(record)
-            self.element.push(msg)
-        except Exception:
-            self.handleError(record)
+# Per-client elements updated from chamber state changes
+STATE_ELEMENTS = [f"{side}_m0_{label}" for side in ("left", "middle", "right") for label in ("port_label", "mode_label", "version_label")] + \
+    ["house_led_brightness_slider", "pump_test_button", "reward_led_test_button", "punishment_led_test_button",
+     "trainer_state_label", "trial_summary_label", "operation_label", "loop_lag_label", "cancel_operation_button",
+     "profiler_toggle", "profile_label", "trace_toggle", "trace_label"]
 
 class WebUI:
     def __init__(self, video_port=8080, ui_port=8081):
@@ -45,6 +50,29 @@ class WebUI:
         session_config = {"chamber_name": self.chamber_name} if self.chamber_name else {}
         self.session = Session(session_config=session_config)
 
+        # One shared buffer of recent log lines; each client polls it at LOG_UPDATE_INTERVAL
+        self.log_buffer = RingBufferHandler(capacity=500)
+        self.log_buffer.setFormatter(logging.Formatter('[%(asctime)s:%(name)s] %(message)s'))
+        self.log_client_levels = {} # Client id -> minimum level shown to that client
+        self.update_log_buffer_level()
+        log_pipeline.add_handler(self.log_buffer)
+
+        # Blocking M0 operations run on one worker thread so they never stall the event loop
+        self.hardware_worker = HardwareWorker()
+        self.loop_lag = LoopLagMonitor()
+        app.on_startup(self.loop_lag.start)
+        app.on_shutdown(self.hardware_worker.shutdown)
+        self.session.timeseries_sampler.add_source("ui_loop_lag_ms", histogram_mean("ui_loop_lag_seconds", 1000.0))
+
+        # One publisher samples the chamber and pushes changed fields to every connected client
+        self.state_publisher = SessionStatePublisher(self.session, sources=[self.hardware_worker.status, self.loop_lag.status,
+                                                                            self.profiler_status, self.trace_status])
+        app.timer(STATE_SAMPLE_INTERVAL, self.state_publisher.refresh)
+        # Long-poll delta feed for the fleet dashboard; a plain def so FastAPI runs the wait in its thread pool
+        app.add_api_route("/api/state", self.state_feed, methods=["GET"])
+        app.add_api_route("/metrics", self.metrics, methods=["GET"])
+        Metrics.add_collector(self.ui_metrics)
+
         # Initialize UI elements
         # self.init_ui()
 
@@ -65,89 +93,169 @@ class WebUI:
 
         return f"Chamber{chamber_number}"
     
-    def update_state(self):
-        """Periodically update the state of the UI elements based on the session state."""
-        # Update M0 status labels
-        left_m0 = self.session.chamber.get_left_m0()
-        if left_m0 is not None:
-            self.left_m0_port_label.set_text(f"Port: {left_m0.port}")
-            self.left_m0_mode_label.set_text(f"Mode: {left_m0.mode.name}")
-            self.left_m0_version_label.set_text(f"Firmware: {left_m0.firmware_version}")
-        else:
-            self.left_m0_port_label.set_text("Port: N/A")
-            self.left_m0_mode_label.set_text("Mode: N/A")
-            self.left_m0_version_label.set_text("Firmware: N/A")
-
-        middle_m0 = self.session.chamber.get_middle_m0()
-        if middle_m0 is not None:
-            self.middle_m0_port_label.set_text(f"Port: {middle_m0.port}")
-            self.middle_m0_mode_label.set_text(f"Mode: {middle_m0.mode.name}")
-            self.middle_m0_version_label.set_text(f"Firmware: {middle_m0.firmware_version}")
-        else:
-            self.middle_m0_port_label.set_text("Port: N/A")
-            self.middle_m0_mode_label.set_text("Mode: N/A")
-            self.middle_m0_version_label.set_text("Firmware: N/A")
-
-        right_m0 = self.session.chamber.get_right_m0()
-        if right_m0 is not None:
-            self.right_m0_port_label.set_text(f"Port: {right_m0.port}")
-            self.right_m0_mode_label.set_text(f"Mode: {right_m0.mode.name}")
-            self.right_m0_version_label.set_text(f"Firmware: {right_m0.firmware_version}")
-        else:
-            self.right_m0_port_label.set_text("Port: N/A")
-            self.right_m0_mode_label.set_text("Mode: N/A")
-            self.right_m0_version_label.set_text("Firmware: N/A")
-
-        self.house_led_brightness_slider.set_value(100.0 * self.session.chamber.house_led.brightness / 255.0)
-        self.pump_test_button.set_value(self.session.chamber.reward.state)
-        self.reward_led_test_button.set_value(self.session.chamber.reward_led.active)
-        # self.reward_color_input.set_value(self.rgb_to_hex(self.session.chamber.reward_led.color))
-        self.punishment_led_test_button.set_value(self.session.chamber.punishment_led.active)
-        # self.punishment_color_input.set_value(self.rgb_to_hex(self.session.chamber.punishment_led.color))
+    def state_feed(self, since: int = 0, epoch: str = None, timeout: float = STATE_FEED_TIMEOUT):
+        """Feed fields changed after version `since`, waiting up to timeout for the next change."""
+        content = self.state_publisher.state.feed(since, epoch, min(max(timeout, 0.0), STATE_FEED_TIMEOUT), self.chamber_name)
+        return Response(content=content, media_type="application/json")
+
+    def profiler_status(self) -> dict:
+        last = self.session.last_profile
+        return {"profiling": self.session.profiling, "last_profile": last[0] if last else None}
+
+    def trace_status(self) -> dict:
+        return {"tracing": Tracing.tracer.enabled, "last_trace": self.session.last_trace}
+
+    async def export_trace(self):
+        """Export the trace on a thread; a long session's trace takes a moment to encode."""
+        await asyncio.to_thread(self.session.export_trace)
+
+    def metrics(self):
+        """Prometheus text format metrics of the whole controller."""
+        return Response(content=Metrics.render(), media_type=Metrics.CONTENT_TYPE)
+
+    def ui_metrics(self):
+        state = self.state_publisher.state
+        yield "ui_clients", "gauge", "Connected WebUI clients", [({}, len(self.log_client_levels))]
+        yield "ui_state_subscribers", "gauge", "Chamber state subscribers", [({}, len(state.subscribers))]
+        yield "ui_state_version", "counter", "Chamber state changes published", [({}, state.version)]
+
+    def update_log_buffer_level(self):
+        """Only format records that some connected client will show."""
+        level = min(self.log_client_levels.values(), default=logging.INFO)
+        log_pipeline.set_handler_level(self.log_buffer, level)
+
+    def init_log_element(self, log):
+        """Feed a client's log element from the shared buffer with batched updates, filtered by the client's level."""
+        client = ui.context.client
+        client_level = {"level": logging.DEBUG}
+        last_seq = {"seq": max(self.log_buffer.seq - LOG_MAX_LINES, 0)}
+
+        def push_logs():
+            last_seq["seq"], lines = self.log_buffer.read(last_seq["seq"], client_level["level"], limit=LOG_MAX_LINES)
+            for line in lines:
+                log.push(line)
+
+        def set_level(level_name):
+            client_level["level"] = getattr(logging, level_name)
+            self.log_client_levels[client.id] = client_level["level"]
+            self.update_log_buffer_level()
+
+        def connect():
+            self.log_client_levels[client.id] = client_level["level"]
+            self.update_log_buffer_level()
+
+        def disconnect():
+            self.log_client_levels.pop(client.id, None)
+            self.update_log_buffer_level()
+
+        connect()
+        client.on_connect(connect)
+        client.on_disconnect(disconnect)
+        ui.timer(LOG_UPDATE_INTERVAL, push_logs)
+        return set_level
+
+    def init_state_updates(self):
+        """Subscribe this client's elements to chamber state changes, starting from the full current state."""
+        client = ui.context.client
+        elements = {name: getattr(self, name) for name in STATE_ELEMENTS}  # This client's elements
+        state = self.state_publisher.state
+
+        def on_change(changed):
+            self.apply_state(elements, changed)
+
+        def connect():
+            state.subscribe(on_change)
+            self.apply_state(elements, state.snapshot(), full=True)
+
+        connect()
+        client.on_connect(connect)
+        client.on_disconnect(lambda: state.unsubscribe(on_change))
+
+    def apply_state(self, elements, changed, full=False):
+        """Update only the elements whose chamber state fields changed."""
+        for side, m0_id in (("left", "M0_0"), ("middle", "M0_1"), ("right", "M0_2")):
+            for field, label, prefix in (("port", "port_label", "Port"), ("mode", "mode_label", "Mode"),
+                                         ("firmware", "version_label", "Firmware")):
+                key = f"m0.{m0_id}.{field}"
+                if key in changed:
+                    elements[f"{side}_m0_{label}"].set_text(f"{prefix}: {changed[key]}")
+                elif full:
+                    elements[f"{side}_m0_{label}"].set_text(f"{prefix}: N/A")
+
+        if changed.get("house_led_brightness") is not None:
+            elements["house_led_brightness_slider"].set_value(100.0 * changed["house_led_brightness"] / 255.0)
+        if "pump" in changed:
+            elements["pump_test_button"].set_value(changed["pump"])
+        if "reward_led" in changed:
+            elements["reward_led_test_button"].set_value(changed["reward_led"])
+        if "punishment_led" in changed:
+            elements["punishment_led_test_button"].set_value(changed["punishment_led"])
+
+        if "trainer_state" in changed or "trial" in changed:
+            fields = self.state_publisher.state.fields
+            elements["trainer_state_label"].set_text(f"State: {fields.get('trainer_state') or '-'}  "
+                                                     f"Trial: {fields.get('trial') if fields.get('trial') is not None else '-'}")
+        if "operation" in changed or "operation_state" in changed or "operation_progress" in changed:
+            fields = self.state_publisher.state.fields
+            if fields.get("operation"):
+                elements["operation_label"].set_text(f"{fields['operation']}: {fields.get('operation_state')} "
+                                                     f"{fields.get('operation_progress') or ''}".strip())
+            elements["cancel_operation_button"].set_visibility(fields.get("operation_state") in ("queued", "running"))
+        if "profiling" in changed:
+            elements["profiler_toggle"].set_value(int(changed["profiling"]))
+        if changed.get("last_profile"):
+            elements["profile_label"].set_text(f"Last profile: {changed['last_profile']}")
+        if "tracing" in changed:
+            elements["trace_toggle"].set_value(int(changed["tracing"]))
+        if changed.get("last_trace"):
+            elements["trace_label"].set_text(f"Last trace: {changed['last_trace']}")
+        if "loop_lag_ms" in changed:
+            elements["loop_lag_label"].set_text(f"UI loop lag: {changed['loop_lag_ms']} ms")
+        summary = changed.get("summary")
+        if summary is not None:
+            accuracy = f"{100 * summary['accuracy']:.0f}%" if summary["accuracy"] is not None else "-"
+            elements["trial_summary_label"].set_text(f"Trials: {summary['trials']}  Correct: {summary['correct']}  "
+                                                     f"Accuracy: {accuracy}  Omissions: {summary['omissions']}")
+
+    async def run_hardware_operation(self, name, fn, button, spinner):
+        """Run a blocking chamber method on the hardware worker, showing progress on its button while the UI stays live."""
+        operation = self.hardware_worker.submit(name, fn)
+        if operation is None:
+            ui.notify(f"{self.hardware_worker.current.name} is still running", type="warning")
+            return
+        button.props('color=red')
+        spinner.visible = True
+        try:
+            await asyncio.wrap_future(operation.future)
+        except OperationCancelled:
+            ui.notify(f"{name} cancelled", type="warning")
+        except Exception as e:
+            ui.notify(f"{name} failed: {e}", type="negative")
+        finally:
+            button.props('color=blue')
+            spinner.visible = False
 
     async def m0_discover(self):
-        self.discover_button.props('color=red')
-        self.discover_button_spinner.visible = True
-        await asyncio.sleep(0.1)  # Briefly change button color to indicate action
-        self.session.chamber.arduino_cli_discover()
-        self.discover_button.props('color=blue')
-        self.discover_button_spinner.visible = False
+        await self.run_hardware_operation("Discover", self.session.chamber.arduino_cli_discover,
+                                          self.discover_button, self.discover_button_spinner)
     
     async def m0_reopen_serial(self):
-        self.open_serial_button.props('color=red')
-        self.open_serial_button_spinner.visible = True
-        await asyncio.sleep(0.1)  # Briefly change button color to indicate action
-        self.session.chamber.m0_reopen_serial()
-        await asyncio.sleep(2.0)  # Wait a moment for the serial port to reopen before updating M0 status
-        self.open_serial_button.props('color=blue')
-        self.open_serial_button_spinner.visible = False
+        await self.run_hardware_operation("Open serial", self.session.chamber.m0_reopen_serial,
+                                          self.open_serial_button, self.open_serial_button_spinner)
     
     async def m0_close_serial(self):
-        self.close_serial_button.props('color=red')
-        self.close_serial_button_spinner.visible = True
-        await asyncio.sleep(0.1)  # Briefly change button color to indicate action
-        self.session.chamber.m0_close_serial()
-        self.close_serial_button.props('color=blue')
-        self.close_serial_button_spinner.visible = False
+        await self.run_hardware_operation("Close serial", self.session.chamber.m0_close_serial,
+                                          self.close_serial_button, self.close_serial_button_spinner)
     
     async def m0_sync_images(self):
-        self.sync_images_button.props('color=red')
-        self.sync_images_button_spinner.visible = True
-        await asyncio.sleep(0.1)  # Briefly change button color to indicate action
-        self.session.chamber.m0_sync_images()
-        self.sync_images_button.props('color=blue')
-        self.sync_images_button_spinner.visible = False
+        await self.run_hardware_operation("Sync images", self.session.chamber.m0_sync_images,
+                                          self.sync_images_button, self.sync_images_button_spinner)
     
     async def m0_upload_sketches(self):
-        self.upload_code_button.props('color=red')
-        self.upload_code_button_spinner.visible = True
-        await asyncio.sleep(0.1)  # Briefly change button color to indicate action
-        self.session.chamber.m0_upload_sketches()
-        self.upload_code_button.props('color=blue')
-        self.upload_code_button_spinner.visible = False
+        await self.run_hardware_operation("Upload code", self.session.chamber.m0_upload_sketches,
+                                          self.upload_code_button, self.upload_code_button_spinner)
 
     def init_ui(self):
-        ui.timer(1, self.update_state)  # Start a timer to update M0 status labels every second
         ui.label(f"{self.chamber_name} Control Panel").style('font-size: 24px; font-weight: bold; text-align: center; margin-top: 20px;')
         with ui.row():
             with ui.column():
@@ -193,16 +301,20 @@ class WebUI:
                 with ui.card():
                     ui.label('Log').style('font-size: 18px; font-weight: bold; text-align: center; margin-top: 20px;')
 
-                    log = ui.log(max_lines=10).classes('w-full').style('width: 800px; height: 200px;')
-                    self.log_handler = LogElementHandler(log)
-                    formatter = logging.Formatter('[%(asctime)s:%(name)s] %(message)s')
-                    self.log_handler.setFormatter(formatter)
-                    session_logger.addHandler(self.log_handler)
-                    ui.context.client.on_disconnect(lambda: logger.removeHandler(self.log_handler))
+                    log = ui.log(max_lines=LOG_MAX_LINES).classes('w-full').style('width: 800px; height: 200px;')
+                    set_log_level = self.init_log_element(log)
 
                     ui.label('Log Level:').style('width: 200px;')
-                    self.log_level_input = ui.select(['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], value='DEBUG').style('width: 200px;')
-                    self.log_level_input.on('change', lambda e: self.log_handler.setLevel(getattr(logging, e.value)))
+                    self.log_level_input = ui.select(['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], value='DEBUG',
+                                                     on_change=lambda e: set_log_level(e.value)).style('width: 200px;')
+
+                    ui.label('Subsystem Log Levels:').style('width: 200px;')
+                    with ui.row():
+                        subsystem_levels = SubsystemLog.get_levels()
+                        for subsystem in SubsystemLog.SUBSYSTEMS:
+                            ui.select(['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], label=subsystem,
+                                      value=subsystem_levels[subsystem],
+                                      on_change=lambda e, subsystem=subsystem: self.session.set_log_level(subsystem, e.value)).style('width: 120px;')
 
                 with ui.card():
                     ui.label('Camera Control').style('font-size: 18px; font-weight: bold; text-align: center; margin-top: 20px;')
@@ -256,6 +368,11 @@ class WebUI:
                         # ui.label("Upload Code").style('color: white;')
                         self.upload_code_button_spinner = ui.spinner(color='white').style('margin-left: 10px;')
                         self.upload_code_button_spinner.visible = False
+
+                    self.operation_label = ui.label("No operation running")
+                    self.cancel_operation_button = ui.button(text="Cancel", color="grey").on_click(self.hardware_worker.cancel)
+                    self.cancel_operation_button.set_visibility(False)
+                    self.loop_lag_label = ui.label("UI loop lag: 0 ms")
                     
                 with ui.card():
                         ui.label('Left M0').style('font-size: 18px; font-weight: bold; text-align: center; margin-top: 20px;')
@@ -283,6 +400,17 @@ class WebUI:
                     self.stop_training_button = ui.button("Stop Training").on_click(self.session.stop_training)
                     self.start_priming_button = ui.button("Start Priming").on_click(self.session.start_priming)
                     self.stop_priming_button = ui.button("Stop Priming").on_click(self.session.stop_priming)
+                    self.trainer_state_label = ui.label("State: -")
+                    self.trial_summary_label = ui.label("Trials: 0")
+                    # Sample all threads for profile_duration seconds; the profile is written to the log directory
+                    self.profiler_toggle = ui.toggle({0: "Profiler off", 1: "Profiler on"}, value=int(self.session.profiling),
+                                                     on_change=lambda e: self.session.start_profiling() if e.value else self.session.stop_profiling())
+                    self.profile_label = ui.label("Last profile: -")
+                    # Timeline of ticks, serial traffic, GPIO and data file writes; open the file in ui.perfetto.dev
+                    self.trace_toggle = ui.toggle({0: "Trace off", 1: "Trace on"}, value=int(Tracing.tracer.enabled),
+                                                  on_change=lambda e: self.session.set_tracing(bool(e.value)))
+                    self.export_trace_button = ui.button("Export Trace").on_click(self.export_trace)
+                    self.trace_label = ui.label("Last trace: -")
             
             with ui.column():
                 with ui.card():
@@ -316,7 +444,47 @@ class WebUI:
                     self.right_m0_cmd_input = ui.input(value = "")
                     self.right_m0_cmd_button = ui.button("Send").on_click(lambda: self.session.chamber.get_right_m0().send_command(self.right_m0_cmd_input.value) if self.session.chamber.get_right_m0() is not None else ui.notify("Right M0 not found", type="negative"))
 
+        with ui.card().style('width: 100%;'):
+            ui.label('Metrics History').style('font-size: 18px; font-weight: bold; text-align: center; margin-top: 20px;')
+            self.init_metrics_plot()
+
+        self.init_state_updates()
+
     
+    def init_metrics_plot(self):
+        """Plot one recorded metric from the local time series store; refreshed every METRICS_PLOT_INTERVAL."""
+        store = self.session.timeseries
+        names = store.names()
+        with ui.row():
+            series_select = ui.select(names, value="tick_lateness_ms" if "tick_lateness_ms" in names else (names[0] if names else None),
+                                      label="Metric").style('width: 250px;')
+            range_select = ui.select(list(METRICS_PLOT_RANGES), value="24 h", label="Range").style('width: 100px;')
+        chart = ui.echart({
+            "tooltip": {"trigger": "axis"},
+            "legend": {"data": ["max", "mean", "min"]},
+            "xAxis": {"type": "time"},
+            "yAxis": {"type": "value", "scale": True},
+            "series": [{"name": name, "type": "line", "showSymbol": False, "data": []} for name in ("max", "mean", "min")],
+        }).style('width: 100%; height: 300px;')
+
+        def refresh():
+            if series_select.value is None:
+                return
+            end = time.time()
+            points = store.query(series_select.value, end - METRICS_PLOT_RANGES[range_select.value], end)
+            for series, column in zip(chart.options["series"], (3, 2, 1)):
+                series["data"] = [[1000 * point[0], round(point[column], 3)] for point in points]
+            chart.update()
+
+        def refresh_names():
+            series_select.set_options(store.names(), value=series_select.value)
+            refresh()
+
+        series_select.on_value_change(lambda e: refresh())
+        range_select.on_value_change(lambda e: refresh())
+        refresh()
+        ui.timer(METRICS_PLOT_INTERVAL, refresh_names)
+
     def rgb_to_hex(self, rgb):
         return '#%02x%02x%02x' % tuple(rgb)
 
@@ -0,0 +1,430 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+import tarfile
+from array import array
+from datetime import datetime
+from os.path import expanduser
+
+from BinaryEventLog import COLUMNS, BLOB_KINDS, TRIAL_START_EVENT, BinaryEventLogReader, encode_payload, encode_columns, _padding
+from analysis.DataReader import iter_data_file, legacy_timestamp_ns
+from analysis.SessionCatalog import parse_data_filename, DATA_FILE_SUFFIXES, LOG_FILE_PATTERN, PARTITION_DIR, ARCHIVE_DIR
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+# Partition layout (little endian), one file per month and chamber at <root>/<YYYY-MM>/<chamber>.nc4p:
+#   PARTITION_MAGIC
+#   one segment per session: the BinaryEventLog COLUMNS, each padded to 8 bytes, then the session's
+#     string/JSON payloads; their ival is relative to the segment start, so segments can be copied verbatim
+#   footer: JSON index {"strings": [event names], "sessions": [{source, rodent, trainer, date, rows, offset, ...}]}
+#   FOOTER_TAIL: footer length, PARTITION_MAGIC
+# Readers load only the footer, filter sessions on it and then map just the matching segments.
+PARTITION_MAGIC = b"NC4PART2"
+FOOTER_TAIL = struct.Struct("<Q8s")
+PARTITION_SUFFIX = ".nc4p"
+PARTITION_FORMAT = 2
+
+def _sha256_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _record_t_ns(record: dict) -> int:
+    t_ns = record.get("t_ns")
+    if t_ns is None:
+        try:
+            t_ns = legacy_timestamp_ns(record["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            t_ns = 0
+    return int(t_ns)
+
+def count_events(path: str) -> int:
+    """Number of event records (excluding the header) in a data file."""
+    return sum(1 for record in iter_data_file(path) if isinstance(record, dict) and "header" not in record)
+
+class PartitionReader:
+    """Reads a partition's footer index and maps the segments of selected sessions."""
+    # Payloads are decoded exactly as in single-session binary logs
+    payload = BinaryEventLogReader.payload
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.file = open(filepath, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self.mm)
+        if size < len(PARTITION_MAGIC) + FOOTER_TAIL.size or self.mm[:len(PARTITION_MAGIC)] != PARTITION_MAGIC:
+            self.close()
+            raise ValueError(f"{filepath} is not an NC4Touch partition (of format {PARTITION_MAGIC.decode()})")
+        footer_size, magic = FOOTER_TAIL.unpack_from(self.mm, size - FOOTER_TAIL.size)
+        if magic != PARTITION_MAGIC:
+            self.close()
+            raise ValueError(f"{filepath} has no footer; it was not completely written")
+        footer_start = size - FOOTER_TAIL.size - footer_size
+        self.footer = json.loads(bytes(self.mm[footer_start:footer_start + footer_size]))
+        self.strings = self.footer["strings"]
+        self.data_end = footer_start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            self.mm.close()
+        except BufferError:
+            pass  # arrays still reference the map; it is released when they are
+        self.file.close()
+
+    @property
+    def dtype(self):
+        return np.dtype([(name, dtype) for name, _, dtype in COLUMNS])
+
+    def sessions(self, rodent: str = None, trainer: str = None, start_date: str = None, end_date: str = None) -> list:
+        """Index entries of the sessions matching all given predicates; dates are inclusive "YYYY-MM-DD"."""
+        return [s for s in self.footer["sessions"]
+                if (rodent is None or s["rodent"] == rodent)
+                and (trainer is None or s["trainer"] == trainer)
+                and (start_date is None or s["date"] >= start_date)
+                and (end_date is None or s["date"] <= end_date)]
+
+    def segment_bytes(self, session: dict) -> bytes:
+        return self.mm[session["offset"]:session["offset"] + session["nbytes"]]
+
+    def read_session(self, session: dict):
+        """Return one session's events as a NumPy structured array."""
+        if np is None:
+            logger.error("numpy is not available; cannot read partitions")
+            raise RuntimeError("numpy is not available; cannot read partitions")
+        rows = session["rows"]
+        records = np.empty(rows, dtype=self.dtype)
+        offset = session["offset"]
+        for name, _, dtype in COLUMNS:
+            column_dtype = np.dtype(dtype)
+            records[name] = np.frombuffer(self.mm, dtype=column_dtype, count=rows, offset=offset)
+            nbytes = rows * column_dtype.itemsize
+            offset += nbytes + _padding(nbytes)
+        # Payload offsets are stored relative to the segment; make them file offsets for payload()
+        blob = np.isin(records["kind"], BLOB_KINDS)
+        records["ival"][blob] += session["offset"]
+        return records
+
+class PartitionWriter:
+    """Writes a new partition file, optionally starting with the sessions of an existing one."""
+    def __init__(self, filepath: str, chamber: str, month: str, existing: PartitionReader = None):
+        self.filepath = filepath
+        self.file = open(filepath, "wb")
+        self.file.write(PARTITION_MAGIC)
+        self.footer = {"format": PARTITION_FORMAT, "chamber": chamber, "month": month, "strings": [], "sessions": []}
+        self.string_codes = {}
+        if existing is not None:
+            # Existing segments are copied verbatim; their string codes stay valid because the table only grows
+            for value in existing.strings:
+                self._string_code(value)
+            for session in existing.footer["sessions"]:
+                segment = existing.segment_bytes(session)
+                self.footer["sessions"].append(dict(session, offset=self.file.tell()))
+                self.file.write(segment)
+
+    def _string_code(self, value: str) -> int:
+        code = self.string_codes.get(value)
+        if code is None:
+            code = len(self.footer["strings"])
+            if code > 0xFFFF:
+                raise OverflowError("Partition has more than 65536 distinct event names")
+            self.string_codes[value] = code
+            self.footer["strings"].append(value)
+        return code
+
+    def add_session(self, path: str, fields: dict) -> dict:
+        """Encode one data file as a segment and return its index entry."""
+        columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+        blob = bytearray()
+        blob_rows = array("i")
+        header = {}
+        trial = -1
+        for record in iter_data_file(path):
+            if not isinstance(record, dict):
+                continue
+            if "header" in record:
+                header = record["header"]
+                continue
+            event = record.get("event")
+            data = record.get("data")
+            if event == TRIAL_START_EVENT and isinstance(data, int) and not isinstance(data, bool):
+                trial = data
+            code = self._string_code(str(event))
+            ival, fval, size, kind = encode_payload(data, blob)
+            if kind in BLOB_KINDS:
+                blob_rows.append(len(columns["t_ns"]))
+            columns["t_ns"].append(_record_t_ns(record))
+            columns["ival"].append(ival)
+            columns["fval"].append(fval)
+            columns["trial"].append(trial)
+            columns["size"].append(size)
+            columns["code"].append(code)
+            columns["kind"].append(kind)
+
+        segment = encode_columns(columns, blob_rows, 0, pad_columns=True) + blob
+        segment += b"\0" * _padding(len(segment))
+
+        st = os.stat(path)
+        session = {
+            "source": os.path.basename(path),
+            "rodent": header.get("rodent") or fields.get("rodent"),
+            "trainer": header.get("trainer") or fields.get("trainer"),
+            "chamber": header.get("chamber") or fields.get("chamber"),
+            "date": fields["date"],
+            "start_ts": fields.get("start_ts"),
+            "header": header,
+            "rows": len(columns["t_ns"]),
+            "offset": self.file.tell(),
+            "nbytes": len(segment),
+            "segment_sha256": hashlib.sha256(segment).hexdigest(),
+            "source_size": st.st_size,
+            "source_mtime_ns": st.st_mtime_ns,
+            "source_sha256": _sha256_file(path),
+        }
+        self.file.write(segment)
+        self.footer["sessions"].append(session)
+        return session
+
+    def close(self):
+        footer = json.dumps(self.footer).encode("utf-8")
+        self.file.write(footer)
+        self.file.write(FOOTER_TAIL.pack(len(footer), PARTITION_MAGIC))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+def verify_partition(filepath: str, sources: dict = None) -> list:
+    """
+    Check every segment of a partition against its stored checksum and, for the sessions in
+    sources ({source name: data file path}), the row count against a fresh count of the
+    source's events. Returns a list of problems (empty if the partition is good).
+    """
+    problems = []
+    with PartitionReader(filepath) as reader:
+        for session in reader.footer["sessions"]:
+            if hashlib.sha256(reader.segment_bytes(session)).hexdigest() != session["segment_sha256"]:
+                problems.append(f"{session['source']}: segment checksum mismatch")
+            source = (sources or {}).get(session["source"])
+            if source is not None:
+                rows = count_events(source)
+                if rows != session["rows"]:
+                    problems.append(f"{session['source']}: {session['rows']} rows, source has {rows}")
+                if _sha256_file(source) != session["source_sha256"]:
+                    problems.append(f"{session['source']}: source changed during compaction")
+    return problems
+
+def archive_files(paths: list, archive_path: str, checksums: dict) -> bool:
+    """Write paths into a tar.gz archive and verify every member against checksums {path: sha256}."""
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    tmp_path = archive_path + ".tmp"
+    with tarfile.open(tmp_path, "w:gz") as tar:
+        for path in paths:
+            tar.add(path, arcname=os.path.basename(path))
+    with tarfile.open(tmp_path, "r:gz") as tar:
+        members = {member.name: member for member in tar.getmembers()}
+        for path in paths:
+            member = members.get(os.path.basename(path))
+            if member is None:
+                logger.error(f"{path} missing from archive {archive_path}")
+                return False
+            sha = hashlib.sha256()
+            with tar.extractfile(member) as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(block)
+            if sha.hexdigest() != checksums[path]:
+                logger.error(f"Checksum mismatch for {path} in archive {archive_path}")
+                return False
+    os.replace(tmp_path, archive_path)
+    return True
+
+def find_closed_sessions(data_dir: str, before_month: str = None, min_age: float = 3600) -> dict:
+    """
+    Group the data files of data_dir into {(month, chamber): [(path, fields)]}.
+    Only sessions from months before before_month ("YYYY-MM", default: the current month) that
+    have not been modified for min_age seconds are included.
+    """
+    before_month = before_month or datetime.now().strftime("%Y-%m")
+    cutoff = time.time() - min_age
+    groups = {}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith(DATA_FILE_SUFFIXES):
+                continue
+            st = entry.stat()
+            if st.st_mtime > cutoff:
+                continue
+            fields = parse_data_filename(entry.name)
+            start_ts = fields.get("start_ts", st.st_mtime)
+            fields["date"] = datetime.fromtimestamp(start_ts).strftime("%Y-%m-%d")
+            month = fields["date"][:7]
+            if month >= before_month:
+                continue
+            groups.setdefault((month, fields.get("chamber") or "unknown"), []).append((entry.path, fields))
+    return groups
+
+def session_logs(data_dir: str, month: str, chamber: str, before_month: str) -> list:
+    """Session log files of a chamber from the given month."""
+    logs = []
+    for name in os.listdir(data_dir):
+        match = LOG_FILE_PATTERN.match(name)
+        if match and match.group(2) == chamber and f"{match.group(1)[:4]}-{match.group(1)[4:6]}" == month < before_month:
+            logs.append(os.path.join(data_dir, name))
+    return logs
+
+def compact(data_dir: str = "/mnt/shared/data", partition_root: str = None, before_month: str = None,
+            min_age: float = 3600, archive: bool = False, archive_root: str = None) -> dict:
+    """
+    Merge closed sessions into per-month, per-chamber partitions under partition_root
+    (default <data_dir>/partitions). Sessions already in a partition are skipped.
+    Each partition is written to a temporary file, verified and then renamed into place; a
+    session that can't be read is logged and left in place, unarchived. With archive, the compacted data files and that month's session logs are moved into
+    a verified tar.gz under archive_root (default <data_dir>/archive).
+    """
+    data_dir = expanduser(data_dir)
+    partition_root = expanduser(partition_root or os.path.join(data_dir, PARTITION_DIR))
+    archive_root = expanduser(archive_root or os.path.join(data_dir, ARCHIVE_DIR))
+    before_month = before_month or datetime.now().strftime("%Y-%m")
+    stats = {"partitions": 0, "sessions": 0, "skipped": 0, "failed": 0, "archived": 0}
+
+    for (month, chamber), sessions in sorted(find_closed_sessions(data_dir, before_month, min_age).items()):
+        partition_path = os.path.join(partition_root, month, chamber + PARTITION_SUFFIX)
+        os.makedirs(os.path.dirname(partition_path), exist_ok=True)
+
+        existing = PartitionReader(partition_path) if os.path.exists(partition_path) else None
+        compacted = {s["source"] for s in existing.footer["sessions"]} if existing else set()
+        new_sessions = [(path, fields) for path, fields in sorted(sessions) if os.path.basename(path) not in compacted]
+        stats["skipped"] += len(sessions) - len(new_sessions)
+        if not new_sessions:
+            if existing:
+                existing.close()
+            continue
+
+        # A session that can't be read is left in place (and unarchived) for the next run
+        tmp_path = partition_path + ".tmp"
+        added = []
+        try:
+            writer = PartitionWriter(tmp_path, chamber, month, existing)
+            try:
+                for path, fields in new_sessions:
+                    try:
+                        writer.add_session(path, fields)
+                    except Exception as e:
+                        logger.error(f"Error compacting {path}, leaving it in place: {e}")
+                        stats["failed"] += 1
+                        continue
+                    added.append(path)
+            finally:
+                writer.close()
+        except Exception as e:
+            logger.error(f"Error writing {partition_path}, keeping the previous partition: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            stats["failed"] += len(added)
+            continue
+        finally:
+            if existing:
+                existing.close()
+        if not added:
+            os.remove(tmp_path)
+            continue
+
+        sources = {os.path.basename(path): path for path in added}
+        problems = verify_partition(tmp_path, sources)
+        if problems:
+            logger.error(f"Verification of {partition_path} failed, keeping the previous partition: {problems}")
+            os.remove(tmp_path)
+            stats["failed"] += len(added)
+            continue
+        os.replace(tmp_path, partition_path)
+        stats["partitions"] += 1
+        stats["sessions"] += len(added)
+        logger.info(f"Compacted {len(added)} sessions into {partition_path}")
+
+        if archive:
+            paths = list(added)
+            if len(added) == len(new_sessions):
+                # The month's logs wait until all its sessions are compacted
+                paths += session_logs(data_dir, month, chamber, before_month)
+            checksums = {path: _sha256_file(path) for path in paths}
+            archive_path = os.path.join(archive_root, month, f"{chamber}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tar.gz")
+            if archive_files(paths, archive_path, checksums):
+                for path in paths:
+                    os.remove(path)
+                stats["archived"] += len(paths)
+                logger.info(f"Archived {len(paths)} files to {archive_path}")
+    logger.info(f"Compaction finished: {stats}")
+    return stats
+
+def query_partitions(partition_root: str, rodent: str = None, trainer: str = None, chamber: str = None,
+                     start_date: str = None, end_date: str = None):
+    """
+    Yield (index entry, events array) for every compacted session matching the predicates.
+    Month directories and chamber files outside the predicates are never opened, and only
+    the footer and matching segments of the others are read.
+    """
+    partition_root = expanduser(partition_root)
+    if not os.path.isdir(partition_root):
+        return
+    for month in sorted(os.listdir(partition_root)):
+        if (start_date and month < start_date[:7]) or (end_date and month > end_date[:7]):
+            continue
+        month_dir = os.path.join(partition_root, month)
+        if not os.path.isdir(month_dir):
+            continue
+        for name in sorted(os.listdir(month_dir)):
+            if not name.endswith(PARTITION_SUFFIX) or (chamber and name != chamber + PARTITION_SUFFIX):
+                continue
+            with PartitionReader(os.path.join(month_dir, name)) as reader:
+                for session in reader.sessions(rodent, trainer, start_date, end_date):
+                    yield session, reader.read_session(session)
+
+if __name__ == "__main__":
+    # Run from the Controller directory: python -m analysis.Compaction compact / query ...
+    import argparse
+    parser = argparse.ArgumentParser(description="Compact NC4Touch sessions into monthly partitions and query them.")
+    parser.add_argument("--data-dir", default="/mnt/shared/data")
+    parser.add_argument("--partition-root", help="Partition directory (default: <data-dir>/partitions)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = commands.add_parser("compact", help="Compact closed sessions of past months")
+    compact_parser.add_argument("--before-month", help="Only compact months before YYYY-MM (default: current month)")
+    compact_parser.add_argument("--min-age", type=float, default=3600, help="Seconds since a file was last modified")
+    compact_parser.add_argument("--archive", action="store_true", help="Move compacted originals into tar.gz archives")
+    compact_parser.add_argument("--archive-root", help="Archive directory (default: <data-dir>/archive)")
+
+    query_parser = commands.add_parser("query", help="List compacted sessions")
+    query_parser.add_argument("--rodent")
+    query_parser.add_argument("--trainer")
+    query_parser.add_argument("--chamber")
+    query_parser.add_argument("--start-date", help="YYYY-MM-DD, inclusive")
+    query_parser.add_argument("--end-date", help="YYYY-MM-DD, inclusive")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s:%(levelname)s] %(message)s")
+    partition_root = args.partition_root or os.path.join(args.data_dir, PARTITION_DIR)
+    if args.command == "compact":
+        compact(args.data_dir, partition_root, args.before_month, args.min_age, args.archive, args.archive_root)
+    else:
+        start = time.perf_counter()
+        count = 0
+        for session, events in query_partitions(partition_root, args.rodent, args.trainer, args.chamber,
+                                                args.start_date, args.end_date):
+            count += 1
+            print(f"{session['date']}  {session['chamber']:<10} {session['trainer']:<24} {session['rodent']:<12} "
+                  f"events={len(events):<6} {session['source']}")
+        logger.info(f"{count} sessions in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,155 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+import os
+import json
+import mmap
+import codecs
+import functools
+from array import array
+from datetime import datetime
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+LEGACY_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+DEFAULT_CHUNK_SIZE = 1 << 20  # bytes decoded from the mapped file at a time
+PARSER_VERSION = 1  # bump when read_events() output changes, invalidating cached sessions
+
+_WHITESPACE = " \t\r\n"
+
+@functools.lru_cache(maxsize=4096)
+def _legacy_epoch_minute(prefix: str) -> int:
+    return int(datetime.strptime(prefix, "%Y%m%d_%H%M").timestamp())
+
+def legacy_timestamp_ns(timestamp: str) -> int:
+    """Convert a legacy "%Y%m%d_%H%M%S_%f" wall clock string to integer nanoseconds since the epoch."""
+    # strptime dominates reading legacy files; events share minutes, so only the minute prefix is parsed (and cached)
+    if len(timestamp) == 22 and timestamp[15] == "_" and timestamp[13:15].isdigit() and timestamp[16:].isdigit():
+        seconds = _legacy_epoch_minute(timestamp[:13]) + int(timestamp[13:15])
+        return seconds * 1_000_000_000 + int(timestamp[16:]) * 1000
+    dt = datetime.strptime(timestamp, LEGACY_TIMESTAMP_FORMAT)
+    return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+
+def iter_data_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Lazily yield the records of a data file in order, header first.
+
+    Handles JSON Lines files as well as legacy files, which start with a
+    "# NC4Touch training data" comment line followed by JSON objects with no separators.
+    The file is memory-mapped and decoded chunk_size bytes at a time with
+    json.JSONDecoder.raw_decode, so memory use does not grow with the file size.
+    A truncated final object (e.g. from a crashed session) is skipped with a warning.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _iter_records(mm, size, chunk_size, path)
+
+def _iter_records(mm, size: int, chunk_size: int, path: str):
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    text = ""
+    pos = 0
+    consumed = 0  # characters dropped from the front of text
+    offset = 0  # bytes of the file decoded into text so far
+    while True:
+        eof = offset >= size
+        # Skip whitespace and comment lines between objects
+        while pos < len(text) and text[pos] in _WHITESPACE:
+            pos += 1
+        if pos < len(text) and text[pos] == "#":
+            newline = text.find("\n", pos)
+            if newline != -1:
+                pos = newline + 1
+                continue
+            if eof:
+                return
+        elif pos < len(text):
+            try:
+                record, end = decoder.raw_decode(text, pos)
+                # A scalar ending at the buffer edge may continue in the next chunk
+                if end < len(text) or eof or isinstance(record, (dict, list)):
+                    pos = end
+                    yield record
+                    continue
+            except json.JSONDecodeError as e:
+                if eof:
+                    logger.warning(f"Stopped reading {path} at character {consumed + pos}: {e}")
+                    return
+        elif eof:
+            return
+
+        # Need more text: drop what was consumed and decode the next chunk
+        chunk = mm[offset:offset + chunk_size]
+        offset += len(chunk)
+        text = text[pos:] + utf8.decode(chunk, final=offset >= size)
+        consumed += pos
+        pos = 0
+
+def read_data_header(path: str) -> dict:
+    """Return the header of a data file, or {} for legacy files without one."""
+    for record in iter_data_file(path, chunk_size=1 << 16):
+        return record.get("header", {}) if isinstance(record, dict) else {}
+    return {}
+
+def read_events_array(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Read the events of a data file into a NumPy structured array; see read_events()."""
+    return read_events(path, chunk_size)[0]
+
+def read_events(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, payload_events: tuple = ()):
+    """
+    Read the events of a data file into a NumPy structured array with the fields
+        t_ns   int64    time.monotonic_ns(), or epoch ns for legacy "timestamp" records
+        event  unicode  event name, stripped of surrounding whitespace
+        trial  int32    number of the most recent StartTrial event, -1 before the first trial
+        value  float64  numeric event data, NaN otherwise
+    The header record is skipped; use read_data_header() for it.
+
+    Returns (records, payloads) where payloads maps the row index of every event named in
+    payload_events to its original data (e.g. the dicts of TrialData events).
+    """
+    if np is None:
+        logger.error("numpy is not available; cannot build event arrays")
+        raise RuntimeError("numpy is not available; cannot build event arrays")
+
+    # array.array columns keep the per-event cost at a few bytes until the final copy into NumPy
+    t_ns, trials, values = array("q"), array("i"), array("d")
+    events = []
+    payloads = {}
+    trial = -1
+    nan = float("nan")
+    for record in iter_data_file(path, chunk_size):
+        if not isinstance(record, dict) or "header" in record:
+            continue
+        event = str(record.get("event", "")).strip()
+        data = record.get("data")
+        if isinstance(data, (int, float)) and not isinstance(data, bool):
+            if event == "StartTrial":
+                trial = int(data)
+            values.append(data)
+        else:
+            values.append(nan)
+        if event in payload_events:
+            payloads[len(events)] = data
+
+        t = record.get("t_ns")
+        if t is None:
+            try:
+                t = legacy_timestamp_ns(record["timestamp"])
+            except (KeyError, TypeError, ValueError):
+                t = 0
+        t_ns.append(t)
+        events.append(event)
+        trials.append(trial)
+
+    width = max(map(len, events), default=1)
+    records = np.empty(len(events), dtype=[("t_ns", "<i8"), ("event", f"<U{width}"), ("trial", "<i4"), ("value", "<f8")])
+    records["t_ns"] = np.frombuffer(t_ns, dtype=np.int64)
+    records["event"] = events
+    records["trial"] = np.frombuffer(trials, dtype=np.intc)
+    records["value"] = np.frombuffer(values, dtype=np.float64)
+    return records, payloads
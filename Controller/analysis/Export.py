@@ -0,0 +1,132 @@
+import os
+import csv
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis.DataReader import iter_data_file
+from analysis.TrialReducer import TrialReducer, TRIAL_FIELDS
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+DATA_FILE_SUFFIX = "_data.json"
+TRIALS_FILE_SUFFIX = "_trials.csv"
+# Not <stem>_data.nc4b: that is the live binary event log a running trainer may hold open
+COLUMNAR_FILE_SUFFIX = "_export.nc4b"
+
+def export_paths(data_path: str, output_dir: str = None):
+    """Return the (trials CSV, columnar event log) paths an export of data_path writes."""
+    base = os.path.basename(data_path)
+    stem = base[:-len(DATA_FILE_SUFFIX)] if base.endswith(DATA_FILE_SUFFIX) else os.path.splitext(base)[0]
+    directory = output_dir or os.path.dirname(os.path.abspath(data_path))
+    return os.path.join(directory, stem + TRIALS_FILE_SUFFIX), os.path.join(directory, stem + COLUMNAR_FILE_SUFFIX)
+
+def export_session(data_path: str, output_dir: str = None, columnar: bool = False, trainer: str = None) -> str:
+    """
+    Stream a data file into a per-trial CSV (and, if columnar, a binary event log) in one pass.
+    Rows are written as each trial completes, so memory use does not depend on the session length.
+    The CSV is the live trial summary's path, so don't export a session that is still running.
+    Returns the CSV path.
+    """
+    csv_path, columnar_path = export_paths(data_path, output_dir)
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    start = time.monotonic()
+
+    binary_log = None
+    if columnar:
+        from BinaryEventLog import BinaryEventLogWriter
+        if os.path.exists(columnar_path):
+            os.remove(columnar_path)
+        binary_log = BinaryEventLogWriter(columnar_path)
+
+    reducer = None
+    tmp_path = csv_path + ".tmp"
+    try:
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TRIAL_FIELDS)
+            writer.writeheader()
+            for record in iter_data_file(data_path):
+                if reducer is None:
+                    # The header (first record of current files) names the trainer; legacy files use defaults
+                    header = record.get("header", {}) if isinstance(record, dict) else {}
+                    reducer = TrialReducer(trainer or header.get("trainer"))
+                if binary_log is not None and isinstance(record, dict):
+                    binary_log.append(record)
+                row = reducer.add(record)
+                if row is not None:
+                    writer.writerow(row)
+            row = reducer.finish() if reducer is not None else None
+            if row is not None:
+                writer.writerow(row)
+        os.replace(tmp_path, csv_path)
+    finally:
+        if binary_log is not None:
+            binary_log.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    trials = reducer.totals["trials"] if reducer is not None else 0
+    logger.info(f"Exported {data_path} -> {csv_path} ({trials} trials, {time.monotonic() - start:.2f}s)")
+    return csv_path
+
+def export_session_async(data_path: str, output_dir: str = None, columnar: bool = False, trainer: str = None):
+    """Run export_session() on a background thread and return the thread."""
+    def run():
+        try:
+            export_session(data_path, output_dir, columnar, trainer)
+        except Exception as e:
+            logger.error(f"Error exporting {data_path}: {e}")
+
+    thread = threading.Thread(target=run, name=f"Export-{os.path.basename(data_path)}", daemon=True)
+    thread.start()
+    return thread
+
+def _export_safe(args):
+    data_path, output_dir, columnar = args
+    try:
+        return export_session(data_path, output_dir, columnar)
+    except Exception as e:
+        logger.error(f"Error exporting {data_path}: {e}")
+        return None
+
+def export_directory(paths: list, output_dir: str = None, columnar: bool = False,
+                     max_workers: int = None, force: bool = False) -> list:
+    """
+    Export data files and directories of data files with a process pool.
+    Files whose CSV is newer than the data file are skipped unless force is set.
+    Returns the CSV paths written.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(DATA_FILE_SUFFIX)))
+        else:
+            files.append(path)
+    if not force:
+        files = [f for f in files if not os.path.exists(export_paths(f, output_dir)[0])
+                 or os.path.getmtime(export_paths(f, output_dir)[0]) < os.path.getmtime(f)]
+
+    jobs = [(f, output_dir, columnar) for f in files]
+    if max_workers == 1 or len(jobs) < 2:
+        results = [_export_safe(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_export_safe, jobs))
+    return [r for r in results if r is not None]
+
+if __name__ == "__main__":
+    # Run from the Controller directory: python -m analysis.Export <data files or directories>
+    import argparse
+    parser = argparse.ArgumentParser(description="Export NC4Touch data files to per-trial CSV files.")
+    parser.add_argument("paths", nargs="+", help="Data files or directories of data files")
+    parser.add_argument("--output-dir", help="Directory for exported files (default: next to each data file)")
+    parser.add_argument("--columnar", action="store_true", help="Also write a binary columnar event log (.nc4b)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-export files that are already up to date")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s:%(levelname)s] %(message)s")
+    start = time.perf_counter()
+    written = export_directory(args.paths, args.output_dir, args.columnar, args.workers, args.force)
+    logger.info(f"Exported {len(written)} sessions in {time.perf_counter() - start:.2f}s")
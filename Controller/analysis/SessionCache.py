@@ -0,0 +1,168 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+import os
+import json
+import time
+import hashlib
+import tempfile
+from os.path import expanduser
+
+from analysis.DataReader import PARSER_VERSION, read_events, read_data_header
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+DEFAULT_CACHE_DIR = "~/.nc4touch/session_cache"
+DEFAULT_MAX_BYTES = 2 << 30
+STALE_TMP_AGE = 3600 # Seconds after which a .tmp file is taken to be left over from an interrupted write
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+class SessionCache:
+    """
+    Local cache of parsed data files, one compressed .npz sidecar per session.
+
+    Entries are named "<path hash>-<version hash>.npz", where the version hash covers the
+    source size, mtime, DataReader.PARSER_VERSION and the requested payload events, so a
+    changed source or parser simply misses; the stale entry for the same path is removed
+    when the new one is stored. Hits touch the entry's mtime, and evict() removes the least
+    recently used entries until the cache is under max_bytes. Temporary files of writes in
+    progress count towards max_bytes; ones older than STALE_TMP_AGE are removed.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        if np is None:
+            logger.error("numpy is not available; cannot cache sessions")
+            raise RuntimeError("numpy is not available; cannot cache sessions")
+        self.cache_dir = expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_since_evict = 0
+
+    def _entry_path(self, path: str, payload_events: tuple):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        version = _digest(f"{st.st_size}|{st.st_mtime_ns}|{PARSER_VERSION}|{sorted(payload_events)}")
+        prefix = _digest(path)
+        return prefix, os.path.join(self.cache_dir, f"{prefix}-{version}.npz")
+
+    def get_events(self, path: str, payload_events: tuple = ()):
+        """
+        Return (records, payloads, header) for a data file, as DataReader.read_events() and
+        read_data_header() would, parsing the file only if it is not cached.
+        """
+        prefix, entry = self._entry_path(path, payload_events)
+        try:
+            with np.load(entry) as data:
+                records = data["records"]
+                payloads = {int(row): value for row, value in json.loads(str(data["payloads"])).items()}
+                header = json.loads(str(data["header"]))
+            os.utime(entry)
+            self.hits += 1
+            return records, payloads, header
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {entry}: {e}")
+
+        self.misses += 1
+        records, payloads = read_events(path, payload_events=payload_events)
+        header = read_data_header(path)
+        self._store(prefix, entry, records, payloads, header)
+        return records, payloads, header
+
+    def _store(self, prefix, entry, records, payloads, header):
+        tmp_path = None
+        try:
+            # Write to a temporary file first so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, records=records, payloads=np.array(json.dumps(payloads, default=str)),
+                                    header=np.array(json.dumps(header)))
+            os.replace(tmp_path, entry)
+        except Exception as e:
+            logger.warning(f"Could not write cache entry {entry}: {e}")
+            if tmp_path is not None:
+                self._remove(tmp_path)
+            return
+
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(f"{prefix}-") and os.path.join(self.cache_dir, name) != entry:
+                self._remove(os.path.join(self.cache_dir, name))
+
+        self.bytes_since_evict += os.path.getsize(entry)
+        if self.bytes_since_evict > self.max_bytes // 10:
+            self.evict()
+
+    def _remove(self, entry):
+        try:
+            os.remove(entry)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self, temporary: bool = False):
+        """(mtime_ns, size, path) of the entries, and with temporary of writes in progress; removes stale .tmp files."""
+        entries = []
+        stale_before = time.time_ns() - STALE_TMP_AGE * 10**9
+        with os.scandir(self.cache_dir) as it:
+            for e in it:
+                if not e.name.endswith((".npz", ".tmp")):
+                    continue
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue  # removed, or renamed into place, by another process meanwhile
+                if e.name.endswith(".npz"):
+                    entries.append((st.st_mtime_ns, st.st_size, e.path))
+                elif st.st_mtime_ns < stale_before:
+                    logger.info(f"Removing leftover temporary cache file {e.path}")
+                    self._remove(e.path)
+                elif temporary:
+                    entries.append((st.st_mtime_ns, st.st_size, e.path))
+        return entries
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries(temporary=True))
+
+    def evict(self):
+        """Remove least recently used entries until the cache is under max_bytes."""
+        self.bytes_since_evict = 0
+        entries = sorted(self._entries(temporary=True))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.endswith(".tmp"):
+                continue  # still being written; counted, but not ours to remove
+            self._remove(entry)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached sessions; cache is {total / 1e6:.1f} MB")
+
+    def clear(self):
+        for _, _, entry in self._entries():
+            self._remove(entry)
+
+if __name__ == "__main__":
+    # Run from the Controller directory: python -m analysis.SessionCache [--evict | --clear]
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or trim the parsed session cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1e6)
+    parser.add_argument("--evict", action="store_true", help="Evict entries over the size limit")
+    parser.add_argument("--clear", action="store_true", help="Remove all entries")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s:%(levelname)s] %(message)s")
+    cache = SessionCache(args.cache_dir, int(args.max_mb * 1e6))
+    if args.clear:
+        cache.clear()
+    elif args.evict:
+        cache.evict()
+    print(f"{cache.cache_dir}: {len(cache._entries())} sessions, {cache.size_bytes() / 1e6:.1f} MB")
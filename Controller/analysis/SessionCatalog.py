@@ -0,0 +1,326 @@
+import os
+import re
+import glob
+import json
+import time
+import sqlite3
+from datetime import datetime
+from os.path import expanduser
+
+from analysis.DataReader import iter_data_file, legacy_timestamp_ns
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+DEFAULT_CATALOG_FILE = "~/.nc4touch/session_catalog.sqlite"
+DATA_FILE_SUFFIXES = ("_data.json", "_data.jsonl")
+LOG_FILE_PATTERN = re.compile(r"^(\d{8}_\d{6})_(.+)_session_log\.log(\..+)?$")
+# Where Compaction.compact() puts partitions and archived originals by default, relative to a data directory
+PARTITION_DIR = "partitions"
+ARCHIVE_DIR = "archive"
+FILENAME_DATE_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# Bump when the summary columns change so existing rows are re-parsed
+CATALOG_VERSION = 1
+
+# Trainers disagree on spelling (PRL writes "CorrectTouch " with a trailing space), so names are stripped
+OUTCOME_EVENTS = {
+    "correct": ("CorrectTouch",),
+    "incorrect": ("IncorrectTouch",),
+    "timeouts": ("TouchTimeout",),
+    "rewards": ("DeliverRewardStart", "RewardStart"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    catalog_version INTEGER NOT NULL,
+    start_time TEXT,
+    start_ts REAL,
+    chamber TEXT,
+    trainer TEXT,
+    rodent TEXT,
+    header TEXT,
+    num_events INTEGER,
+    num_trials INTEGER,
+    duration_s REAL,
+    correct INTEGER,
+    incorrect INTEGER,
+    timeouts INTEGER,
+    rewards INTEGER,
+    accuracy REAL,
+    completed INTEGER,
+    event_counts TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_rodent_trainer ON sessions (rodent, trainer, start_ts);
+CREATE INDEX IF NOT EXISTS sessions_chamber ON sessions (chamber, start_ts);
+CREATE TABLE IF NOT EXISTS logs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    start_time TEXT,
+    start_ts REAL,
+    chamber TEXT
+);
+CREATE INDEX IF NOT EXISTS logs_chamber ON logs (chamber, start_ts);
+"""
+
+def parse_data_filename(filename: str) -> dict:
+    """
+    Parse "{date}_{chamber}_{trainer}_{rodent}_data.json" into its fields.
+    Trainer names may contain underscores, so the chamber is taken as the first field after
+    the date and the rodent as the last one.
+    """
+    stem = filename
+    for suffix in DATA_FILE_SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+    parts = stem.split("_")
+    if len(parts) < 5:
+        return {}
+    fields = {"chamber": parts[2], "trainer": "_".join(parts[3:-1]), "rodent": parts[-1]}
+    try:
+        fields["start_ts"] = datetime.strptime("_".join(parts[:2]), FILENAME_DATE_FORMAT).timestamp()
+    except ValueError:
+        pass
+    return fields
+
+def summarize_data_file(path: str) -> dict:
+    """Read a data file once and return its catalog row fields."""
+    header = {}
+    counts = {}
+    num_events = 0
+    max_trial = 0
+    first_ns = last_ns = None
+    for record in iter_data_file(path):
+        if "header" in record:
+            header = record["header"]
+            continue
+        num_events += 1
+        event = str(record.get("event", "")).strip()
+        counts[event] = counts.get(event, 0) + 1
+        data = record.get("data")
+        if event == "StartTrial" and isinstance(data, int) and not isinstance(data, bool):
+            max_trial = max(max_trial, data)
+
+        t_ns = record.get("t_ns")
+        if t_ns is None and "timestamp" in record:
+            try:
+                t_ns = legacy_timestamp_ns(record["timestamp"])
+            except ValueError:
+                t_ns = None
+        if t_ns is not None:
+            if first_ns is None:
+                first_ns = t_ns
+            last_ns = t_ns
+
+    fields = parse_data_filename(os.path.basename(path))
+    start_ts = fields.get("start_ts")
+    anchor = header.get("wall_clock_anchor")
+    if anchor and first_ns is not None:
+        start_ts = (anchor["time_ns"] + first_ns - anchor["monotonic_ns"]) / 1e9
+    elif header.get("timestamp"):
+        try:
+            start_ts = legacy_timestamp_ns(header["timestamp"]) / 1e9
+        except ValueError:
+            pass
+
+    outcomes = {key: sum(counts.get(name, 0) for name in names) for key, names in OUTCOME_EVENTS.items()}
+    responses = outcomes["correct"] + outcomes["incorrect"]
+    return {
+        "start_time": datetime.fromtimestamp(start_ts).isoformat(timespec="seconds") if start_ts else None,
+        "start_ts": start_ts,
+        "chamber": header.get("chamber") or fields.get("chamber"),
+        "trainer": header.get("trainer") or fields.get("trainer"),
+        "rodent": header.get("rodent") or fields.get("rodent"),
+        "header": json.dumps(header),
+        "num_events": num_events,
+        "num_trials": max_trial or counts.get("StartTrial", 0),
+        "duration_s": (last_ns - first_ns) / 1e9 if first_ns is not None else None,
+        "accuracy": outcomes["correct"] / responses if responses else None,
+        "completed": int("EndTraining" in counts),
+        "event_counts": json.dumps(counts),
+        **outcomes,
+    }
+
+class SessionCatalog:
+    """
+    SQLite index of the sessions in the data directories and the session logs in the log directories.
+
+    scan() is incremental: files whose path, size and mtime are unchanged since the last scan
+    are not opened again. Rows are only removed for files of the scanned directories that are
+    gone from disk and were not compacted and archived, so scanning one directory keeps the
+    rows of others, and archived sessions stay listed.
+    """
+    def __init__(self, catalog_file: str = DEFAULT_CATALOG_FILE):
+        self.catalog_file = expanduser(catalog_file)
+        os.makedirs(os.path.dirname(self.catalog_file) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.catalog_file)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _known_files(self, table: str, columns: str) -> dict:
+        """Return {path: (columns...)} for the rows of table, used to skip unchanged files."""
+        return {row[0]: tuple(row[1:]) for row in self.db.execute(f"SELECT path, {columns} FROM {table}")}
+
+    def scan(self, data_dirs: list = ("/mnt/shared/data",), log_dirs: list = ()) -> dict:
+        """Update the catalog from the given directories. Returns counts of added/updated/removed/unchanged files."""
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "errors": 0}
+        start = time.monotonic()
+
+        known = self._known_files("sessions", "size, mtime_ns, catalog_version")
+        seen = set()
+        for data_dir in data_dirs:
+            for path, st in self._walk(expanduser(data_dir), lambda name: name.endswith(DATA_FILE_SUFFIXES)):
+                seen.add(path)
+                previous = known.get(path)
+                if previous == (st.st_size, st.st_mtime_ns, CATALOG_VERSION):
+                    stats["unchanged"] += 1
+                    continue
+                try:
+                    row = summarize_data_file(path)
+                except Exception as e:
+                    logger.error(f"Error reading data file {path}: {e}")
+                    stats["errors"] += 1
+                    continue
+                row.update(path=path, size=st.st_size, mtime_ns=st.st_mtime_ns, catalog_version=CATALOG_VERSION)
+                columns = ", ".join(row)
+                placeholders = ", ".join(f":{key}" for key in row)
+                self.db.execute(f"INSERT OR REPLACE INTO sessions ({columns}) VALUES ({placeholders})", row)
+                stats["updated" if previous else "added"] += 1
+        roots = self._scanned_roots(data_dirs)
+        compacted = self._compacted_sources(roots)
+        removed = [path for path in self._missing(known, seen, roots) if path not in compacted]
+        self.db.executemany("DELETE FROM sessions WHERE path = ?", [(path,) for path in removed])
+        stats["removed"] += len(removed)
+
+        known_logs = self._known_files("logs", "size, mtime_ns")
+        seen_logs = set()
+        for log_dir in list(log_dirs) + list(data_dirs):
+            for path, st in self._walk(expanduser(log_dir), lambda name: LOG_FILE_PATTERN.match(name) is not None):
+                seen_logs.add(path)
+                if known_logs.get(path) == (st.st_size, st.st_mtime_ns):
+                    continue
+                match = LOG_FILE_PATTERN.match(os.path.basename(path))
+                start_dt = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+                self.db.execute("INSERT OR REPLACE INTO logs (path, size, mtime_ns, start_time, start_ts, chamber) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                (path, st.st_size, st.st_mtime_ns, start_dt.isoformat(), start_dt.timestamp(), match.group(2)))
+        removed_logs = [path for path in self._missing(known_logs, seen_logs, self._scanned_roots(list(log_dirs) + list(data_dirs)))
+                        if not self._log_archived(path)]
+        self.db.executemany("DELETE FROM logs WHERE path = ?", [(path,) for path in removed_logs])
+
+        self.db.commit()
+        logger.info(f"Catalog scan finished in {time.monotonic() - start:.2f}s: {stats}")
+        return stats
+
+    def _scanned_roots(self, directories) -> set:
+        """Absolute paths of the directories that exist; rows of an unmounted share are left alone."""
+        return {os.path.abspath(expanduser(directory)) for directory in directories if os.path.isdir(expanduser(directory))}
+
+    def _missing(self, known: dict, seen: set, roots: set) -> list:
+        """Known paths directly inside one of roots that were not seen and no longer exist."""
+        return [path for path in known
+                if path not in seen and os.path.dirname(path) in roots and not os.path.exists(path)]
+
+    def _compacted_sources(self, roots: set) -> set:
+        """
+        Paths of the data files in the partitions of roots. compact() only archives (and deletes)
+        originals once they are in a partition, so these sessions are still present. A root
+        with an unreadable partition counts all its files as compacted.
+        """
+        from analysis.Compaction import PartitionReader, PARTITION_SUFFIX
+
+        compacted = set()
+        for root in roots:
+            for partition in glob.glob(os.path.join(root, PARTITION_DIR, "*", "*" + PARTITION_SUFFIX)):
+                try:
+                    with PartitionReader(partition) as reader:
+                        compacted.update(os.path.join(root, session["source"]) for session in reader.footer["sessions"])
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Cannot read partition {partition}, keeping the rows of {root}: {e}")
+                    compacted.update(path for path in self._known_files("sessions", "size")
+                                     if os.path.dirname(path) == root)
+        return compacted
+
+    def _log_archived(self, path: str) -> bool:
+        """Whether compact() archived the month of this session log for its chamber."""
+        match = LOG_FILE_PATTERN.match(os.path.basename(path))
+        month = f"{match.group(1)[:4]}-{match.group(1)[4:6]}"
+        return bool(glob.glob(os.path.join(os.path.dirname(path), ARCHIVE_DIR, month, glob.escape(match.group(2)) + "_*.tar.gz")))
+
+    def _walk(self, directory: str, match):
+        """Yield (path, stat) for matching files directly inside directory."""
+        if not os.path.isdir(directory):
+            logger.warning(f"Directory {directory} does not exist.")
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and match(entry.name):
+                    yield os.path.abspath(entry.path), entry.stat()
+
+    def sessions(self, rodent: str = None, trainer: str = None, chamber: str = None,
+                 since: float = None, limit: int = 20) -> list:
+        """Return the most recent sessions matching the filters as dicts, newest first."""
+        clauses, params = [], []
+        for column, value in (("rodent", rodent), ("trainer", trainer), ("chamber", chamber)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("start_ts >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT * FROM sessions {where} ORDER BY start_ts DESC LIMIT ?"
+        return [dict(row) for row in self.db.execute(query, params + [limit])]
+
+    def logs(self, chamber: str = None, limit: int = 20) -> list:
+        """Return the most recent session logs, optionally for one chamber."""
+        if chamber is None:
+            rows = self.db.execute("SELECT * FROM logs ORDER BY start_ts DESC LIMIT ?", (limit,))
+        else:
+            rows = self.db.execute("SELECT * FROM logs WHERE chamber = ? ORDER BY start_ts DESC LIMIT ?", (chamber, limit))
+        return [dict(row) for row in rows]
+
+if __name__ == "__main__":
+    # Run from the Controller directory: python -m analysis.SessionCatalog scan / query ...
+    import argparse
+    parser = argparse.ArgumentParser(description="Index NC4Touch sessions and query them.")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_FILE, help="SQLite catalog file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="Update the catalog from the data and log directories")
+    scan_parser.add_argument("--data-dir", action="append", help="Data directory (repeatable)")
+    scan_parser.add_argument("--log-dir", action="append", default=[], help="Log directory (repeatable)")
+
+    query_parser = commands.add_parser("query", help="List sessions, newest first")
+    query_parser.add_argument("--rodent")
+    query_parser.add_argument("--trainer")
+    query_parser.add_argument("--chamber")
+    query_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s:%(levelname)s] %(message)s")
+    with SessionCatalog(args.catalog) as catalog:
+        if args.command == "scan":
+            catalog.scan(args.data_dir or ["/mnt/shared/data"], args.log_dir)
+        else:
+            start = time.perf_counter()
+            rows = catalog.sessions(rodent=args.rodent, trainer=args.trainer, chamber=args.chamber, limit=args.limit)
+            for row in rows:
+                accuracy = f"{row['accuracy']:.2f}" if row["accuracy"] is not None else "-"
+                print(f"{row['start_time']}  {row['chamber']:<10} {row['trainer']:<24} {row['rodent']:<12} "
+                      f"trials={row['num_trials']:<4} accuracy={accuracy}  {row['path']}")
+            logger.info(f"{len(rows)} sessions in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,298 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+import os
+import re
+import csv
+import time
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis.DataReader import read_events, read_data_header
+from analysis.SessionCache import SessionCache, DEFAULT_CACHE_DIR
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+# Event names for each role in a trial. Names are matched after stripping whitespace,
+# so PRL's "CorrectTouch " and "TouchTimeout " match the entries below.
+DEFAULT_EVENTS = {
+    "trial_start": ("StartTrial",),  # first event of a trial; events before the first one are ignored
+    "trial_end": ("EndTrial",),
+    "initiation": (),
+    "response_ref": ("StartTrial",),  # response latency is measured from this event
+    "correct": ("CorrectTouch",),
+    "incorrect": ("IncorrectTouch",),
+    "omission": ("TouchTimeout",),
+    "reward": ("DeliverRewardStart", "RewardStart", "SmallRewardStart"),
+    "reward_collected": ("BeamBreakDuringReward", "BeamBreakAfterReward",
+                         "BeamBreakDuringLargeReward", "BeamBreakDuringSmallReward"),
+    "punishment": ("PunishStart",),
+    "touch_left": ("LeftScreenTouched",),
+    "touch_right": ("RightScreenTouched",),
+    "iti_extension": ("BeamBreakDuringITI",),  # each one extends the ITI
+    "trial_data": ("TrialData",),  # dict payloads with "outcome", "corrections" and "rt" override the above
+}
+
+# Per-trainer overrides of DEFAULT_EVENTS, keyed by the trainer names in trainers/__init__.py
+TRAINER_EVENTS = {
+    "Habituation": {"correct": (), "incorrect": (), "omission": ()},
+    "MustInitiate": {"trial_start": ("TrialInitiationReady",), "initiation": ("TrialInitiated",)},
+    "Complex_Discrimination": {"correct": (), "incorrect": ()},  # outcomes are only in TrialData
+    "PRL": {},
+}
+
+# Trainer names written to data file headers that differ from the registry names
+TRAINER_ALIASES = {
+    "ProbabilisticReversalLearning": "PRL",
+}
+
+TRIAL_DTYPE = [
+    ("trial", "<i4"),
+    ("start_s", "<f8"),  # seconds since the first event of the session
+    ("end_s", "<f8"),
+    ("initiation_latency_s", "<f8"),
+    ("response_latency_s", "<f8"),
+    ("reward_latency_s", "<f8"),  # reward start to first beam break
+    ("correct", "?"),
+    ("incorrect", "?"),
+    ("omission", "?"),
+    ("correction", "?"),  # repeat of the previous trial after an error
+    ("corrections", "<i4"),
+    ("rewarded", "?"),
+    ("reward_collected", "?"),
+    ("punished", "?"),
+    ("side", "<U5"),  # first screen touched, "LEFT", "RIGHT" or ""
+    ("iti_extensions", "<i4"),
+]
+
+# Payloads kept when reading a session, the same for every trainer so one cached parse serves all mappings
+PAYLOAD_EVENTS = tuple(sorted({name for mapping in [DEFAULT_EVENTS] + list(TRAINER_EVENTS.values())
+                               for name in mapping.get("trial_data", ())}))
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+_TRAINER_KEYS = {_normalize(name): name for name in list(TRAINER_EVENTS) + list(TRAINER_ALIASES)}
+
+def trainer_events(trainer: str) -> dict:
+    """Return the event mapping for a trainer name as written in data file headers or the registry."""
+    name = _TRAINER_KEYS.get(_normalize(trainer or ""))
+    name = TRAINER_ALIASES.get(name, name)
+    return {**DEFAULT_EVENTS, **TRAINER_EVENTS.get(name, {})}
+
+def _first_times(mask, trial_index, t, num_trials):
+    """Time of the first masked event in each trial, NaN where there is none."""
+    out = np.full(num_trials, np.nan)
+    selected = mask & (trial_index >= 0)
+    if selected.any():
+        trials, first = np.unique(trial_index[selected], return_index=True)
+        out[trials] = t[selected][first]
+    return out
+
+def trial_table(records, events: dict, payloads: dict = None):
+    """
+    Build the per-trial table (a NumPy structured array of TRIAL_DTYPE) from the events of
+    one session, as returned by DataReader.read_events().
+
+    Applies the same rules as TrialReducer, which builds the same rows one record at a time
+    for the live trial summary and exports; tests/test_trial_metrics.py checks they agree.
+    """
+    names = records["event"]
+    is_start = np.isin(names, events["trial_start"])
+    num_trials = int(is_start.sum())
+    table = np.zeros(num_trials, dtype=TRIAL_DTYPE)
+    if num_trials == 0:
+        return table
+
+    trial_index = np.cumsum(is_start) - 1  # -1 for events before the first trial
+    # Events after a trial's first trial_end event belong to no trial
+    is_end = np.isin(names, events["trial_end"])
+    ends_before = np.cumsum(is_end) - is_end
+    starts = np.flatnonzero(is_start)
+    trial_index[ends_before > ends_before[starts][np.maximum(trial_index, 0)]] = -1
+    t = (records["t_ns"] - records["t_ns"][0]) / 1e9
+
+    def first(role):
+        return _first_times(np.isin(names, events[role]), trial_index, t, num_trials)
+
+    start = t[is_start]
+    end = first("trial_end")
+    fallback_end = np.append(start[1:], t[-1])
+    table["start_s"] = start
+    table["end_s"] = np.where(np.isnan(end), fallback_end, end)
+
+    numbers = records["value"][is_start]
+    table["trial"] = np.where(np.isnan(numbers), np.arange(1, num_trials + 1), np.nan_to_num(numbers))
+    # Trainers with correction trials restart the same trial number after an error
+    correction = np.append(False, (numbers[1:] == numbers[:-1]) & ~np.isnan(numbers[1:]))
+    index = np.arange(num_trials)
+    table["correction"] = correction
+    table["corrections"] = index - np.maximum.accumulate(np.where(correction, 0, index))
+
+    correct_t = first("correct")
+    incorrect_t = first("incorrect")
+    response_t = np.fmin(correct_t, incorrect_t)
+    table["correct"] = ~np.isnan(correct_t)
+    table["incorrect"] = ~np.isnan(incorrect_t) & np.isnan(correct_t)
+    table["omission"] = ~np.isnan(first("omission")) & np.isnan(response_t)
+    table["response_latency_s"] = response_t - first("response_ref")
+    table["initiation_latency_s"] = first("initiation") - start
+
+    reward_t = first("reward")
+    collected_t = first("reward_collected")
+    collected = collected_t >= reward_t
+    table["rewarded"] = ~np.isnan(reward_t)
+    table["reward_collected"] = collected
+    table["reward_latency_s"] = np.where(collected, collected_t - reward_t, np.nan)
+    table["punished"] = ~np.isnan(first("punishment"))
+
+    left_t = first("touch_left")
+    right_t = first("touch_right")
+    table["side"] = np.where(np.fmin(left_t, right_t) == left_t, "LEFT", np.where(np.isnan(right_t), "", "RIGHT"))
+    extensions = np.isin(names, events["iti_extension"]) & (trial_index >= 0)
+    table["iti_extensions"] = np.bincount(trial_index[extensions], minlength=num_trials)
+
+    # TrialData payloads (one per trial, so a plain loop) carry outcomes some trainers log no events for;
+    # the last one of a trial wins
+    trial_data = {trial_index[row]: data for row, data in sorted((payloads or {}).items())
+                  if trial_index[row] >= 0 and isinstance(data, dict)}
+    for i, data in trial_data.items():
+        outcome = data.get("outcome")
+        if outcome in ("correct", "incorrect"):
+            table["correct"][i] = outcome == "correct"
+            table["incorrect"][i] = outcome == "incorrect"
+            table["omission"][i] = False
+        if isinstance(data.get("corrections"), int):
+            table["corrections"][i] = data["corrections"]
+            table["correction"][i] = data["corrections"] > 0
+        if isinstance(data.get("rt"), (int, float)):
+            table["response_latency_s"][i] = data["rt"]
+    return table
+
+def summarize_trials(table) -> dict:
+    """Session level summary of a per-trial table."""
+    def median(column):
+        values = table[column][~np.isnan(table[column])]
+        return float(np.median(values)) if values.size else None
+
+    correct = int(table["correct"].sum())
+    incorrect = int(table["incorrect"].sum())
+    return {
+        "trials": len(table),
+        "correct": correct,
+        "incorrect": incorrect,
+        "omissions": int(table["omission"].sum()),
+        "accuracy": correct / (correct + incorrect) if correct + incorrect else None,
+        "correction_trials": int(table["correction"].sum()),
+        "rewards": int(table["rewarded"].sum()),
+        "rewards_collected": int(table["reward_collected"].sum()),
+        "median_response_latency_s": median("response_latency_s"),
+        "median_reward_latency_s": median("reward_latency_s"),
+        "median_initiation_latency_s": median("initiation_latency_s"),
+    }
+
+def analyze_session(path: str, trainer: str = None, cache_dir: str = None) -> dict:
+    """
+    Compute the per-trial table and summary of one data file.
+    If cache_dir is given, the parsed events are read from (and stored in) a SessionCache there.
+    """
+    if np is None:
+        logger.error("numpy is not available; cannot compute trial metrics")
+        raise RuntimeError("numpy is not available; cannot compute trial metrics")
+
+    if cache_dir is not None:
+        records, payloads, header = SessionCache(cache_dir).get_events(path, PAYLOAD_EVENTS)
+    else:
+        records, payloads = read_events(path, payload_events=PAYLOAD_EVENTS)
+        header = read_data_header(path)
+    if trainer is None:
+        trainer = header.get("trainer")
+    if trainer is None:
+        # Legacy files have no header; "{date}_{chamber}_{trainer}_{rodent}_data.json"
+        parts = os.path.basename(path).split("_")
+        trainer = "_".join(parts[3:-2]) if len(parts) > 5 else None
+    events = trainer_events(trainer)
+    payloads = {row: data for row, data in payloads.items() if records["event"][row] in events["trial_data"]}
+    table = trial_table(records, events, payloads)
+    return {
+        "path": path,
+        "trainer": trainer,
+        "rodent": header.get("rodent"),
+        "trials": table,
+        "summary": summarize_trials(table),
+    }
+
+def _analyze_session_safe(path, cache_dir=None):
+    try:
+        return analyze_session(path, cache_dir=cache_dir)
+    except Exception as e:
+        logger.error(f"Error analyzing {path}: {e}")
+        return {"path": path, "error": str(e)}
+
+def analyze_sessions(paths: list, max_workers: int = None, cache_dir: str = DEFAULT_CACHE_DIR) -> list:
+    """
+    Analyze many data files in parallel with a process pool. Results are returned in the order
+    of paths; files that fail have an "error" entry instead of "trials".
+    Parsed sessions are cached in cache_dir (None disables the cache), so re-running a cohort
+    only parses new or changed files.
+    """
+    paths = list(paths)
+    analyze = functools.partial(_analyze_session_safe, cache_dir=cache_dir)
+    if max_workers == 1 or len(paths) < 2:
+        results = [analyze(path) for path in paths]
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(analyze, paths, chunksize=chunksize))
+    if cache_dir is not None:
+        SessionCache(cache_dir).evict()
+    return results
+
+def write_trials_csv(results: list, csv_path: str):
+    """Write the per-trial tables of several sessions to one CSV file with a path column."""
+    fields = [name for name, _ in TRIAL_DTYPE]
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "trainer", "rodent"] + fields)
+        for result in results:
+            if "trials" not in result:
+                continue
+            prefix = [result["path"], result["trainer"], result["rodent"]]
+            for row in result["trials"].tolist():
+                writer.writerow(prefix + list(row))
+
+if __name__ == "__main__":
+    # Run from the Controller directory: python -m analysis.TrialMetrics <data files or directories>
+    import argparse
+    parser = argparse.ArgumentParser(description="Compute per-trial metrics for NC4Touch data files.")
+    parser.add_argument("paths", nargs="+", help="Data files or directories of data files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--csv", help="Write all per-trial tables to this CSV file")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Parsed session cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every file, bypassing the cache")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s:%(levelname)s] %(message)s")
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith("_data.json")))
+        else:
+            files.append(path)
+
+    start = time.perf_counter()
+    results = analyze_sessions(files, args.workers, None if args.no_cache else args.cache_dir)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        if "error" in result:
+            continue
+        s = result["summary"]
+        accuracy = f"{s['accuracy']:.2f}" if s["accuracy"] is not None else "-"
+        print(f"{os.path.basename(result['path'])}: trials={s['trials']} correct={s['correct']} "
+              f"incorrect={s['incorrect']} omissions={s['omissions']} accuracy={accuracy}")
+    if args.csv:
+        write_trials_csv(results, args.csv)
+    logger.info(f"Analyzed {len(files)} sessions in {elapsed:.2f}s")
@@ -0,0 +1,171 @@
+from analysis.DataReader import legacy_timestamp_ns
+from analysis.TrialMetrics import TRIAL_DTYPE, trainer_events
+
+import logging
+logger = logging.getLogger(f"session_logger.{__name__}")
+
+TRIAL_FIELDS = [name for name, _ in TRIAL_DTYPE]
+
+class TrialReducer:
+    """
+    Consumes a session's records one at a time and emits each trial's row (a dict of
+    TRIAL_FIELDS, plus any annotate() fields) as soon as the trial ends, at its trial_end
+    event (EndTrial) or when the next trial starts. TrialMetrics.trial_table() applies the same rules to a whole session at
+    once with NumPy; tests/test_trial_metrics.py checks the two agree.
+
+    Only the current trial is held in memory, so whole sessions can be exported in constant
+    memory, and running totals are kept so session summaries are O(1) at any point.
+    Missing latencies are None.
+    """
+    def __init__(self, trainer: str = None, events: dict = None, t0_ns: int = None):
+        self.events = events or trainer_events(trainer)
+        self.roles = {}  # stripped event name -> roles it plays
+        for role, names in self.events.items():
+            for name in names:
+                self.roles.setdefault(name, []).append(role)
+
+        self.t0 = t0_ns  # Times are seconds since this; default: the first record added
+        self.last_t = None
+        self.trial = None  # {"number", "start", "first": {role: time}, "data": TrialData dict, ...}
+        self.trials_started = 0
+        self.previous_number = None
+        self.corrections = 0
+
+        # Running totals
+        self.totals = {"trials": 0, "correct": 0, "incorrect": 0, "omissions": 0, "correction_trials": 0,
+                       "rewards": 0, "rewards_collected": 0}
+        self.response_latency_sum = 0.0
+        self.response_latency_count = 0
+
+    def add(self, record: dict):
+        """Add one record; returns the row of the trial it completed, or None."""
+        if not isinstance(record, dict) or "header" in record:
+            return None
+        t_ns = record.get("t_ns")
+        if t_ns is None:
+            try:
+                t_ns = legacy_timestamp_ns(record["timestamp"])
+            except (KeyError, TypeError, ValueError):
+                t_ns = 0
+        if self.t0 is None:
+            self.t0 = t_ns
+        t = (t_ns - self.t0) / 1e9
+        self.last_t = t
+
+        event = str(record.get("event", "")).strip()
+        roles = self.roles.get(event)
+        if not roles:
+            return None
+
+        completed = None
+        if "trial_start" in roles:
+            completed = self._finish_trial(end=t)
+            data = record.get("data")
+            number = data if isinstance(data, (int, float)) and not isinstance(data, bool) else None
+            self.trials_started += 1
+            correction = number is not None and number == self.previous_number
+            self.corrections = self.corrections + 1 if correction else 0
+            self.previous_number = number
+            self.trial = {"number": int(number) if number is not None else self.trials_started,
+                          "start": t, "correction": correction, "first": {}, "data": None, "iti_extensions": 0,
+                          "annotations": {}}
+
+        if self.trial is not None:
+            first = self.trial["first"]
+            for role in roles:
+                first.setdefault(role, t)
+            if "iti_extension" in roles:
+                self.trial["iti_extensions"] += 1
+            if "trial_data" in roles and isinstance(record.get("data"), dict):
+                self.trial["data"] = record["data"]
+            if "trial_end" in roles:
+                completed = self._finish_trial(end=t)
+        return completed
+
+    def annotate(self, **fields):
+        """Add fields (e.g. the images shown) to the current trial's row; ignored between trials."""
+        if self.trial is not None:
+            self.trial["annotations"].update(fields)
+
+    def finish(self, t_ns: int = None):
+        """
+        Complete the last trial at the end of the session; returns its row or None.
+        t_ns is the time of the session's last event, if it was not added.
+        """
+        if t_ns is not None and self.t0 is not None:
+            self.last_t = (t_ns - self.t0) / 1e9
+        return self._finish_trial(end=self.last_t)
+
+    def _finish_trial(self, end):
+        trial = self.trial
+        if trial is None:
+            return None
+        self.trial = None
+        first = trial["first"]
+        start = trial["start"]
+
+        def since(role, reference):
+            return first[role] - reference if role in first and reference is not None else None
+
+        correct_t = first.get("correct")
+        incorrect_t = first.get("incorrect")
+        response_t = min(t for t in (correct_t, incorrect_t, float("inf")) if t is not None)
+        response_t = None if response_t == float("inf") else response_t
+        reward_t = first.get("reward")
+        collected_t = first.get("reward_collected")
+        collected = reward_t is not None and collected_t is not None and collected_t >= reward_t
+        touches = [(first[role], side) for role, side in (("touch_left", "LEFT"), ("touch_right", "RIGHT")) if role in first]
+
+        row = {
+            "trial": trial["number"],
+            "start_s": start,
+            "end_s": first.get("trial_end", end),
+            "initiation_latency_s": since("initiation", start),
+            "response_latency_s": response_t - first["response_ref"] if response_t is not None and "response_ref" in first else None,
+            "reward_latency_s": collected_t - reward_t if collected else None,
+            "correct": correct_t is not None,
+            "incorrect": incorrect_t is not None and correct_t is None,
+            "omission": "omission" in first and response_t is None,
+            "correction": trial["correction"],
+            "corrections": self.corrections,
+            "rewarded": reward_t is not None,
+            "reward_collected": collected,
+            "punished": "punishment" in first,
+            "side": min(touches)[1] if touches else "",
+            "iti_extensions": trial["iti_extensions"],
+            **trial["annotations"],
+        }
+
+        data = trial["data"]
+        if data is not None:
+            if data.get("outcome") in ("correct", "incorrect"):
+                row["correct"] = data["outcome"] == "correct"
+                row["incorrect"] = data["outcome"] == "incorrect"
+                row["omission"] = False
+            if isinstance(data.get("corrections"), int):
+                row["corrections"] = data["corrections"]
+                row["correction"] = data["corrections"] > 0
+            if isinstance(data.get("rt"), (int, float)):
+                row["response_latency_s"] = data["rt"]
+
+        totals = self.totals
+        totals["trials"] += 1
+        totals["correct"] += row["correct"]
+        totals["incorrect"] += row["incorrect"]
+        totals["omissions"] += row["omission"]
+        totals["correction_trials"] += row["correction"]
+        totals["rewards"] += row["rewarded"]
+        totals["rewards_collected"] += row["reward_collected"]
+        if row["response_latency_s"] is not None:
+            self.response_latency_sum += row["response_latency_s"]
+            self.response_latency_count += 1
+        return row
+
+    def summary(self) -> dict:
+        """Running session summary over the completed trials."""
+        totals = dict(self.totals)
+        responses = totals["correct"] + totals["incorrect"]
+        totals["accuracy"] = totals["correct"] / responses if responses else None
+        totals["mean_response_latency_s"] = (self.response_latency_sum / self.response_latency_count
+                                             if self.response_latency_count else None)
+        return totals
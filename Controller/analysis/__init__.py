@@ -0,0 +1,6 @@
+"""
+Offline readers and analysis tools for NC4Touch data files.
+
+These modules do not touch chamber hardware and can be used on any machine
+with access to the data directory.
+"""
@@ -3,6 +3,7 @@ from random import random
 import time
 import logging
 from trainers.Trainer import Trainer
+from Config import Param
 
 logger = logging.getLogger(f"session_logger.{__name__}")
 
@@ -29,12 +30,14 @@ class ComplexDiscrimination(Trainer):
         super().__init__(chamber, trainer_config)
 
         self.config.ensure_param("trainer_name", "Complex Discrimination")
-        self.config.ensure_param("num_trials", 60)
-        self.config.ensure_param("reward_pump_secs", 3.5)
-        self.config.ensure_param("beam_break_wait_time", 10)
-        self.config.ensure_param("iti_duration", 10)
-        self.config.ensure_param("max_corrections", 3)
-        self.config.ensure_param("touch_timeout", 300)
+        self.declare_params({
+            "num_trials": Param(int, 60, lambda v: v >= 0),
+            "reward_pump_secs": Param(float, 3.5, lambda v: v >= 0),
+            "beam_break_wait_time": Param(float, 10, lambda v: v >= 0),
+            "iti_duration": Param(float, 10, lambda v: v >= 0),
+            "max_corrections": Param(int, 3, lambda v: v >= 0),
+            "touch_timeout": Param(float, 300, lambda v: v >= 0),
+        })
 
         self.state = SDState.IDLE
         self.current_trial = 0
@@ -59,6 +62,7 @@ class ComplexDiscrimination(Trainer):
         self.chamber.get_right_m0().send_command(f"IMG:{self.right_image}")
 
     def show_images(self):
+        self.note_stimuli()
         self.chamber.get_left_m0().send_command("SHOW")
         self.chamber.get_right_m0().send_command("SHOW")
 
@@ -75,7 +79,8 @@ class ComplexDiscrimination(Trainer):
         self.state = SDState.START_TRAINING
 
     def run_training(self):
-        now = time.time()
+        now = time.monotonic()
+        params = self.params()
 
         if self.state == SDState.START_TRAINING:
             self.current_trial = 0
@@ -85,7 +90,7 @@ class ComplexDiscrimination(Trainer):
             self.current_trial += 1
             self.correction_count = 0
 
-            if self.current_trial > self.config["num_trials"]:
+            if self.current_trial > params.num_trials:
                 self.state = SDState.END_TRAINING
                 return
 
@@ -114,7 +119,7 @@ class ComplexDiscrimination(Trainer):
             self.state = SDState.WAIT_FOR_TOUCH
 
         elif self.state == SDState.WAIT_FOR_TOUCH:
-            if now - self.trial_start_time > self.config["touch_timeout"]:
+            if now - self.trial_start_time > params.touch_timeout:
                 self.state = SDState.ITI_START
                 return
 
@@ -151,7 +156,7 @@ class ComplexDiscrimination(Trainer):
             self.clear_images()
             self.correction_count += 1
 
-            if self.correction_count < self.config["max_corrections"]:
+            if self.correction_count < params.max_corrections:
                 # correction trial: DO NOT randomize again
                 self.load_images()
                 self.state = SDState.SHOW_STIMULI
@@ -169,7 +174,7 @@ class ComplexDiscrimination(Trainer):
             self.state = SDState.ITI
 
         elif self.state == SDState.ITI:
-            if now - self.iti_start_time >= self.config["iti_duration"]:
+            if now - self.iti_start_time >= params.iti_duration:
                 self.state = SDState.END_TRIAL
 
         elif self.state == SDState.END_TRIAL:
@@ -1,10 +1,12 @@
-from trainers.Trainer import Trainer
+from trainers.Trainer import Trainer, STATE_LOG_INTERVAL
+from SubsystemLog import get_logger
 
 from enum import Enum
 import time
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
+trainer_log = get_logger("trainer")
 
 class DoNothingState(Enum):
     """Enum for different states in the DoNothing trainer."""
@@ -22,7 +24,7 @@ class DoNothingTrainer(Trainer):
         self.trainer_name = "DoNothingTrainer"
         self.state = DoNothingState.IDLE
         self.switch_interval = 5 # Time in seconds to switch between states
-        self.state_start_time = time.time()
+        self.state_start_time = time.monotonic()
 
     def start_training(self):
         """Start the training session."""
@@ -30,17 +32,17 @@ class DoNothingTrainer(Trainer):
     
     def run_training(self):
         """Run the training session."""
-        self.current_time = time.time()
+        self.current_time = time.monotonic()
 
         if self.state == DoNothingState.IDLE:
-            logger.debug("DoNothingTrainer is idle.")
+            trainer_log.debug("DoNothingTrainer is idle.", every=STATE_LOG_INTERVAL)
             self.state = DoNothingState.DO_NOTHING_1
             logger.info("Switching to DoNothingTrainer state 1.")
             self.state_start_time = self.current_time
             
         elif self.state == DoNothingState.DO_NOTHING_1:
             if self.current_time - self.state_start_time < self.switch_interval:
-                logger.debug("DoNothingTrainer is doing nothing 1.")
+                trainer_log.debug("DoNothingTrainer is doing nothing 1.", every=STATE_LOG_INTERVAL)
             else:
                 self.state = DoNothingState.DO_NOTHING_2
                 self.state_start_time = self.current_time
@@ -48,7 +50,7 @@ class DoNothingTrainer(Trainer):
         
         elif self.state == DoNothingState.DO_NOTHING_2:
             if self.current_time - self.state_start_time < self.switch_interval:
-                logger.debug("DoNothingTrainer is doing nothing 2.")
+                trainer_log.debug("DoNothingTrainer is doing nothing 2.", every=STATE_LOG_INTERVAL)
             else:
                 self.state = DoNothingState.DO_NOTHING_3
                 self.state_start_time = self.current_time
@@ -56,7 +58,7 @@ class DoNothingTrainer(Trainer):
         
         elif self.state == DoNothingState.DO_NOTHING_3:
             if self.current_time - self.state_start_time < self.switch_interval:
-                logger.debug("DoNothingTrainer is doing nothing 3.")
+                trainer_log.debug("DoNothingTrainer is doing nothing 3.", every=STATE_LOG_INTERVAL)
             else:
                 self.state = DoNothingState.IDLE
                 self.state_start_time = self.current_time
@@ -1,10 +1,13 @@
 import time
 from enum import Enum, auto
 
-from trainers.Trainer import Trainer
+from trainers.Trainer import Trainer, STATE_LOG_INTERVAL
+from SubsystemLog import get_logger
+from Config import Param
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
+trainer_log = get_logger("trainer")
 
 class HabituationState(Enum):
     """Enum for different states in the habituation trainer."""
@@ -46,20 +49,22 @@ class Habituation(Trainer):
 
         # Initialize the trainer configuration in code.
         self.config.ensure_param("trainer_name", "Habituation")
-        self.config.ensure_param("num_trials", 30)  # Number of trials to run
-        self.config.ensure_param("reward_pump_secs", 0.5)  # Duration for which the reward pump is activated
-        self.config.ensure_param("beam_break_wait_time", 10) # Time to wait for beam break after reward delivery
-        self.config.ensure_param("iti_duration", 10) # Duration of the inter-trial interval (ITI)
-        self.config.ensure_param("max_iti_duration", 20) # Maximum ITI duration
+        self.declare_params({
+            "num_trials": Param(int, 30, lambda v: v >= 0),                # Number of trials to run
+            "reward_pump_secs": Param(float, 0.5, lambda v: v >= 0),       # Duration for which the reward pump is activated
+            "beam_break_wait_time": Param(float, 10, lambda v: v >= 0),    # Time to wait for beam break after reward delivery
+            "iti_duration": Param(float, 10, lambda v: v >= 0),            # Duration of the inter-trial interval (ITI)
+            "max_iti_duration": Param(float, 20, lambda v: v >= 0),        # Maximum ITI duration
+        })
 
         # Local variables used by the trainer during the training session and not set as trainer defaults.
-        self.reward_start_time = time.time()
+        self.reward_start_time = time.monotonic()
         self.reward_collected = False
-        self.last_beam_break_time = time.time()
-        self.iti_start_time = time.time()
+        self.last_beam_break_time = time.monotonic()
+        self.iti_start_time = time.monotonic()
 
         self.current_trial = 0
-        self.current_trial_iti = self.config["iti_duration"]
+        self.current_trial_iti = self.params().iti_duration
         self.state = HabituationState.IDLE
 
     def start_training(self):
@@ -76,16 +81,17 @@ class Habituation(Trainer):
 
     def run_training(self):
         """Main loop for running the training session."""
-        current_time = time.time()
+        current_time = time.monotonic()
+        params = self.params()
 
         if self.state == HabituationState.IDLE:
             # IDLE state, waiting for the start signal
-            logger.debug("Current state: IDLE")
+            trainer_log.debug("Current state: IDLE", every=STATE_LOG_INTERVAL)
             pass 
 
         elif self.state == HabituationState.START_TRAINING:
             # START_TRAINING state, initializing the training session
-            logger.debug("Current state: START_TRAINING")
+            trainer_log.debug("Current state: START_TRAINING", every=STATE_LOG_INTERVAL)
             logger.info("Starting training session...")
             self.write_event("StartTraining", 1)
             self.chamber.house_led.activate()
@@ -94,10 +100,10 @@ class Habituation(Trainer):
 
         elif self.state == HabituationState.START_TRIAL:
             # START_TRIAL state, preparing for the next trial
-            logger.debug("Current state: START_TRIAL")
+            trainer_log.debug("Current state: START_TRIAL", every=STATE_LOG_INTERVAL)
             self.chamber.house_led.set_brightness(200)
             self.current_trial += 1
-            if self.current_trial < self.config["num_trials"]:
+            if self.current_trial < params.num_trials:
                 trial_number = self.current_trial
                 logger.info("Starting trial %s", trial_number)
                 self.write_event("StartTrial", trial_number)
@@ -110,7 +116,7 @@ class Habituation(Trainer):
 
         elif self.state == HabituationState.DELIVER_REWARD_START:
             # DELIVER_REWARD_START state, preparing to deliver the reward
-            logger.debug("Current state: DELIVER_REWARD_START")
+            trainer_log.debug("Current state: DELIVER_REWARD_START", every=STATE_LOG_INTERVAL)
             self.reward_start_time = current_time
             logger.info(f"Preparing to deliver reward for trial {self.current_trial}...")
             self.write_event("DeliverRewardStart", self.current_trial)
@@ -121,8 +127,8 @@ class Habituation(Trainer):
 
         elif self.state == HabituationState.DELIVERING_REWARD:
             # DELIVERING_REWARD state, dispensing the reward
-            logger.debug("Current state: DELIVERING_REWARD")
-            if current_time - self.reward_start_time < self.config["reward_pump_secs"]:
+            trainer_log.debug("Current state: DELIVERING_REWARD", every=STATE_LOG_INTERVAL)
+            if current_time - self.reward_start_time < params.reward_pump_secs:
                 if self.chamber.beambreak.state==False and not self.reward_collected:
                     # Beam break detected during reward dispense
                     self.reward_collected = True
@@ -139,8 +145,8 @@ class Habituation(Trainer):
 
         elif self.state == HabituationState.POST_REWARD:
             # POST_REWARD state, waiting for beam break or timeout
-            logger.debug("Current state: POST_REWARD")
-            if (current_time - self.reward_start_time) < self.config["beam_break_wait_time"]:
+            trainer_log.debug("Current state: POST_REWARD", every=STATE_LOG_INTERVAL)
+            if (current_time - self.reward_start_time) < params.beam_break_wait_time:
                 if not self.reward_collected and self.chamber.beambreak.state==False:
                     # Beam break detected after reward dispense
                     self.reward_collected = True
@@ -156,24 +162,24 @@ class Habituation(Trainer):
         
         elif self.state == HabituationState.ITI_START:
             # ITI_START state, preparing for the ITI period
-            logger.debug("Current state: ITI_START")
+            trainer_log.debug("Current state: ITI_START", every=STATE_LOG_INTERVAL)
             self.chamber.house_led.set_brightness(50)
             self.write_event("ITIStart", self.current_trial)
             self.chamber.beambreak.activate()
             self.chamber.reward_led.deactivate()
-            self.current_trial_iti = self.config["iti_duration"]
+            self.current_trial_iti = params.iti_duration
             self.iti_start_time = current_time
             self.state = HabituationState.ITI
         
         elif self.state == HabituationState.ITI:
             # ITI state, waiting for the ITI duration
-            logger.debug("Current state: ITI")
+            trainer_log.debug("Current state: ITI", every=STATE_LOG_INTERVAL)
             if current_time - self.iti_start_time < self.current_trial_iti:
                 # Check if beam break is detected during ITI
                 if self.chamber.beambreak.state==False:
                     logger.info("Beam broken during ITI. Adding 1 second to ITI duration.")
                     self.write_event("BeamBreakDuringITI", self.current_trial)
-                    if self.current_trial_iti < self.config["max_iti_duration"]:
+                    if self.current_trial_iti < params.max_iti_duration:
                         self.current_trial_iti += 1
             else:
                 logger.info(f"ITI duration of {self.current_trial_iti} seconds completed")
@@ -181,14 +187,14 @@ class Habituation(Trainer):
         
         elif self.state == HabituationState.END_TRIAL:
             # END_TRIAL state, finalizing the trial
-            logger.debug("Current state: END_TRIAL")
+            trainer_log.debug("Current state: END_TRIAL", every=STATE_LOG_INTERVAL)
             logger.info(f"Ending trial {self.current_trial}...")
             self.write_event("EndTrial", self.current_trial)
             self.state = HabituationState.START_TRIAL
 
         elif self.state == HabituationState.END_TRAINING:
             # End the training session
-            logger.debug("Current state: END_TRAINING")
+            trainer_log.debug("Current state: END_TRAINING", every=STATE_LOG_INTERVAL)
             logger.info("Ending training session...")
             self.write_event("EndTraining", 1)
             self.state = HabituationState.IDLE
@@ -3,6 +3,7 @@ from enum import Enum, auto
 import os
 
 from trainers.Trainer import Trainer
+from Config import Param
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
@@ -32,12 +33,15 @@ class InitialTouch(Trainer):
 
         # Initialize the trainer configuration in code.
         self.config.ensure_param("trainer_name", "InitialTouch")
-        self.config.ensure_param("iti_duration", 10) # Duration of the inter-trial interval (ITI)
-        self.config.ensure_param("large_reward_duration", 3.0)  # Duration of the large reward
-        self.config.ensure_param("small_reward_duration", 1.5)  # Duration of the small reward
-        self.config.ensure_param("trainer_seq_dir", "")  # Directory for the trainer sequence file
-        self.config.ensure_param("trainer_seq_file", "")  # Sequence file for the trainer
-        self.config.ensure_param("touch_timeout", 120)  # Directory for saving data files
+        self.declare_params({
+            "iti_duration": Param(float, 10, lambda v: v >= 0),           # Duration of the inter-trial interval (ITI)
+            "large_reward_duration": Param(float, 3.0, lambda v: v >= 0), # Duration of the large reward
+            "small_reward_duration": Param(float, 1.5, lambda v: v >= 0), # Duration of the small reward
+            "trainer_seq_dir": Param(str, ""),                            # Directory for the trainer sequence file
+            "trainer_seq_file": Param(str, ""),                           # Sequence file for the trainer
+            "touch_timeout": Param(float, 120, lambda v: v >= 0),         # Time allowed for a touch (seconds)
+            "num_trials": Param(int, 0, lambda v: v >= 0),                # Set from the sequence file at the start
+        })
 
         # Local variables used by the trainer during the training session and not set as trainer defaults.
         self.current_trial = 0
@@ -61,7 +65,8 @@ class InitialTouch(Trainer):
         self.chamber.default_state()
 
         # Open sequence file
-        trainer_seq_file = os.path.join(self.config["trainer_seq_dir"], self.config["trainer_seq_file"])
+        params = self.params()
+        trainer_seq_file = os.path.join(params.trainer_seq_dir, params.trainer_seq_file)
         self.trials = self.read_trainer_seq_file(trainer_seq_file)
         if not self.trials:
             logger.error(f"Failed to read trainer sequence file: {trainer_seq_file}")
@@ -100,6 +105,7 @@ class InitialTouch(Trainer):
     
     def show_images(self):
         """Display images on the M0 devices."""
+        self.note_stimuli()
         # Send commands to M0 devices to show images
         if not self.left_image == "BLACK":
             self.chamber.get_left_m0().send_command("SHOW")
@@ -115,7 +121,8 @@ class InitialTouch(Trainer):
     
     def run_training(self):
         """Main loop for running the training session."""
-        current_time = time.time()
+        current_time = time.monotonic()
+        params = self.params()
         if self.state != self.prev_state:
             logger.info(f"State changed: {self.prev_state.name} -> {self.state.name}")
             self.prev_state = self.state
@@ -147,7 +154,7 @@ class InitialTouch(Trainer):
 
         elif self.state == InitialTouchState.DELIVERING_LARGE_REWARD:
             # DELIVERING_REWARD state, dispensing the reward
-            if current_time - self.reward_start_time < self.config["large_reward_duration"]:
+            if current_time - self.reward_start_time < params.large_reward_duration:
                 if self.chamber.beambreak.state==False and not self.reward_collected:
                     # Beam break detected during reward dispense
                     self.reward_collected = True
@@ -175,7 +182,7 @@ class InitialTouch(Trainer):
         
         elif self.state == InitialTouchState.DELIVERING_SMALL_REWARD:
             # DELIVERING_SMALL_REWARD state, dispensing the small reward
-            if current_time - self.reward_start_time < self.config["small_reward_duration"]:
+            if current_time - self.reward_start_time < params.small_reward_duration:
                 if self.chamber.beambreak.state==False and not self.reward_collected:
                     # Beam break detected during small reward dispense
                     self.reward_collected = True
@@ -194,7 +201,7 @@ class InitialTouch(Trainer):
 
         elif self.state == InitialTouchState.START_TRIAL:
             # START_TRIAL state, preparing for the next trial
-            if self.current_trial < self.config["num_trials"]:
+            if self.current_trial < params.num_trials:
                 trial_number = self.current_trial
                 logger.info("Starting trial %s", trial_number)
                 self.write_event("StartTrial", trial_number)
@@ -214,7 +221,7 @@ class InitialTouch(Trainer):
         
         elif self.state == InitialTouchState.WAIT_FOR_TOUCH:
             # WAIT_FOR_TOUCH state, waiting for the animal to touch the screen
-            if current_time - self.trial_start_time <= self.config["touch_timeout"]:
+            if current_time - self.trial_start_time <= params.touch_timeout:
                 if self.chamber.get_left_m0().was_touched():
                     logger.info("Left screen touched")
                     self.write_event("LeftScreenTouched", self.current_trial)
@@ -263,7 +270,7 @@ class InitialTouch(Trainer):
         
         elif self.state == InitialTouchState.ITI:
             # ITI state, waiting for the inter-trial interval to complete
-            if current_time - self.iti_start_time >= self.config["iti_duration"]:
+            if current_time - self.iti_start_time >= params.iti_duration:
                 # ITI completed, move to start trial state
                 logger.info("Inter-trial interval completed.")
                 self.write_event("ITIComplete", self.current_trial)
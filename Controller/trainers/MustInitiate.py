@@ -3,6 +3,7 @@ import time
 from enum import Enum, auto
 
 from trainers.Trainer import Trainer
+from Config import Param
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
@@ -41,20 +42,22 @@ class MustInitiate(Trainer):
         super().__init__(chamber=chamber, trainer_config=trainer_config)
 
         self.config.ensure_param("trainer_name", "MustInitiate")
-        self.config.ensure_param("num_trials", 30)
-        self.config.ensure_param("reward_pump_secs", 1)
-        self.config.ensure_param("beam_break_wait_time", 10)
-        self.config.ensure_param("iti_duration", 10)
+        self.declare_params({
+            "num_trials": Param(int, 30, lambda v: v >= 0),
+            "reward_pump_secs": Param(float, 1, lambda v: v >= 0),
+            "beam_break_wait_time": Param(float, 10, lambda v: v >= 0),
+            "iti_duration": Param(float, 10, lambda v: v >= 0),
+            "touch_timeout": Param(float, 120, lambda v: v >= 0),
+            "trainer_seq_dir": Param(str, "./scripts"),
+            "trainer_seq_file": Param(str, "seq_file.csv"),
+            "correct_image": Param(str, "A01"),
+        })
+        # Read by Trainer.default_iti_check_beam_break()
         self.config.ensure_param("max_iti_duration", 30)
         self.config.ensure_param("iti_increment", 1)
-        self.config.ensure_param("touch_timeout", 120)
-        self.config.ensure_param("trainer_seq_dir", "./scripts")
-        self.config.ensure_param("trainer_seq_file", "seq_file.csv")
-        self.config.ensure_param("correct_image", "A01")
 
         self.current_trial = 0
-        iti_duration_value = self.config["iti_duration"]
-        self.current_trial_iti = float(iti_duration_value) if iti_duration_value is not None else 10.0
+        self.current_trial_iti = self.params().iti_duration
 
         self.left_image = ""
         self.right_image = ""
@@ -74,10 +77,10 @@ class MustInitiate(Trainer):
 
         self.chamber.default_state()
 
-        trainer_seq_dir = str(self.config["trainer_seq_dir"])
-        trainer_seq_file_name = str(self.config["trainer_seq_file"])
-        num_trials_value = self.config["num_trials"]
-        configured_num_trials = int(num_trials_value) if num_trials_value is not None else 30
+        params = self.params()
+        trainer_seq_dir = params.trainer_seq_dir
+        trainer_seq_file_name = params.trainer_seq_file
+        configured_num_trials = params.num_trials
 
         trainer_seq_file = os.path.join(trainer_seq_dir, trainer_seq_file_name)
         self.trials = self.read_trainer_seq_file(trainer_seq_file, 2)
@@ -121,6 +124,7 @@ class MustInitiate(Trainer):
 
     def show_images(self):
         """Display loaded images."""
+        self.note_stimuli()
         if self.left_image != "BLACK":
             self.chamber.get_left_m0().send_command("SHOW")
         if self.right_image != "BLACK":
@@ -132,19 +136,14 @@ class MustInitiate(Trainer):
         self.chamber.get_right_m0().send_command("BLACK")
 
     def run_training(self):
-        current_time = time.time()
+        current_time = time.monotonic()
 
-        num_trials_value = self.config["num_trials"]
-        touch_timeout_value = self.config["touch_timeout"]
-        reward_pump_secs_value = self.config["reward_pump_secs"]
-        beam_break_wait_time_value = self.config["beam_break_wait_time"]
-        iti_duration_value = self.config["iti_duration"]
-
-        num_trials = int(num_trials_value) if num_trials_value is not None else 30
-        touch_timeout = float(touch_timeout_value) if touch_timeout_value is not None else 120.0
-        reward_pump_secs = float(reward_pump_secs_value) if reward_pump_secs_value is not None else 1.0
-        beam_break_wait_time = float(beam_break_wait_time_value) if beam_break_wait_time_value is not None else 10.0
-        iti_duration = float(iti_duration_value) if iti_duration_value is not None else 10.0
+        params = self.params()
+        num_trials = params.num_trials
+        touch_timeout = params.touch_timeout
+        reward_pump_secs = params.reward_pump_secs
+        beam_break_wait_time = params.beam_break_wait_time
+        iti_duration = params.iti_duration
 
         if self.state != self.prev_state:
             logger.info(f"State changed: {self.prev_state.name} -> {self.state.name}")
@@ -200,7 +199,7 @@ class MustInitiate(Trainer):
             self.write_event(f"{side}ScreenTouched", trial_number)
 
             touched_image = self.left_image if side == "LEFT" else self.right_image
-            if touched_image == self.config["correct_image"]:
+            if touched_image == params.correct_image:
                 self.state = MustInitiateState.CORRECT
             else:
                 self.state = MustInitiateState.ERROR
@@ -3,6 +3,7 @@ import time
 from enum import Enum, auto
 
 from trainers.Trainer import Trainer
+from Config import Param
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
@@ -37,19 +38,22 @@ class MustTouch(Trainer):
         super().__init__(chamber=chamber, trainer_config=trainer_config)
 
         self.config.ensure_param("trainer_name", "MustTouch")
-        self.config.ensure_param("num_trials", 30)
-        self.config.ensure_param("reward_pump_secs", 1)
-        self.config.ensure_param("beam_break_wait_time", 10)
-        self.config.ensure_param("iti_duration", 10)
+        self.declare_params({
+            "num_trials": Param(int, 30, lambda v: v >= 0),
+            "reward_pump_secs": Param(float, 1, lambda v: v >= 0),
+            "beam_break_wait_time": Param(float, 10, lambda v: v >= 0),
+            "iti_duration": Param(float, 10, lambda v: v >= 0),
+            "touch_timeout": Param(float, 120, lambda v: v >= 0),
+            "trainer_seq_dir": Param(str, "./scripts"),
+            "trainer_seq_file": Param(str, "seq_file.csv"),
+            "correct_image": Param(str, "A01"),
+        })
+        # Read by Trainer.default_iti_check_beam_break()
         self.config.ensure_param("max_iti_duration", 30)
         self.config.ensure_param("iti_increment", 1)
-        self.config.ensure_param("touch_timeout", 120)
-        self.config.ensure_param("trainer_seq_dir", "./scripts")
-        self.config.ensure_param("trainer_seq_file", "seq_file.csv")
-        self.config.ensure_param("correct_image", "A01")
 
         self.current_trial = 0
-        self.current_trial_iti = self.config["iti_duration"]
+        self.current_trial_iti = self.params().iti_duration
 
         self.left_image = ""
         self.right_image = ""
@@ -69,24 +73,26 @@ class MustTouch(Trainer):
 
         self.chamber.default_state()
 
-        trainer_seq_file = os.path.join(self.config["trainer_seq_dir"], self.config["trainer_seq_file"])
+        params = self.params()
+        num_trials = params.num_trials
+        trainer_seq_file = os.path.join(params.trainer_seq_dir, params.trainer_seq_file)
         self.trials = self.read_trainer_seq_file(trainer_seq_file, 2)
         if not self.trials:
             logger.error(f"Failed to read trainer sequence file: {trainer_seq_file}")
             self.state = MustTouchState.IDLE
             return
 
-        if len(self.trials) > self.config["num_trials"]:
+        if len(self.trials) > num_trials:
             logger.warning(
                 "Number of trials in sequence file exceeds expected num_trials (%s). Truncating.",
-                self.config["num_trials"],
+                num_trials,
             )
-            self.trials = self.trials[:self.config["num_trials"]]
-        elif len(self.trials) < self.config["num_trials"]:
+            self.trials = self.trials[:num_trials]
+        elif len(self.trials) < num_trials:
             logger.warning(
                 "Sequence file has fewer trials (%s) than configured num_trials (%s). Using file length.",
                 len(self.trials),
-                self.config["num_trials"],
+                num_trials,
             )
 
         self.config["num_trials"] = len(self.trials)
@@ -111,6 +117,7 @@ class MustTouch(Trainer):
 
     def show_images(self):
         """Display loaded images."""
+        self.note_stimuli()
         if self.left_image != "BLACK":
             self.chamber.get_left_m0().send_command("SHOW")
         if self.right_image != "BLACK":
@@ -122,7 +129,14 @@ class MustTouch(Trainer):
         self.chamber.get_right_m0().send_command("BLACK")
 
     def run_training(self):
-        current_time = time.time()
+        current_time = time.monotonic()
+
+        params = self.params()
+        num_trials = params.num_trials
+        touch_timeout = params.touch_timeout
+        reward_pump_secs = params.reward_pump_secs
+        beam_break_wait_time = params.beam_break_wait_time
+        iti_duration = params.iti_duration
 
         if self.state != self.prev_state:
             logger.info(f"State changed: {self.prev_state.name} -> {self.state.name}")
@@ -137,7 +151,7 @@ class MustTouch(Trainer):
             self.state = MustTouchState.START_TRIAL
 
         elif self.state == MustTouchState.START_TRIAL:
-            if self.current_trial >= self.config["num_trials"]:
+            if self.current_trial >= num_trials:
                 self.state = MustTouchState.END_TRAINING
                 return
 
@@ -152,7 +166,7 @@ class MustTouch(Trainer):
             self.state = MustTouchState.WAIT_FOR_TOUCH
 
         elif self.state == MustTouchState.WAIT_FOR_TOUCH:
-            if current_time - self.trial_start_time > self.config["touch_timeout"]:
+            if current_time - self.trial_start_time > touch_timeout:
                 logger.info("Touch timeout on trial %s", self.current_trial + 1)
                 self.write_event("TouchTimeout", self.current_trial + 1)
                 self.clear_images()
@@ -167,7 +181,7 @@ class MustTouch(Trainer):
             self.write_event(f"{side}ScreenTouched", trial_number)
 
             touched_image = self.left_image if side == "LEFT" else self.right_image
-            if touched_image == self.config["correct_image"]:
+            if touched_image == params.correct_image:
                 self.state = MustTouchState.CORRECT
             else:
                 self.state = MustTouchState.ERROR
@@ -185,11 +199,11 @@ class MustTouch(Trainer):
         elif self.state == MustTouchState.DELIVER_REWARD_START:
             self.write_event("RewardStart", self.current_trial + 1)
             self.reward_collected = False
-            self.reward_start_time = self.default_deliver_reward(self.config["reward_pump_secs"])
+            self.reward_start_time = self.default_deliver_reward(reward_pump_secs)
             self.state = MustTouchState.DELIVERING_REWARD
 
         elif self.state == MustTouchState.DELIVERING_REWARD:
-            if current_time - self.reward_start_time < self.config["reward_pump_secs"]:
+            if current_time - self.reward_start_time < reward_pump_secs:
                 if self.chamber.beambreak.state is False and not self.reward_collected:
                     self.reward_collected = True
                     self.write_event("BeamBreakDuringReward", self.current_trial + 1)
@@ -200,7 +214,7 @@ class MustTouch(Trainer):
                 self.state = MustTouchState.POST_REWARD
 
         elif self.state == MustTouchState.POST_REWARD:
-            if current_time - self.reward_start_time < self.config["beam_break_wait_time"]:
+            if current_time - self.reward_start_time < beam_break_wait_time:
                 if self.chamber.beambreak.state is False and not self.reward_collected:
                     self.reward_collected = True
                     self.write_event("BeamBreakAfterReward", self.current_trial + 1)
@@ -211,7 +225,7 @@ class MustTouch(Trainer):
 
         elif self.state == MustTouchState.ITI_START:
             self.write_event("ITIStart", self.current_trial + 1)
-            self.current_trial_iti = self.config["iti_duration"]
+            self.current_trial_iti = iti_duration
             self.iti_start_time = self.default_iti_start()
             self.state = MustTouchState.ITI
 
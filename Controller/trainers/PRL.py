@@ -1,11 +1,14 @@
 import time
 from enum import Enum, auto
 
-from trainers.Trainer import Trainer
+from trainers.Trainer import Trainer, STATE_LOG_INTERVAL
+from SubsystemLog import get_logger
+from Config import Param
 
 import logging
 import random
 logger = logging.getLogger(f"session_logger.{__name__}")
+trainer_log = get_logger("trainer")
 
 class PRLState(Enum):
     """Enum for different states in the PRL trainer."""
@@ -55,25 +58,27 @@ class PRL(Trainer):
         # Initialize the trainer configuration in code.
         self.ensure_trainer_params({
             "trainer_name": "ProbabilisticReversalLearning",
-            "num_trials": 60,
-            "high_reward_probability": 1,
-            "low_reward_probability": 0,
-            "reward_pump_secs": 1.5,
-            "beam_break_wait_time": 10,
-            "iti_duration": 10,
+        })
+        self.declare_params({
+            "num_trials": Param(int, 60, lambda v: v >= 0),
+            "high_reward_probability": Param(float, 1, lambda v: 0 <= v <= 1),
+            "low_reward_probability": Param(float, 0, lambda v: 0 <= v <= 1),
+            "reward_pump_secs": Param(float, 1.5, lambda v: v >= 0),
+            "beam_break_wait_time": Param(float, 10, lambda v: v >= 0),
+            "iti_duration": Param(float, 10, lambda v: v >= 0),
         })
 
 
         # Local variables used by the trainer during the training session.
-        self.ensure_trainer_params({
-            "touch_timeout": 30,
-            "trial_to_reverse": 99,
+        self.declare_params({
+            "touch_timeout": Param(float, 30, lambda v: v >= 0),
+            "trial_to_reverse": Param(int, 99),
         })
 
-        self.reward_start_time = time.time()
+        self.reward_start_time = time.monotonic()
         self.reward_collected = False
-        self.last_beam_break_time = time.time()
-        self.iti_start_time = time.time()
+        self.last_beam_break_time = time.monotonic()
+        self.iti_start_time = time.monotonic()
 
         self.left_image = "x"   # X always on left screen (not tied to reward)
         self.right_image = "o"  # O always on right screen (not tied to reward)
@@ -82,7 +87,7 @@ class PRL(Trainer):
         self.left_reward_probability = 0.0
         self.right_reward_probability = 0.0
         self.current_trial = 0
-        self.current_trial_iti = float(self.config["iti_duration"] or 10.0)
+        self.current_trial_iti = self.params().iti_duration
         self.touched_side = None  # track which side was touched for reward prob lookup
         self.state = PRLState.IDLE
 
@@ -96,6 +101,7 @@ class PRL(Trainer):
     
     def show_images(self):
         """Display images on the M0 devices."""
+        self.note_stimuli()
         # Send commands to M0 devices to show images
         self.chamber.get_left_m0().send_command("SHOW")
         self.chamber.get_right_m0().send_command("SHOW")
@@ -121,24 +127,25 @@ class PRL(Trainer):
 
     def run_training(self):
         """Main loop for running the training session."""
-        current_time = time.time()
-        num_trials = int(self.config["num_trials"] or 0)
-        high_reward_probability = float(self.config["high_reward_probability"] or 0.0)
-        low_reward_probability = float(self.config["low_reward_probability"] or 0.0)
-        touch_timeout = float(self.config["touch_timeout"] or 0.0)
-        trial_to_reverse = int(self.config["trial_to_reverse"] or 0)
-        reward_pump_secs = float(self.config["reward_pump_secs"] or 0.0)
-        beam_break_wait_time = float(self.config["beam_break_wait_time"] or 0.0)
-        iti_duration = float(self.config["iti_duration"] or 0.0)
+        current_time = time.monotonic()
+        params = self.params()
+        num_trials = params.num_trials
+        high_reward_probability = params.high_reward_probability
+        low_reward_probability = params.low_reward_probability
+        touch_timeout = params.touch_timeout
+        trial_to_reverse = params.trial_to_reverse
+        reward_pump_secs = params.reward_pump_secs
+        beam_break_wait_time = params.beam_break_wait_time
+        iti_duration = params.iti_duration
 
         if self.state == PRLState.IDLE:
             # IDLE state, waiting for the start signal
-            logger.debug("Current state: IDLE")
+            trainer_log.debug("Current state: IDLE", every=STATE_LOG_INTERVAL)
             pass 
 
         elif self.state == PRLState.START_TRAINING:
             # START_TRAINING state, initializing the training session
-            logger.debug("Current state: START_TRAINING")
+            trainer_log.debug("Current state: START_TRAINING", every=STATE_LOG_INTERVAL)
             logger.info("Starting training session...")
             self.write_event("StartTraining ", 1)
             ##randomly assign the reward probability to the touch screens
@@ -153,7 +160,7 @@ class PRL(Trainer):
 
         elif self.state == PRLState.START_TRIAL:
             # START_TRIAL state, preparing for the next trial
-            logger.debug("Current state: START_TRIAL")
+            trainer_log.debug("Current state: START_TRIAL", every=STATE_LOG_INTERVAL)
             self.current_trial += 1
             if self.current_trial <= num_trials:
                 trial_number = self.current_trial
@@ -190,7 +197,7 @@ class PRL(Trainer):
         
         elif self.state == PRLState.WAIT_FOR_TOUCH:
             # WAIT_FOR_TOUCH state, waiting for the animal to touch the screen
-            logger.debug("Current state: WAIT_FOR_TOUCH")
+            trainer_log.debug("Current state: WAIT_FOR_TOUCH", every=STATE_LOG_INTERVAL)
             if current_time - self.trial_start_time <= touch_timeout:
                 side = self.check_touch()
                 if side == "LEFT":
@@ -212,7 +219,7 @@ class PRL(Trainer):
         
         elif self.state == PRLState.CORRECT:
             # CORRECT state, handling correct touch
-            logger.debug("Current state: CORRECT")
+            trainer_log.debug("Current state: CORRECT", every=STATE_LOG_INTERVAL)
             logger.info("Correct touch detected.")
             self.write_event("CorrectTouch ", self.current_trial)
 
@@ -229,7 +236,7 @@ class PRL(Trainer):
         
         elif self.state == PRLState.ERROR:
             # ERROR state, handling incorrect touch
-            logger.debug("Current state: ERROR")
+            trainer_log.debug("Current state: ERROR", every=STATE_LOG_INTERVAL)
             logger.info("Incorrect touch detected.")
             self.write_event("IncorrectTouch", self.current_trial)
             self.clear_images()
@@ -245,7 +252,7 @@ class PRL(Trainer):
 
         elif self.state == PRLState.DELIVER_REWARD_START:
             # DELIVER_REWARD_START state, preparing to deliver the reward
-            logger.debug("Current state: DELIVER_REWARD_START")
+            trainer_log.debug("Current state: DELIVER_REWARD_START", every=STATE_LOG_INTERVAL)
             self.reward_start_time = current_time
             logger.info(f"Preparing to deliver reward for trial {self.current_trial}...")
             self.write_event("DeliverRewardStart", self.current_trial)
@@ -256,7 +263,7 @@ class PRL(Trainer):
 
         elif self.state == PRLState.DELIVERING_REWARD:
             # DELIVERING_REWARD state, dispensing the reward
-            logger.debug("Current state: DELIVERING_REWARD")
+            trainer_log.debug("Current state: DELIVERING_REWARD", every=STATE_LOG_INTERVAL)
             if current_time - self.reward_start_time < reward_pump_secs:
                 if self.chamber.beambreak.state==False and not self.reward_collected:
                     # Beam break detected during reward dispense
@@ -274,7 +281,7 @@ class PRL(Trainer):
 
         elif self.state == PRLState.POST_REWARD:
             # POST_REWARD state, waiting for beam break or timeout
-            logger.debug("Current state: POST_REWARD")
+            trainer_log.debug("Current state: POST_REWARD", every=STATE_LOG_INTERVAL)
             if (current_time - self.reward_start_time) < beam_break_wait_time:
                 if not self.reward_collected and self.chamber.beambreak.state==False:
                     # Beam break detected after reward dispense
@@ -291,7 +298,7 @@ class PRL(Trainer):
         
         elif self.state == PRLState.ITI_START:
             # ITI_START state, preparing for the ITI period
-            logger.debug("Current state: ITI_START")
+            trainer_log.debug("Current state: ITI_START", every=STATE_LOG_INTERVAL)
             self.write_event("ITIStart", self.current_trial)
             #self.chamber.beambreak.activate()
             self.chamber.reward_led.deactivate()
@@ -303,7 +310,7 @@ class PRL(Trainer):
         
         elif self.state == PRLState.ITI:
             # ITI state, waiting for the ITI duration
-            logger.debug("Current state: ITI")
+            trainer_log.debug("Current state: ITI", every=STATE_LOG_INTERVAL)
             if current_time - self.iti_start_time < self.current_trial_iti:
                 # Check if beam break is detected during ITI
                 # if self.chamber.beambreak.state==False:
@@ -316,14 +323,14 @@ class PRL(Trainer):
         
         elif self.state == PRLState.END_TRIAL:
             # END_TRIAL state, finalizing the trial
-            logger.debug("Current state: END_TRIAL")
+            trainer_log.debug("Current state: END_TRIAL", every=STATE_LOG_INTERVAL)
             logger.info(f"Ending trial {self.current_trial}...")
             self.write_event("EndTrial", self.current_trial)
             self.state = PRLState.START_TRIAL
 
         elif self.state == PRLState.END_TRAINING:
             # End the training session
-            logger.debug("Current state: END_TRAINING")
+            trainer_log.debug("Current state: END_TRAINING", every=STATE_LOG_INTERVAL)
             logger.info("Ending training session...")
             self.write_event("EndTraining", 1)
             self.state = PRLState.IDLE
@@ -2,10 +2,13 @@ import time
 from enum import Enum, auto
 import os
 
-from trainers.Trainer import Trainer
+from trainers.Trainer import Trainer, STATE_LOG_INTERVAL
+from SubsystemLog import get_logger
+from Config import Param
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
+trainer_log = get_logger("trainer")
 
 
 class PunishIncorrectState(Enum):
@@ -37,15 +40,17 @@ class PunishIncorrect(Trainer):
 
         # Initialize the trainer configuration in code.
         self.config.ensure_param("trainer_name", "PunishIncorrect")
-        self.config.ensure_param("num_trials", 30)             # Total number of trials
-        self.config.ensure_param("iti_duration", 10)           # Inter-trial interval duration (seconds)
-        self.config.ensure_param("reward_duration", 3.0)       # Reward duration for correct response
-        self.config.ensure_param("punish_duration", 5.0)       # Punishment duration for incorrect response
-        self.config.ensure_param("buzzer_duration", 0.5)       # Duration of buzzer during punishment
-        self.config.ensure_param("touch_timeout", 300)         # Time allowed for touch response
-        self.config.ensure_param("trainer_seq_dir", "")        # Directory containing sequence file
-        self.config.ensure_param("trainer_seq_file", "")       # Sequence file name
-        self.config.ensure_param("correct_image", "A01")       # Image identifier for correct choice
+        self.declare_params({
+            "num_trials": Param(int, 30, lambda v: v >= 0),              # Total number of trials
+            "iti_duration": Param(float, 10, lambda v: v >= 0),          # Inter-trial interval duration (seconds)
+            "reward_duration": Param(float, 3.0, lambda v: v >= 0),      # Reward duration for correct response
+            "punish_duration": Param(float, 5.0, lambda v: v >= 0),      # Punishment duration for incorrect response
+            "buzzer_duration": Param(float, 0.5, lambda v: v >= 0),      # Duration of buzzer during punishment
+            "touch_timeout": Param(float, 300, lambda v: v >= 0),        # Time allowed for touch response
+            "correct_image": Param(lambda v: str(v).strip().upper(), "A01"),  # Image identifier for correct choice
+            "trainer_seq_dir": Param(str, ""),                           # Directory containing sequence file
+            "trainer_seq_file": Param(str, ""),                          # Sequence file name
+        })
 
         # Local variables used during training
         self.current_trial = 0
@@ -67,14 +72,15 @@ class PunishIncorrect(Trainer):
 
     def _is_correct_image(self, image_id):
         """Return True if the touched image matches the configured correct image."""
-        return self._normalize_image_id(image_id) == self._normalize_image_id(self.config["correct_image"])
+        return self._normalize_image_id(image_id) == self.params().correct_image
 
     def start_training(self):
         # Starting the training session
         logger.info("Starting Punish Incorrect training session...")
-        trainer_seq_dir = str(self.config["trainer_seq_dir"] or "")
-        trainer_seq_file_name = str(self.config["trainer_seq_file"] or "")
-        num_trials = int(self.config["num_trials"] or 0)
+        params = self.params()
+        trainer_seq_dir = params.trainer_seq_dir
+        trainer_seq_file_name = params.trainer_seq_file
+        num_trials = params.num_trials
 
         # Reset chamber hardware to default state
         self.chamber.default_state()
@@ -149,6 +155,7 @@ class PunishIncorrect(Trainer):
 
     def show_images(self):
         """Display images on the M0 devices."""
+        self.note_stimuli()
         # Send show command to both screens
         if self.left_image.upper() != "BLACK":
             self.chamber.get_left_m0().send_command("SHOW")
@@ -167,14 +174,15 @@ class PunishIncorrect(Trainer):
 
     def run_training(self):
         """Main loop controlling the training state machine."""
-        current_time = time.time()
-        num_trials = int(self.config["num_trials"] or 0)
-        iti_duration = float(self.config["iti_duration"] or 0.0)
-        touch_timeout = float(self.config["touch_timeout"] or 0.0)
-        reward_duration = float(self.config["reward_duration"] or 0.0)
-        buzzer_duration = float(self.config["buzzer_duration"] or 0.0)
-        punish_duration = float(self.config["punish_duration"] or 0.0)
-        correct_image = str(self.config["correct_image"] or "").strip().upper()
+        current_time = time.monotonic()
+        params = self.params()
+        num_trials = params.num_trials
+        iti_duration = params.iti_duration
+        touch_timeout = params.touch_timeout
+        reward_duration = params.reward_duration
+        buzzer_duration = params.buzzer_duration
+        punish_duration = params.punish_duration
+        correct_image = params.correct_image
 
         if self.state == PunishIncorrectState.IDLE:
             # IDLE state, waiting for training to start
@@ -182,7 +190,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.START_TRAINING:
             # Initialize training session
-            logger.debug("Current state: START_TRAINING")
+            trainer_log.debug("Current state: START_TRAINING", every=STATE_LOG_INTERVAL)
             self.write_event("StartTraining", 1)
 
             self.current_trial = 1
@@ -190,7 +198,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.START_TRIAL:
             # Start a new trial
-            logger.debug("Current state: START_TRIAL")
+            trainer_log.debug("Current state: START_TRIAL", every=STATE_LOG_INTERVAL)
             if self.current_trial <= num_trials:
                 trial_number = self.current_trial
                 logger.info("Starting trial %s", trial_number)
@@ -206,14 +214,14 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.ITI_START:
             # Begin inter-trial interval
-            logger.debug("Current state: ITI_START")
+            trainer_log.debug("Current state: ITI_START", every=STATE_LOG_INTERVAL)
             self.iti_start_time = current_time
             self.write_event("ITIStart", self.current_trial)
             self.state = PunishIncorrectState.ITI
 
         elif self.state == PunishIncorrectState.ITI:
             # Waiting during inter-trial interval
-            logger.debug("Current state: ITI")
+            trainer_log.debug("Current state: ITI", every=STATE_LOG_INTERVAL)
             if current_time - self.iti_start_time >= iti_duration:
                 self.state = PunishIncorrectState.END_TRIAL
 
@@ -221,7 +229,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.WAIT_FOR_TOUCH:
             # Waiting for screen touch
-            logger.debug("Current state: WAIT_FOR_TOUCH")
+            trainer_log.debug("Current state: WAIT_FOR_TOUCH", every=STATE_LOG_INTERVAL)
             if current_time - self.trial_start_time <= touch_timeout:
                 side = self.check_touch()
                 if side == "LEFT":
@@ -247,27 +255,27 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.CORRECT:
             # Correct touch detected
-            logger.debug("Current state: CORRECT")
+            trainer_log.debug("Current state: CORRECT", every=STATE_LOG_INTERVAL)
             self.write_event("CorrectTouch", self.current_trial)
             self.clear_images()
             self.state = PunishIncorrectState.REWARD_START
 
         elif self.state == PunishIncorrectState.INCORRECT:
             # Incorrect touch detected
-            logger.debug("Current state: INCORRECT")
+            trainer_log.debug("Current state: INCORRECT", every=STATE_LOG_INTERVAL)
             self.write_event("IncorrectTouch", self.current_trial)
             self.clear_images()
             self.state = PunishIncorrectState.PUNISH_START
 
         elif self.state == PunishIncorrectState.NO_TOUCH:
             # No response detected
-            logger.debug("Current state: NO_TOUCH")
+            trainer_log.debug("Current state: NO_TOUCH", every=STATE_LOG_INTERVAL)
             self.clear_images()
             self.state = PunishIncorrectState.ITI_START
 
         elif self.state == PunishIncorrectState.REWARD_START:
             # Start reward delivery
-            logger.debug("Current state: REWARD_START")
+            trainer_log.debug("Current state: REWARD_START", every=STATE_LOG_INTERVAL)
             self.reward_start_time = current_time
             self.write_event("RewardStart", self.current_trial)
             self.chamber.reward.dispense()
@@ -276,7 +284,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.DELIVERING_REWARD:
             # Delivering reward
-            logger.debug("Current state: DELIVERING_REWARD")
+            trainer_log.debug("Current state: DELIVERING_REWARD", every=STATE_LOG_INTERVAL)
             if current_time - self.reward_start_time >= reward_duration:
                 self.chamber.reward.stop()
                 self.chamber.reward_led.deactivate()
@@ -284,7 +292,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.PUNISH_START:
             # Start punishment
-            logger.debug("Current state: PUNISH_START")
+            trainer_log.debug("Current state: PUNISH_START", every=STATE_LOG_INTERVAL)
             self.punish_start_time = current_time
             self.write_event("PunishStart", self.current_trial)
             self.chamber.punishment_led.activate()
@@ -293,7 +301,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.DELIVERING_PUNISH:
             # Delivering punishment
-            logger.debug("Current state: DELIVERING_PUNISH")
+            trainer_log.debug("Current state: DELIVERING_PUNISH", every=STATE_LOG_INTERVAL)
             elapsed = current_time - self.punish_start_time
 
             if elapsed >= buzzer_duration:
@@ -305,7 +313,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.END_TRIAL:
             # End of trial cleanup
-            logger.debug("Current state: END_TRIAL")
+            trainer_log.debug("Current state: END_TRIAL", every=STATE_LOG_INTERVAL)
             self.write_event("EndTrial", self.current_trial)
             self.current_trial += 1
 
@@ -313,7 +321,7 @@ class PunishIncorrect(Trainer):
 
         elif self.state == PunishIncorrectState.END_TRAINING:
             # End the training session
-            logger.debug("Current state: END_TRAINING")
+            trainer_log.debug("Current state: END_TRAINING", every=STATE_LOG_INTERVAL)
             self.write_event("EndTraining", 1)
             self.state = PunishIncorrectState.IDLE
             self.stop_training()
@@ -3,6 +3,7 @@ from enum import Enum, auto
 import time
 import logging
 from trainers.Trainer import Trainer
+from Config import Param
 
 logger = logging.getLogger(f"session_logger.{__name__}")
 
@@ -28,16 +29,18 @@ class SimpleDiscrimination(Trainer):
         super().__init__(chamber, trainer_config)
 
         self.config.ensure_param("trainer_name", "Simple Discrimination")
-        self.config.ensure_param("num_trials", 30)
-        self.config.ensure_param("reward_pump_secs", 0.5)
-        self.config.ensure_param("punish_duration", 5.0)
-        self.config.ensure_param("buzzer_duration", 0.5)
-        self.config.ensure_param("iti_duration", 10)
-        self.config.ensure_param("touch_timeout", 300)
-        self.config.ensure_param("session_timeout_minutes", 60)
-        self.config.ensure_param("trainer_seq_dir", "")
-        self.config.ensure_param("trainer_seq_file", "")
-        self.config.ensure_param("correct_image", "A01")
+        self.declare_params({
+            "num_trials": Param(int, 30, lambda v: v >= 0),
+            "reward_pump_secs": Param(float, 0.5, lambda v: v >= 0),
+            "punish_duration": Param(float, 5.0, lambda v: v >= 0),
+            "buzzer_duration": Param(float, 0.5, lambda v: v >= 0),
+            "iti_duration": Param(float, 10, lambda v: v >= 0),
+            "touch_timeout": Param(float, 300, lambda v: v >= 0),
+            "session_timeout_minutes": Param(float, 60, lambda v: v >= 0),
+            "trainer_seq_dir": Param(str, ""),
+            "trainer_seq_file": Param(str, ""),
+            "correct_image": Param(lambda v: str(v).strip().upper(), "A01"),
+        })
 
         self.state = SDState.IDLE
         self.current_trial = 0  # successful trials completed
@@ -62,7 +65,7 @@ class SimpleDiscrimination(Trainer):
         return str(image_id).strip().upper()
 
     def _is_correct_image(self, image_id):
-        return self._normalize_image_id(image_id) == self._normalize_image_id(self.config["correct_image"])
+        return self._normalize_image_id(image_id) == self.params().correct_image
 
     def load_images(self, trial_index):
         self.left_image = str(self.trials[trial_index][0]).strip()
@@ -79,6 +82,7 @@ class SimpleDiscrimination(Trainer):
             self.chamber.get_right_m0().send_command(f"IMG:{self.right_image}")
 
     def show_images(self):
+        self.note_stimuli()
         if self._normalize_image_id(self.left_image) != "BLACK":
             self.chamber.get_left_m0().send_command("SHOW")
         if self._normalize_image_id(self.right_image) != "BLACK":
@@ -92,9 +96,10 @@ class SimpleDiscrimination(Trainer):
 
     def start_training(self):
         logger.info("Starting Simple Discrimination training")
-        trainer_seq_dir = str(self.config["trainer_seq_dir"] or "")
-        trainer_seq_file_name = str(self.config["trainer_seq_file"] or "")
-        num_trials = int(self.config["num_trials"] or 0)
+        params = self.params()
+        trainer_seq_dir = params.trainer_seq_dir
+        trainer_seq_file_name = params.trainer_seq_file
+        num_trials = params.num_trials
 
         trainer_seq_file = os.path.join(trainer_seq_dir, trainer_seq_file_name)
         self.trials = self.read_trainer_seq_file(trainer_seq_file, 2)
@@ -118,18 +123,19 @@ class SimpleDiscrimination(Trainer):
 
         self.chamber.default_state()
         self.open_data_file()
-        self.session_start_time = time.time()
+        self.session_start_time = time.monotonic()
         self.state = SDState.START_TRAINING
 
     def run_training(self):
-        now = time.time()
-        num_trials = int(self.config["num_trials"] or 0)
-        touch_timeout = float(self.config["touch_timeout"] or 0.0)
-        reward_pump_secs = float(self.config["reward_pump_secs"] or 0.0)
-        punish_duration = float(self.config["punish_duration"] or 0.0)
-        buzzer_duration = float(self.config["buzzer_duration"] or 0.0)
-        iti_duration = float(self.config["iti_duration"] or 0.0)
-        session_timeout_secs = float(self.config["session_timeout_minutes"] or 0.0) * 60.0
+        now = time.monotonic()
+        params = self.params()
+        num_trials = params.num_trials
+        touch_timeout = params.touch_timeout
+        reward_pump_secs = params.reward_pump_secs
+        punish_duration = params.punish_duration
+        buzzer_duration = params.buzzer_duration
+        iti_duration = params.iti_duration
+        session_timeout_secs = params.session_timeout_minutes * 60.0
 
         if (
             self.state not in (SDState.IDLE, SDState.END_TRAINING)
@@ -1,6 +1,7 @@
 import time
 from enum import Enum, auto
 from trainers.Trainer import Trainer
+from Config import Param
 import logging
 
 logger = logging.getLogger(f"session_logger.{__name__}")
@@ -28,10 +29,12 @@ class SoundTest(Trainer):
         super().__init__(chamber=chamber, trainer_config=trainer_config)
 
         self.config.ensure_param("trainer_name", "SoundTest")
-        self.config.ensure_param("num_loops", 5)
-        self.config.ensure_param("step_duration", 10.0)
+        self.declare_params({
+            "num_loops": Param(int, 5, lambda v: v >= 0),
+            "step_duration": Param(float, 10.0, lambda v: v >= 0),
+        })
 
-        self.state_start_time = time.time()
+        self.state_start_time = time.monotonic()
         self.current_loop = 0
         self.state = SoundTestState.IDLE
 
@@ -44,11 +47,12 @@ class SoundTest(Trainer):
 
     def check_duration(self, duration):
         """Check if the duration has passed since state_start_time."""
-        return (time.time() - self.state_start_time) >= duration
+        return (time.monotonic() - self.state_start_time) >= duration
 
     def run_training(self):
         """Main loop for running the test session."""
-        current_time = time.time()
+        current_time = time.monotonic()
+        params = self.params()
 
         if self.state == SoundTestState.IDLE:
             pass
@@ -56,7 +60,7 @@ class SoundTest(Trainer):
         elif self.state == SoundTestState.START_LOOP:
             self.chamber.m0_clear()
             self.current_loop += 1
-            if self.current_loop <= self.config["num_loops"]:
+            if self.current_loop <= params.num_loops:
                 logger.info(f"Starting loop {self.current_loop}")
                 self.write_event("StartLoop", self.current_loop)
                 self.baseline_active = False
@@ -77,7 +81,7 @@ class SoundTest(Trainer):
                 self.baseline_active = True
                 self.state_start_time = current_time
             
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("Baseline over")
                 self.write_event("Baseline", "OFF")
                 self.baseline_active = False
@@ -92,7 +96,7 @@ class SoundTest(Trainer):
                 self.house_light_active = True
                 self.state_start_time = current_time
             
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("House Light OFF")
                 self.write_event("HouseLight", "OFF")
                 self.chamber.house_led.deactivate()
@@ -107,7 +111,7 @@ class SoundTest(Trainer):
                 self.reward_led_active = True
                 self.state_start_time = current_time
 
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("Reward LED OFF")
                 self.write_event("RewardLED", "OFF")
                 self.chamber.reward_led.deactivate()
@@ -122,7 +126,7 @@ class SoundTest(Trainer):
                 self.punishment_led_active = True
                 self.state_start_time = current_time
 
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("Punishment LED OFF")
                 self.write_event("PunishmentLED", "OFF")
                 self.chamber.punishment_led.deactivate()
@@ -139,7 +143,7 @@ class SoundTest(Trainer):
                 self.buzzer_60_active = True
                 self.state_start_time = current_time
 
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("Buzzer 60% Volume OFF")
                 self.write_event("Buzzer60", "OFF")
                 self.chamber.buzzer.deactivate()
@@ -156,7 +160,7 @@ class SoundTest(Trainer):
                 self.images_active = True
                 self.state_start_time = current_time
 
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("Images OFF")
                 self.write_event("Images", "OFF")
                 self.chamber.m0_clear()
@@ -171,7 +175,7 @@ class SoundTest(Trainer):
                 self.reward_active = True
                 self.state_start_time = current_time
 
-            if self.check_duration(self.config["step_duration"]):
+            if self.check_duration(params.step_duration):
                 logger.info("Reward Dispense OFF")
                 self.write_event("Reward", "OFF")
                 self.chamber.reward.stop()
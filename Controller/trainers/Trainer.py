@@ -1,15 +1,26 @@
-import json
 import csv
 import os
 from Chamber import Chamber
 from datetime import datetime
 from abc import ABC, abstractmethod
-from Config import Config
+from Config import Config, ParamSchema
+from EventWriter import EventWriter, CsvRowWriter
+from BinaryEventLog import BinaryEventLogWriter
+from HardwareEvents import drain_all
+from analysis.Export import export_session_async, export_paths
+from analysis.TrialReducer import TrialReducer, TRIAL_FIELDS
+import Tracing
 import time
 
 import logging
 logger = logging.getLogger(f"session_logger.{__name__}")
 
+# Per-tick state lines repeated within this many seconds are suppressed (and counted)
+STATE_LOG_INTERVAL = 10.0
+
+# Columns of the live per-trial summary: the reduced trial row plus the stimuli shown
+TRIAL_SUMMARY_FIELDS = TRIAL_FIELDS + ["left_image", "right_image"]
+
 class Trainer(ABC):
     # Base trainer class for running training sessions
 
@@ -27,8 +38,16 @@ class Trainer(ABC):
 
         self.chamber = chamber
         self.config = Config(config = trainer_config)
+        self.config.ensure_param("data_fsync_interval", 1.0) # Seconds between fsyncs of the data file
+        self.config.ensure_param("binary_event_log", False) # Also write a columnar binary event log (.nc4b)
+        self.config.ensure_param("trial_summary_file", True) # Append a per-trial summary row to <data>_trials.csv at each EndTrial
+        self.config.ensure_param("export_on_stop", True) # Without a live summary, export one in the background after closing the data file
+        self.config.ensure_param("hardware_events", True) # Write each device state change and M0 serial line, with its own t_ns, to the data file
 
-        self.data_file = None
+        self.data_file = None # EventWriter for the open data file
+        self.trial_reducer = None # Folds events into per-trial rows and running session statistics
+        self.trial_summary_file = None # CsvRowWriter for the live per-trial summary
+        self.param_schema = ParamSchema(f"{type(self).__name__}Params", {}) # Typed parameters read by params()
 
     def ensure_trainer_param(self, param: str, default_value):
         self.config.ensure_param(param, default_value)
@@ -36,6 +55,16 @@ class Trainer(ABC):
     def ensure_trainer_params(self, params: dict):
         for param, default_value in params.items():
             self.ensure_trainer_param(param, default_value)
+
+    def declare_params(self, params: dict):
+        """Declare typed parameters ({name: Config.Param}) and ensure their defaults in the config."""
+        self.param_schema = self.param_schema.extend(params)
+        for param, spec in params.items():
+            self.ensure_trainer_param(param, spec.default)
+
+    def params(self):
+        """Typed, immutable snapshot of the declared parameters; rebuilt only after the config changes."""
+        return self.config.snapshot(self.param_schema)
     
     def read_trainer_seq_file(self, csv_file_path, min_num_columns = 2):
         # Read trial sequence from CSV file
@@ -53,7 +82,7 @@ class Trainer(ABC):
         return trials
 
     def open_data_file(self):
-        # Create a new JSON file for trial data
+        # Create a new JSON Lines file for trial data, written by a background EventWriter
         try:
             if self.data_file is None:
                 date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -66,21 +95,44 @@ class Trainer(ABC):
                 self.data_filepath = os.path.join(data_dir, self.data_filename)
                 
                 logger.info(f"Creating data file: {self.data_filepath}")
-                self.data_file = open(self.data_filepath, "w")
-                self.data_file.write("# NC4Touch training data\n")
+                binary_log = None
+                if self.config["binary_event_log"]:
+                    binary_log = BinaryEventLogWriter(os.path.splitext(self.data_filepath)[0] + ".nc4b")
+                self.data_file = EventWriter(self.data_filepath, fsync_interval=self.config["data_fsync_interval"],
+                                             binary_log=binary_log)
+                self.data_file.start()
+
+                self.trial_reducer = TrialReducer(self.config["trainer_name"])
+                if self.config["trial_summary_file"]:
+                    self.trial_summary_file = CsvRowWriter(export_paths(self.data_filepath)[0], TRIAL_SUMMARY_FIELDS,
+                                                           fsync_interval=self.config["data_fsync_interval"])
+                    self.trial_summary_file.start()
 
-                # Create a header with metadata
+                # Create a header with metadata. Event t_ns values are time.monotonic_ns();
+                # the wall clock anchor converts them to wall clock time once, at analysis time.
                 header = {
                     "header": {
                         "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f"),
+                        "wall_clock_anchor": {
+                            "time_ns": time.time_ns(),
+                            "monotonic_ns": time.monotonic_ns(),
+                        },
                         "rodent": self.config["rodent_name"],
                         "chamber": self.chamber.config["chamber_name"],
                         "trainer": self.config["trainer_name"],
                     }
                 }
-                # Write the header to the json file
-                json.dump(header, self.data_file)
+                # Write the header as the first line of the file
+                self.data_file.write(header)
+                drain_all(self.hardware_logs())  # Changes and pulses from before the session are not part of it
+                sync_output = getattr(self.chamber, "sync_output", None)
+                if sync_output is not None:
+                    sync_output.drain_pulses()
                 logger.info(f"Data file created successfully: {self.data_filepath}")
+
+                sync_input = getattr(self.chamber, "sync_input", None)
+                if sync_input is not None:
+                    sync_input.start()
             else:
                 logger.warning("Data file already open. Skipping creation.")
         except Exception as e:
@@ -91,23 +143,95 @@ class Trainer(ABC):
         if self.data_file:
             logger.info(f"Closing data file: {self.data_filename}")
 
-            self.data_file.close()
+            self.write_hardware_events()
+            sync_output = getattr(self.chamber, "sync_output", None)
+            if sync_output is not None:
+                self.write_sync_pulses(sync_output)
+            sync_input = getattr(self.chamber, "sync_input", None)
+            if sync_input is not None and sync_input.enabled:
+                sync_input.stop()
+                self.write_event("SyncInputClockMap", sync_input.fit_clock_mappings())
+            with Tracing.span("close data file", "data"):
+                self.data_file.stop()
+            logger.debug(f"Data file metrics: {self.data_file.get_metrics()}")
             self.data_file = None
+
+            if self.trial_reducer is not None:
+                self.write_trial_summary(self.trial_reducer.finish())
+                logger.info(f"Session summary: {self.trial_reducer.summary()}")
+            if self.trial_summary_file is not None:
+                self.trial_summary_file.stop()
+                self.trial_summary_file = None
+            elif self.config["export_on_stop"]:
+                export_session_async(self.data_filepath, trainer=self.config["trainer_name"])
         else:
             logger.debug("Data file already closed; skipping.")
     
     def write_event(self, event, data):
         # Write a single event to the data file
+        sync_output = getattr(self.chamber, "sync_output", None)
+        if sync_output is not None:
+            sync_output.on_trainer_event(event, data)
+
         if self.data_file:
+            self.write_hardware_events()
             event_data = {
-                "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f"),
+                "t_ns": time.monotonic_ns(),
                 "event": event,
                 "data": data,
             }
-            json.dump(event_data, self.data_file)
+            self.data_file.write(event_data)
+            Tracing.instant(event, "event")
+            if sync_output is not None:
+                self.write_sync_pulses(sync_output)
+            if self.trial_reducer is not None:
+                self.write_trial_summary(self.trial_reducer.add(event_data))
         else:
             logger.warning("Data file is not open. Cannot write event.")
 
+    def hardware_logs(self):
+        logs = getattr(self.chamber, "hardware_logs", None)
+        return logs() if callable(logs) and self.config["hardware_events"] else []
+
+    def write_hardware_events(self):
+        # Log the device changes and serial lines since the last event, each at the t_ns the device recorded
+        for change in drain_all(self.hardware_logs()):
+            self.data_file.write({
+                "t_ns": change.pop("t_ns"),
+                "event": "HardwareEvent",
+                "data": change,
+            })
+
+    def write_sync_pulses(self, sync_output):
+        # Log the pigpio ticks of sync pulses emitted since the last event (trainer or hardware triggered),
+        # each at the t_ns it was sent
+        for pulse in sync_output.drain_pulses():
+            event_data = {
+                "t_ns": pulse.pop("t_ns"),
+                "event": "SyncPulse",
+                "data": pulse,
+            }
+            self.data_file.write(event_data)
+
+    def note_stimuli(self):
+        # Called when images are shown: the current trial's summary row keeps them, as the trial may only
+        # complete at the next StartTrial, after the next images are loaded
+        if self.trial_reducer is not None:
+            self.trial_reducer.annotate(left_image=getattr(self, "left_image", None),
+                                        right_image=getattr(self, "right_image", None))
+
+    def write_trial_summary(self, row):
+        # Append a completed trial's row, with the stimuli it showed (see note_stimuli), to the live summary
+        if row is None or self.trial_summary_file is None:
+            return
+        self.trial_summary_file.write(row)
+
+    def get_session_summary(self):
+        """Running statistics over the completed trials of the current session (O(1))."""
+        if self.trial_reducer is None:
+            return None
+        return self.trial_reducer.summary()
+
     # ---- Default behavior methods (opt-in, called from subclass state machines) ----
 
     def default_start_trial(self):
@@ -126,7 +250,7 @@ class Trainer(ABC):
         self.chamber.house_led.set_brightness(iti_brightness)
         self.chamber.reward_led.deactivate()
         self.chamber.beambreak.activate()
-        return time.time()
+        return time.monotonic()
 
     def default_iti_check_beam_break(self, current_iti_duration):
         """Check for beam break during ITI and extend duration if needed."""
@@ -147,7 +271,7 @@ class Trainer(ABC):
         self.chamber.reward.dispense()
         self.chamber.reward_led.activate()
         self.chamber.beambreak.activate()
-        return time.time()
+        return time.monotonic()
 
     def default_stop_reward(self):
         """Stop pump, deactivate reward LED and beambreak."""
@@ -159,7 +283,7 @@ class Trainer(ABC):
         """Activate punishment LED and buzzer. Returns start time."""
         self.chamber.punishment_led.activate()
         self.chamber.buzzer.activate()
-        return time.time()
+        return time.monotonic()
 
     def default_stop_punishment(self):
         """Deactivate punishment LED and buzzer."""
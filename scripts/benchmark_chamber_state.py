@@ -0,0 +1,127 @@
+"""
+Chamber State Publishing Benchmark
+
+Compares the old WebUI update model, where every client re-reads the chamber and resets
+every label once a second, with the ChamberState publisher, which samples once for all
+clients at STATE_SAMPLE_INTERVAL and pushes only changed fields. Uses stand-in chamber
+objects and elements that count updates, so no hardware or browser is needed.
+
+Reports, for an idle chamber, the CPU time per second and element updates per second,
+and the latency from a state change (reward LED on) to a client's element update.
+
+Usage:
+    python benchmark_chamber_state.py [--clients 1 5 20] [--interval 0.1]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import threading
+from enum import Enum
+from types import SimpleNamespace
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+from ChamberState import SessionStatePublisher
+
+class Mode(Enum):
+    SERIAL_COMM = 1
+
+class Element:
+    """Stand-in for a NiceGUI label/toggle/slider that counts the updates it would send."""
+    updates = 0
+    def set_text(self, text):
+        Element.updates += 1
+    def set_value(self, value):
+        Element.updates += 1
+
+def make_session():
+    m0s = [SimpleNamespace(id=f"M0_{i}", port=f"/dev/ttyACM{i}", mode=Mode.SERIAL_COMM, firmware_version="1.2") for i in range(3)]
+    led = lambda: SimpleNamespace(active=False, brightness=100)
+    chamber = SimpleNamespace(m0s=m0s, reward_led=led(), punishment_led=led(), house_led=led(),
+                              reward=SimpleNamespace(state=False), beambreak=SimpleNamespace(state=True))
+    chamber.get_m0 = lambda m0_id: next((m0 for m0 in chamber.m0s if m0.id == m0_id), None)
+    summary = {"trials": 12, "correct": 9, "incorrect": 3, "omissions": 0, "accuracy": 0.75}
+    trainer = SimpleNamespace(state=Mode.SERIAL_COMM, current_trial=12, get_session_summary=lambda: dict(summary))
+    return SimpleNamespace(chamber=chamber, trainer=trainer)
+
+def legacy_update(session, elements):
+    """The old per-client WebUI.update_state: every label and control, every second."""
+    chamber = session.chamber
+    for side, m0_id in (("left", "M0_0"), ("middle", "M0_1"), ("right", "M0_2")):
+        m0 = chamber.get_m0(m0_id)
+        elements[side + "_port"].set_text(f"Port: {m0.port}")
+        elements[side + "_mode"].set_text(f"Mode: {m0.mode.name}")
+        elements[side + "_version"].set_text(f"Firmware: {m0.firmware_version}")
+    elements["slider"].set_value(100.0 * chamber.house_led.brightness / 255.0)
+    elements["pump"].set_value(chamber.reward.state)
+    elements["reward_led"].set_value(chamber.reward_led.active)
+    elements["punishment_led"].set_value(chamber.punishment_led.active)
+    summary = session.trainer.get_session_summary()
+    elements["summary"].set_text(f"Trials: {summary['trials']}  Correct: {summary['correct']}  "
+                                 f"Accuracy: {100 * summary['accuracy']:.0f}%  Omissions: {summary['omissions']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chamber state publishing.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--interval", type=float, default=0.1, help="Publisher sample interval (s)")
+    parser.add_argument("--seconds", type=int, default=200, help="Simulated idle seconds")
+    args = parser.parse_args()
+
+    session = make_session()
+    names = [f"{side}_{label}" for side in ("left", "middle", "right") for label in ("port", "mode", "version")] + \
+        ["slider", "pump", "reward_led", "punishment_led", "summary"]
+
+    print(f"Idle chamber, per second of wall time ({args.seconds} s simulated):")
+    for clients in args.clients:
+        elements = [{name: Element() for name in names} for _ in range(clients)]
+        Element.updates = 0
+        start = time.process_time()
+        for _ in range(args.seconds):
+            for client in elements:
+                legacy_update(session, client)
+        legacy_cpu = (time.process_time() - start) / args.seconds
+        legacy_updates = Element.updates / args.seconds
+
+        publisher = SessionStatePublisher(session)
+        for _ in range(clients):
+            publisher.state.subscribe(lambda changed: [Element().set_text(str(v)) for v in changed.values()])
+        publisher.refresh()  # Initial full state
+        Element.updates = 0
+        samples = int(args.seconds / args.interval)
+        start = time.process_time()
+        for _ in range(samples):
+            publisher.refresh()
+        publisher_cpu = (time.process_time() - start) / args.seconds
+        publisher_updates = Element.updates / args.seconds
+        print(f"  {clients:3d} clients: poll {legacy_cpu * 1e6:8.1f} us CPU, {legacy_updates:6.1f} updates | "
+              f"publisher {publisher_cpu * 1e6:8.1f} us CPU, {publisher_updates:6.1f} updates")
+
+    # Latency from a change to the subscriber seeing it, sampling on a background thread
+    publisher = SessionStatePublisher(session)
+    publisher.refresh()
+    seen = threading.Event()
+    publisher.state.subscribe(lambda changed: seen.set() if "reward_led" in changed else None)
+    stop = threading.Event()
+    def sample_loop():
+        while not stop.wait(args.interval):
+            publisher.refresh()
+    threading.Thread(target=sample_loop, daemon=True).start()
+    latencies = []
+    for _ in range(20):
+        time.sleep(random.uniform(0, args.interval))
+        seen.clear()
+        start = time.perf_counter()
+        session.chamber.reward_led.active = not session.chamber.reward_led.active
+        seen.wait(2)
+        latencies.append(time.perf_counter() - start)
+    stop.set()
+    latencies.sort()
+    print(f"Change-to-update latency: median {latencies[10] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms "
+          f"(1 s polling: median ~500 ms, max ~1000 ms)")
+
+if __name__ == "__main__":
+    main()
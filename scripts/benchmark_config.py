@@ -0,0 +1,96 @@
+"""
+Config Persistence Benchmark
+
+Replays the ensure_param() sequence a Chamber and a trainer run at startup against a
+temporary config file, once writing the file on every change (save_delay=0, the old
+behaviour) and once with the default debounce, and counts the file writes each makes.
+Also compares loading a config file with the pure-Python and C YAML loaders.
+
+Usage:
+    python benchmark_config.py [--params 40] [--repeat 20]
+"""
+
+import sys
+import os
+import time
+import argparse
+import logging
+import tempfile
+
+import yaml
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+import Config as config_module
+from Config import Config
+
+def count_replaces():
+    """Wrap os.replace so the number of config file writes can be counted."""
+    counter = {"writes": 0}
+    original = os.replace
+    def replace(src, dst, *args, **kwargs):
+        counter["writes"] += 1
+        return original(src, dst, *args, **kwargs)
+    os.replace = replace
+    return counter, original
+
+def startup(config_file, params, save_delay):
+    config = Config(config_file=config_file, save_delay=save_delay)
+    for i in range(params):
+        config.ensure_param(f"param_{i}", [i, i + 1, i + 2] if i % 3 == 0 else i * 0.5)
+    config.flush()
+    return config
+
+def bench_startup(params, repeat, save_delay):
+    counter, original = count_replaces()
+    try:
+        elapsed = 0.0
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                config_file = os.path.join(tmp, "chamber_config.yaml")
+                start = time.perf_counter()
+                startup(config_file, params, save_delay)
+                elapsed += time.perf_counter() - start
+    finally:
+        os.replace = original
+    return elapsed / repeat, counter["writes"] / repeat
+
+def bench_load(params, repeat, loader):
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = os.path.join(tmp, "chamber_config.yaml")
+        startup(config_file, params, save_delay=0)
+        saved = config_module.YAML_LOADER
+        config_module.YAML_LOADER = loader
+        try:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                Config(config_file=config_file)
+            return (time.perf_counter() - start) / repeat
+        finally:
+            config_module.YAML_LOADER = saved
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Config persistence.")
+    parser.add_argument("--params", type=int, default=40, help="Parameters ensured at startup")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("session_logger").setLevel(logging.ERROR)  # New temp files log "does not exist"
+
+    print(f"Startup with {args.params} new parameters ({args.repeat} runs):")
+    for label, delay in (("write on every change", 0), ("debounced", None)):
+        seconds, writes = bench_startup(args.params, args.repeat, delay)
+        print(f"  {label:22s} {seconds * 1000:8.2f} ms  {writes:5.1f} file writes")
+
+    print(f"Loading a {args.params}-parameter config file:")
+    loaders = [("SafeLoader", yaml.SafeLoader)]
+    if hasattr(yaml, "CSafeLoader"):
+        loaders.append(("CSafeLoader", yaml.CSafeLoader))
+    else:
+        print("  (libyaml is not available; only the pure-Python loader is measured)")
+    for label, loader in loaders:
+        seconds = bench_load(args.params, args.repeat, loader)
+        print(f"  {label:22s} {seconds * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
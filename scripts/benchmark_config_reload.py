@@ -0,0 +1,93 @@
+"""
+Config Reload Benchmark
+
+Watches a temporary config file, edits it repeatedly (in place and by atomic rename, as
+editors do) and reports the latency from each edit to the subscriber being notified.
+Then leaves the watcher idle and reports the CPU time it used.
+
+Uses watchfiles (inotify) when it is installed; --poll forces mtime polling.
+
+Usage:
+    python benchmark_config_reload.py [--edits 20] [--idle 10] [--poll] [--poll-interval 1.0]
+"""
+
+import sys
+import os
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+import yaml
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+import Config as config_module
+from Config import Config
+
+def write_config(path, values, atomic):
+    if atomic:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            yaml.dump(values, f)
+        os.replace(tmp_path, path)
+    else:
+        with open(path, "w") as f:
+            yaml.dump(values, f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark live config reloading.")
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--idle", type=float, default=10.0, help="Seconds to measure idle CPU use")
+    parser.add_argument("--poll", action="store_true", help="Force mtime polling even if watchfiles is installed")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args()
+    logging.getLogger("session_logger").setLevel(logging.WARNING)
+
+    if args.poll:
+        config_module.watchfiles = None
+    mode = "watchfiles" if config_module.watchfiles is not None else f"polling every {args.poll_interval}s"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chamber_config.yaml")
+        values = {"house_led_brightness": 100, "buzzer_volume": 60, "beambreak_memory": 0.2}
+        write_config(path, values, atomic=False)
+        config = Config(config_file=path)
+
+        notified = threading.Event()
+        received = []
+        config.subscribe(lambda changed: (received.append(changed), notified.set()))
+        config.watch(poll_interval=args.poll_interval)
+        time.sleep(0.5)  # Let the watcher start
+
+        latencies = []
+        for i in range(args.edits):
+            notified.clear()
+            values["house_led_brightness"] = 100 + i + 1
+            start = time.perf_counter()
+            write_config(path, values, atomic=i % 2 == 1)
+            if not notified.wait(timeout=5 * args.poll_interval + 5):
+                print(f"  edit {i}: no notification")
+                continue
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+        print(f"Reload latency ({mode}, {len(latencies)}/{args.edits} edits):")
+        if latencies:
+            latencies.sort()
+            print(f"  median {latencies[len(latencies) // 2] * 1000:8.1f} ms")
+            print(f"  max    {latencies[-1] * 1000:8.1f} ms")
+        print(f"  final value {config['house_led_brightness']}, last change {received[-1] if received else None}")
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        time.sleep(args.idle)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        print(f"Idle: {cpu * 1000:.1f} ms CPU over {wall:.1f} s ({100 * cpu / wall:.3f}% of one core)")
+        config.stop_watching()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Data Reader Benchmark
+
+Generates synthetic legacy (concatenated JSON) and JSON Lines data files of a few
+megabytes and compares reading them whole into memory against the streaming reader
+and its NumPy fast path. Reports wall time and peak Python memory for each.
+
+Usage:
+    python benchmark_data_reader.py [--size-mb 8 16 32]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+from analysis.DataReader import iter_data_file, read_events_array
+
+EVENTS_PER_TRIAL = (
+    ("StartTrial", None),
+    ("TrialInitiated", None),
+    ("CorrectTouch ", "LEFT"),
+    ("DeliverRewardStart", 0.5),
+    ("TrialData", {"left_image": "A01", "right_image": "B02", "correct": True}),
+)
+
+def write_synthetic_file(path, size_mb, legacy):
+    start = datetime(2025, 1, 1, 9, 0, 0)
+    target = size_mb * 1024 * 1024
+    with open(path, "w") as f:
+        if legacy:
+            f.write("# NC4Touch training data\n")
+        else:
+            f.write(json.dumps({"header": {"rodent": "rat1", "chamber": "ChamberA", "trainer": "PRL"}}) + "\n")
+        trial = 0
+        while f.tell() < target:
+            trial += 1
+            for i, (event, data) in enumerate(EVENTS_PER_TRIAL):
+                data = trial if data is None else data
+                if legacy:
+                    t = start + timedelta(seconds=trial * 10 + i)
+                    f.write(json.dumps({"timestamp": t.strftime("%Y%m%d_%H%M%S_%f"), "event": event, "data": data}, indent=4))
+                else:
+                    f.write(json.dumps({"t_ns": (trial * 10 + i) * 10**9, "event": event, "data": data}) + "\n")
+    return trial
+
+def read_whole_file(path):
+    """Baseline: read the file into memory and decode every object into a list."""
+    with open(path, "r") as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    records = []
+    pos = 0
+    while pos < len(text):
+        while pos < len(text) and text[pos] in " \t\r\n":
+            pos += 1
+        if text.startswith("#", pos):
+            pos = text.index("\n", pos) + 1
+            continue
+        if pos >= len(text):
+            break
+        record, pos = decoder.raw_decode(text, pos)
+        records.append(record)
+    return len(records)
+
+def count_streaming(path):
+    return sum(1 for _ in iter_data_file(path))
+
+def count_array(path):
+    return len(read_events_array(path))
+
+def measure(func, path):
+    start = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - start
+    # Memory is measured in a second run; tracemalloc slows the reader down considerably
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data file readers.")
+    parser.add_argument("--size-mb", type=int, nargs="+", default=[8, 32])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.size_mb:
+            for legacy in (True, False):
+                kind = "legacy" if legacy else "jsonl"
+                path = os.path.join(tmp, f"synthetic_{size_mb}MB_{kind}_data.json")
+                trials = write_synthetic_file(path, size_mb, legacy)
+                print(f"\n{kind} file, {os.path.getsize(path) / 1e6:.1f} MB, {trials} trials")
+                for name, func in (("whole file", read_whole_file), ("streaming", count_streaming),
+                                   ("numpy array", count_array)):
+                    count, elapsed, peak = measure(func, path)
+                    print(f"  {name:<12} {count:>8} records  {elapsed:6.2f} s  "
+                          f"{count / elapsed:>9.0f} records/s  peak {peak / 1e6:7.1f} MB")
+
+if __name__ == "__main__":
+    main()
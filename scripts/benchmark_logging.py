@@ -0,0 +1,105 @@
+"""
+Logging Pipeline Benchmark
+
+Times the per-line logging cost seen by M0 serial threads (logger.info(f"[M0_0] <- {line}"))
+with the console and rotating file handlers attached directly to the logger, as before,
+and behind the LogPipeline queue. Lines arrive at --rate per thread, like serial input;
+--rate 0 logs in a tight loop to overflow the queue. The console stream goes to a
+temporary file so the numbers do not depend on the terminal.
+
+Usage:
+    python benchmark_logging.py [--lines 5000] [--threads 3] [--rate 1000] [--queue 10000]
+"""
+
+import sys
+import os
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from logging.handlers import TimedRotatingFileHandler
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+from LogPipeline import LogPipeline
+
+FORMAT = '[%(asctime)s:%(filename)s@%(lineno)d:%(funcName)s:%(levelname)s] %(message)s'
+
+def make_handlers(tmp):
+    console = logging.StreamHandler(stream=open(os.path.join(tmp, "console.log"), "w"))
+    console.setLevel(logging.DEBUG)
+    log_file = TimedRotatingFileHandler(os.path.join(tmp, "session.log"), when="midnight", backupCount=30)
+    log_file.setLevel(logging.INFO)
+    for handler in (console, log_file):
+        handler.setFormatter(logging.Formatter(FORMAT))
+    return [console, log_file]
+
+def serial_thread(logger, lines, rate, timings, index):
+    # Only the logging call is timed; with a rate, lines arrive paced like serial input
+    interval = 1.0 / rate if rate else 0.0
+    spent = 0.0
+    for i in range(lines):
+        start = time.perf_counter()
+        logger.info(f"[M0_{index}] <- TOUCH:{i % 320},{i % 240}")
+        spent += time.perf_counter() - start
+        if interval:
+            time.sleep(interval)
+    timings[index] = spent / lines
+
+def run(logger, lines, threads, rate=0):
+    timings = [0.0] * threads
+    workers = [threading.Thread(target=serial_thread, args=(logger, lines, rate, timings, i)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(timings) / threads
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the session logging pipeline.")
+    parser.add_argument("--lines", type=int, default=5000, help="Lines logged per serial thread")
+    parser.add_argument("--rate", type=float, default=1000, help="Lines per second per thread (0 = as fast as possible)")
+    parser.add_argument("--threads", type=int, default=3, help="Concurrent serial threads (one per M0)")
+    parser.add_argument("--queue", type=int, default=10000, help="Pipeline queue size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct = logging.getLogger("bench_direct")
+        direct.propagate = False
+        direct.setLevel(logging.DEBUG)
+        handlers = make_handlers(tmp)
+        for handler in handlers:
+            direct.addHandler(handler)
+        per_line = run(direct, args.lines, args.threads, args.rate)
+        print(f"Direct handlers:   {per_line * 1e6:7.2f} us per line on the serial thread")
+        for handler in handlers:
+            handler.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queued = logging.getLogger("bench_pipeline")
+        queued.propagate = False
+        pipeline = LogPipeline(queued, max_queue=args.queue)
+        handlers = make_handlers(tmp)
+        for handler in handlers:
+            pipeline.add_handler(handler)
+        start = time.perf_counter()
+        per_line = run(queued, args.lines, args.threads, args.rate)
+        pipeline.stop()
+        drained = time.perf_counter() - start
+        total = args.lines * args.threads
+        print(f"LogPipeline:       {per_line * 1e6:7.2f} us per line on the serial thread")
+        print(f"  {pipeline.dropped} of {total} records dropped (queue {args.queue}), drained in {drained:.2f}s")
+
+        # Records below every handler's level are rejected before a LogRecord is created
+        pipeline.set_handler_level(handlers[0], logging.INFO)
+        start = time.perf_counter()
+        for i in range(args.lines):
+            queued.debug(f"[M0_0] <- TOUCH:{i}")
+        print(f"  filtered DEBUG:  {(time.perf_counter() - start) / args.lines * 1e6:7.2f} us per line")
+        for handler in handlers:
+            handler.close()
+
+if __name__ == "__main__":
+    main()
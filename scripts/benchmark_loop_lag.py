@@ -0,0 +1,83 @@
+"""
+Event Loop Lag Benchmark
+
+Measures how long the UI event loop stalls while a blocking M0 operation runs, comparing
+the old WebUI handlers, which called the chamber method directly inside the async click
+handler, with HardwareWorker, which runs it on its own thread and awaits the result.
+The operation is simulated with sleeps standing in for arduino-cli and serial waits, and
+reports progress through step() like the real Chamber methods.
+
+Reports the worst and mean loop lag seen by LoopLagMonitor during the operation, and how
+quickly a cancel request stops the operation.
+
+Usage:
+    python benchmark_loop_lag.py [--duration 3.0] [--steps 30]
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+from HardwareWorker import HardwareWorker, LoopLagMonitor, OperationCancelled, step
+
+def blocking_operation(duration, steps, operation=None):
+    """Stand-in for a chamber method: blocking waits with a progress step between them."""
+    for i in range(steps):
+        step(operation, i / steps, f"Step {i + 1}/{steps}")
+        time.sleep(duration / steps)
+
+async def measure(run, duration):
+    monitor = LoopLagMonitor(interval=0.01, warn_lag=float("inf"), window=duration * 10)
+    monitor.start()
+    await asyncio.sleep(0.1)  # Let the monitor settle
+    monitor.samples.clear()
+    await run()
+    await asyncio.sleep(0.05)  # Catch the sample that straddles the end of the operation
+    monitor.stop()
+    lags = [lag for _, lag in monitor.samples] or [0.0]
+    return max(lags), statistics.mean(lags)
+
+async def main_async(args):
+    async def inline():
+        blocking_operation(args.duration, args.steps)  # What the old click handlers did
+
+    worker = HardwareWorker()
+
+    async def offloaded():
+        operation = worker.submit("Benchmark", blocking_operation, args.duration, args.steps)
+        await asyncio.wrap_future(operation.future)
+
+    print(f"Blocking operation of {args.duration:.1f}s in {args.steps} steps")
+    print(f"{'Mode':<20} {'Max lag':>10} {'Mean lag':>10}")
+    for name, run in (("Inline (before)", inline), ("HardwareWorker", offloaded)):
+        max_lag, mean_lag = await measure(run, args.duration)
+        print(f"{name:<20} {max_lag * 1000:>8.1f}ms {mean_lag * 1000:>8.1f}ms")
+
+    # Cancellation latency: cancel halfway and time until the operation stops
+    operation = worker.submit("Benchmark", blocking_operation, args.duration, args.steps)
+    await asyncio.sleep(args.duration / 2)
+    start = time.perf_counter()
+    operation.cancel()
+    try:
+        await asyncio.wrap_future(operation.future)
+    except OperationCancelled:
+        pass
+    print(f"\nCancel took effect after {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"(step interval {args.duration / args.steps * 1000:.0f} ms), state: {operation.state}")
+    worker.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop lag during blocking hardware operations")
+    parser.add_argument("--duration", type=float, default=3.0, help="Length of the simulated operation in seconds")
+    parser.add_argument("--steps", type=int, default=30, help="Progress steps in the simulated operation")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Metrics Recording Benchmark
+
+Measures what recording a metric costs on the hot paths that now do it (trainer ticks,
+beam break reads, the serial loop, event writes), against an empty method call, and how
+long a scrape of a registry the size of the controller's takes. Finishes by serving the
+registry over HTTP with Metrics.serve() and fetching /metrics once.
+
+Usage:
+    python benchmark_metrics.py [--iterations 1000000]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import threading
+import urllib.request
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+import Metrics
+
+class Empty:
+    def call(self, value=1):
+        pass
+
+def per_call(fn, iterations):
+    """Nanoseconds per call of fn(), best of 5 runs."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter_ns() - start) / iterations)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metric recording and scraping")
+    parser.add_argument("--iterations", type=int, default=1000000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    counter = Metrics.counter("bench_counter", "Benchmark counter")
+    gauge = Metrics.gauge("bench_gauge", "Benchmark gauge")
+    histogram = Metrics.histogram("bench_seconds", "Benchmark histogram")
+    labeled = Metrics.histogram("bench_labeled_seconds", "Benchmark labeled histogram", ("m0",))
+    labeled_counter = Metrics.counter("bench_labeled", "Benchmark labeled counter", ("m0",))
+    child = labeled.labels("M0_0")
+    empty = Empty()
+    value = 0.0123
+
+    cases = [
+        ("empty method call (baseline)", lambda: empty.call(value)),
+        ("Counter.inc()", lambda: counter.inc()),
+        ("Gauge.set()", lambda: gauge.set(value)),
+        ("Histogram.observe()", lambda: histogram.observe(value)),
+        ("held child .observe()", lambda: child.observe(value)),
+        ("labels(id).inc() per call", lambda: labeled_counter.labels("M0_0").inc()),
+        ("labels(id).observe() per call", lambda: labeled.labels("M0_0").observe(value)),
+    ]
+    print(f"{'Operation':<32} {'ns/call':>8}")
+    for name, fn in cases:
+        print(f"{name:<32} {per_call(fn, args.iterations):>8.0f}")
+
+    # Concurrent recording from several threads, as the serial loops and timers do
+    threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(args.iterations)]) for _ in range(4)]
+    before = counter.value
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    print(f"\n4 threads x {args.iterations} inc(): counted {counter.value - before} "
+          f"({100 * (counter.value - before) / (4 * args.iterations):.2f}%)")
+
+    # A registry the size of the controller's: a few dozen metrics, three M0s, some threads
+    for m0 in ("M0_0", "M0_1", "M0_2"):
+        for i in range(10):
+            Metrics.histogram(f"bench_m0_{i}_seconds", "Benchmark", ("m0",)).labels(m0).observe(random.random())
+    timers = [threading.Timer(60, lambda: None) for _ in range(5)]
+    [t.start() for t in timers]
+    text = Metrics.render()
+    start = time.perf_counter()
+    for _ in range(100):
+        Metrics.render()
+    print(f"Scrape: {(time.perf_counter() - start) * 10:.2f} ms for {len(text.splitlines())} lines, {len(text)} bytes")
+
+    server = Metrics.serve(port=0, host="127.0.0.1")
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+        body = response.read().decode()
+    print(f"HTTP /metrics: {response.headers['Content-Type']}, "
+          + ", ".join(line for line in body.splitlines() if line.startswith("controller_timers_active")))
+    server.shutdown()
+    [t.cancel() for t in timers]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Profiler Overhead Benchmark
+
+Runs a stand-in for a live session (a trainer tick doing CPU work every run_interval, three
+M0 serial loops and a beam break timer loop, each mostly sleeping) and measures how much
+the SamplingProfiler slows the trainer's work down at several sampling intervals, along
+with the sampler's own CPU share and whether the per-state attribution comes out right.
+
+Usage:
+    python benchmark_profiler.py [--seconds 5] [--intervals 0.01 0.002 0.0005]
+"""
+
+import sys
+import os
+import time
+import argparse
+import threading
+import tempfile
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+from Profiler import SamplingProfiler
+
+class Workload:
+    """Trainer ticks alternating between a heavy and a light state, plus idle I/O-style loops."""
+    def __init__(self):
+        self.state = "LIGHT"
+        self.work_done = 0
+        self.stop_event = threading.Event()
+
+    def run_training(self):
+        self.state = "HEAVY" if self.work_done % 2 == 0 else "LIGHT"
+        x = 0
+        for i in range(300000 if self.state == "HEAVY" else 100000):  # 3:1 CPU split between the states
+            x += i
+        self.work_done += 1
+
+    def trainer_loop(self):
+        while not self.stop_event.wait(0.01):
+            self.run_training()
+
+    def serial_loop(self):
+        while not self.stop_event.wait(0.1):
+            pass
+
+    def start(self):
+        threads = [threading.Thread(target=self.trainer_loop, name="Thread-1 (run_training)", daemon=True)]
+        threads += [threading.Thread(target=self.serial_loop, name=f"M0_{i} serial", daemon=True) for i in range(3)]
+        [t.start() for t in threads]
+        return threads
+
+def run(seconds, interval=None):
+    workload = Workload()
+    threads = workload.start()
+    profiler = None
+    if interval is not None:
+        profiler = SamplingProfiler(interval=interval, duration=seconds + 10, state_source=lambda: workload.state)
+        profiler.start()
+    time.sleep(seconds)
+    if profiler is not None:
+        profiler.stop()
+    workload.stop_event.set()
+    [t.join() for t in threads]
+    return workload.work_done / seconds, profiler
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sampling profiler's overhead")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.01, 0.002, 0.0005], help="Sampling intervals to try")
+    args = parser.parse_args()
+
+    baseline, _ = run(args.seconds)
+    print(f"{'Interval':>9} {'Ticks/s':>8} {'Slowdown':>9} {'Samples/s':>10} {'Overhead':>9}  HEAVY share (expect ~75%)")
+    print(f"{'off':>9} {baseline:>8.1f}")
+    for interval in args.intervals:
+        rate, profiler = run(args.seconds, interval)
+        elapsed = profiler.stopped - profiler.started
+        states = {}
+        for stack, weight in profiler.stacks.items():
+            for state in ("HEAVY", "LIGHT"):
+                if f"[state:{state}]" in stack:
+                    states[state] = states.get(state, 0) + weight
+        heavy = 100 * states.get("HEAVY", 0) / (sum(states.values()) or 1)
+        print(f"{interval * 1000:>7.1f}ms {rate:>8.1f} {100 * (1 - rate / baseline):>8.1f}% "
+              f"{profiler.samples / elapsed:>10.0f} {100 * profiler.sample_time / elapsed:>8.2f}%  {heavy:.0f}%")
+
+    with tempfile.TemporaryDirectory() as directory:
+        collapsed, summary = profiler.write(directory)
+        print(f"\nWrote {os.path.getsize(collapsed)} bytes of collapsed stacks and a "
+              f"{len(open(summary).read().splitlines())}-line summary")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Tick Logging Benchmark
+
+Measures what hot-path logging costs when it is disabled and when it is enabled:
+  - an M0 serial line logged as before (f-string built on every call) vs through the
+    "serial" SubsystemLogger (lazy %-formatting),
+  - a PRL trainer tick in IDLE, whose per-tick "Current state" line now goes through the
+    "trainer" SubsystemLogger with rate limiting, with the trainer level at INFO and DEBUG.
+
+Enabled records go to a NullHandler so only the logging call itself is measured.
+
+Usage:
+    python benchmark_tick_logging.py [--calls 200000] [--ticks 50000]
+"""
+
+import sys
+import os
+import time
+import logging
+import argparse
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+import SubsystemLog
+
+def per_call(fn, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark disabled and enabled hot-path logging.")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--ticks", type=int, default=50000)
+    args = parser.parse_args()
+
+    session_logger = logging.getLogger("session_logger")
+    session_logger.propagate = False
+    session_logger.addHandler(logging.NullHandler())
+    session_logger.setLevel(logging.INFO)
+
+    old_logger = logging.getLogger("session_logger.M0Device")
+    serial_log = SubsystemLog.get_logger("serial")
+    device_id, line = "M0_0", "TOUCH:120,85"
+
+    print("Serial line at DEBUG (ns per call):")
+    for level in ("INFO", "DEBUG"):
+        SubsystemLog.set_level("serial", level)
+        old_logger.setLevel(level)
+        old = per_call(lambda i: old_logger.debug(f"[{device_id}] <- {line} {i}"), args.calls)
+        new = per_call(lambda i: serial_log.debug("[%s] <- %s %s", device_id, line, i), args.calls)
+        state = "disabled" if level == "INFO" else "enabled"
+        print(f"  {state:8s}  f-string logger {old:8.1f}   SubsystemLogger {new:8.1f}")
+
+    try:
+        from Virtual.VirtualChamber import VirtualChamber
+        from trainers.PRL import PRL
+    except ImportError as e:
+        print(f"Skipping the trainer tick benchmark: {e}")
+        return
+    session_logger.setLevel(logging.WARNING)  # Quiet chamber start-up
+    trainer = PRL(VirtualChamber(), {})
+    print("PRL IDLE tick (ns per tick):")
+    for level in ("INFO", "DEBUG"):
+        SubsystemLog.set_level("trainer", level)
+        tick = per_call(lambda i: trainer.run_training(), args.ticks)
+        state = "disabled" if level == "INFO" else "enabled, rate-limited"
+        print(f"  trainer {level:5s} ({state}) {tick:8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Time Series Store Benchmark
+
+Measures the embedded TimeSeriesStore the controller records its key metrics into:
+the cost of one record() (every level's current slot updated in the memory-mapped file),
+the cost of one sampler pass over the controller's sources, and the time to query the
+ranges the WebUI plots. Fills a temporary store with two days of 1 s samples for a set
+of series first, then reopens it to check the data survives a restart.
+
+Usage:
+    python benchmark_timeseries.py [--series 10] [--days 2]
+"""
+
+import sys
+import os
+import time
+import shutil
+import random
+import argparse
+import tempfile
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+import Metrics
+from TimeSeriesStore import TimeSeriesStore, TimeSeriesSampler, histogram_mean, gauge_total, cpu_temperature
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedded time series store")
+    parser.add_argument("--series", type=int, default=10, help="Number of series")
+    parser.add_argument("--days", type=float, default=2.0, help="Days of 1 s samples to fill in")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="timeseries_")
+    try:
+        store = TimeSeriesStore(directory)
+        names = [f"metric_{i}" for i in range(args.series)]
+        seconds = int(args.days * 86400)
+        end = time.time()
+        start_t = end - seconds
+
+        start = time.perf_counter()
+        for s in range(seconds):
+            t = start_t + s
+            for name in names:
+                store.record(name, random.random(), t)
+        elapsed = time.perf_counter() - start
+        records = seconds * len(names)
+        print(f"Filled {args.days:g} days x {len(names)} series: {records} records, "
+              f"{elapsed / records * 1e6:.2f} us per record()")
+
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        print(f"Disk: {size / len(names) / 1024:.0f} KB per series, fixed however long it runs")
+
+        # One sampler pass over sources like the Session's
+        latency = Metrics.histogram("bench_latency_seconds", "Benchmark")
+        Metrics.gauge("bench_depth", "Benchmark", ("m0",)).labels("M0_0").set(3)
+        sources = {f"lateness_{i}": histogram_mean("bench_latency_seconds", 1000.0) for i in range(4)}
+        sources.update(depth=gauge_total("bench_depth"), cpu_temperature=cpu_temperature)
+        sampler = TimeSeriesSampler(store, sources)
+        sampler._sample()  # Creates the files
+        for _ in range(100):
+            latency.observe(0.002)
+        start = time.perf_counter()
+        sampler._sample()
+        print(f"Sampler pass over {len(sources)} sources: {(time.perf_counter() - start) * 1e6:.0f} us")
+
+        for label, span in (("1 h at 1 s", 3600), ("24 h at 1 min", 86400), ("30 d at 1 h", 30 * 86400)):
+            start = time.perf_counter()
+            for _ in range(20):
+                points = store.query(names[0], end - span, end)
+            print(f"Query {label:<14}: {len(points):>5} points in {(time.perf_counter() - start) / 20 * 1000:.2f} ms")
+
+        before = store.query(names[0], end - 86400, end)
+        store.close()
+        reopened = TimeSeriesStore(directory)
+        after = reopened.query(names[0], end - 86400, end)
+        print(f"After reopening: {'same' if before == after else 'DIFFERENT'} 24 h data ({len(after)} points)")
+        reopened.close()
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
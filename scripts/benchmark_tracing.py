@@ -0,0 +1,103 @@
+"""
+Tracing Benchmark
+
+Measures what recording a trace event costs on the hot paths that now do it (trainer
+ticks, serial writes and reads, GPIO changes, data file flushes), with tracing on and off,
+against an empty method call. Then records from several threads at once, as the serial
+loops and timers do, checks no event is lost, and exports a session-sized trace as
+Chrome trace JSON, reporting its size and how long the export takes.
+
+Usage:
+    python benchmark_tracing.py [--iterations 1000000] [--events 500000]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+from Tracing import Tracer
+
+class Empty:
+    def call(self, name, category, args=None):
+        pass
+
+def per_call(fn, iterations):
+    """Nanoseconds per call of fn(), best of 5 runs."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter_ns() - start) / iterations)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trace recording and export")
+    parser.add_argument("--iterations", type=int, default=1000000, help="Calls per measurement")
+    parser.add_argument("--events", type=int, default=500000, help="Events in the exported trace")
+    args = parser.parse_args()
+
+    empty = Empty()
+    args_dict = {"m0": "M0_0"}
+    print(f"{'Operation':<36} {'on ns':>7} {'off ns':>7}")
+    print(f"{'empty method call (baseline)':<36} {per_call(lambda: empty.call('x', 'y', args_dict), args.iterations):>7.0f}")
+    for label, record in (
+        ("instant()", lambda t: t.instant("-> SHOW", "serial", args_dict)),
+        ("instant() on a named track", lambda t: t.instant("beam broken", "gpio", args_dict, track="trainer state")),
+        ("complete()", lambda t: t.complete("tick", "trainer", 0, 1000, args_dict)),
+        ("with span(): pass", lambda t: t.span("close data file", "data").__enter__().__exit__()),
+    ):
+        on = Tracer(capacity=1000)
+        off = Tracer(capacity=1000, enabled=False)
+        print(f"{label:<36} {per_call(lambda: record(on), args.iterations):>7.0f} {per_call(lambda: record(off), args.iterations):>7.0f}")
+
+    # Concurrent recording: each thread writes to its own track without a lock
+    tracer = Tracer(capacity=args.iterations)
+    threads = [threading.Thread(target=lambda: [tracer.instant("x", "bench") for _ in range(args.iterations)],
+                                name=f"M0_{i} serial") for i in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    recorded = sum(len(track.events) for track in tracer.tracks.values())
+    print(f"\n4 threads x {args.iterations} instant(): recorded {recorded} "
+          f"({100 * recorded / (4 * args.iterations):.2f}%) on {len(tracer.tracks)} tracks")
+
+    # One-shot Timer threads of a loop share a track
+    tracer = Tracer()
+    for _ in range(20):
+        timer = threading.Timer(0, lambda: tracer.instant("tick", "trainer"))
+        timer.name = "session tick"
+        timer.start()
+        timer.join()
+    print(f"20 Timer threads of one loop: {len(tracer.tracks)} track(s)")
+
+    # A session's worth of events across the controller's tracks
+    tracer = Tracer(capacity=args.events)
+    names = ("session tick", "M0_0 serial", "M0_1 serial", "M0_2 serial", "beambreak 4", "EventWriter-data.json")
+    per_track = args.events // len(names)
+    for name in names:
+        track = tracer.track(name)
+        t = time.monotonic_ns()
+        for i in range(per_track):
+            track.events.append(("X" if i % 2 else "i", "-> SHOW", "serial", t + i * 1000000, 250000, args_dict))
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "trace.json")
+        start = time.perf_counter()
+        tracer.export(filepath, process_name="Chamber0")
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(filepath)
+        with open(filepath) as f:
+            trace = json.load(f)
+    events = [e for e in trace["traceEvents"] if e["ph"] != "M"]
+    threads = {e["args"]["name"] for e in trace["traceEvents"] if e["name"] == "thread_name"}
+    print(f"Export of {len(events)} events: {elapsed * 1000:.0f} ms, {size / 1e6:.1f} MB "
+          f"({size / len(events):.0f} bytes/event), {len(threads)} named tracks")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Simulated Chamber Fleet
+
+Starts several simulated chambers on localhost, each serving the same /api/state long-poll
+delta feed as the WebUI from a ChamberState driven by a fake trainer (trial and state
+changes, LED and beam flicker, an M0 that occasionally drops off). Then follows them with
+the FleetDashboard's ChamberLinks and reports, per chamber, the bytes received, the delay
+between a trial starting in the chamber and the dashboard seeing it, and the alarms raised.
+One chamber is stopped partway through to check the offline alarm.
+
+For comparison it also reports the bandwidth of sending the full state instead of deltas,
+at the same update rate and at a 1 Hz poll.
+
+With --serve the chambers just keep running, for pointing the real dashboard at:
+    python ../Controller/FleetDashboard.py --hosts localhost:18081 localhost:18082 ...
+
+Usage:
+    python simulate_fleet.py [--chambers 8] [--duration 20] [--trial-interval 1.0] [--serve]
+"""
+
+import sys
+import os
+import time
+import json
+import random
+import argparse
+import threading
+import statistics
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add Controller directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Controller'))
+
+import FleetDashboard
+from ChamberState import ChamberState
+from FleetDashboard import Fleet
+
+BASE_PORT = 18081
+TRAINER_STATES = ["START_TRIAL", "WAIT_FOR_TOUCH", "CORRECT", "DELIVER_REWARD", "ITI"]
+
+class SimulatedChamber:
+    """A ChamberState driven by a fake trainer, served over HTTP like the WebUI's /api/state."""
+    def __init__(self, index: int, trial_interval: float):
+        self.name = f"Chamber{index + 1}"
+        self.port = BASE_PORT + index
+        self.trial_interval = trial_interval
+        self.state = ChamberState()
+        self.trial_started = {} # trial -> time.monotonic() it started
+        self.stop_event = threading.Event()
+        chamber = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                if url.path != "/api/state":
+                    self.send_error(404)
+                    return
+                query = urllib.parse.parse_qs(url.query)
+                body = chamber.state.feed(int(query.get("since", ["0"])[0]), query.get("epoch", [None])[0],
+                                          min(float(query.get("timeout", ["10"])[0]), 10.0), chamber.name)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self.run_trainer, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sample(self, trial, state, correct):
+        """Full state as the WebUI's publisher would sample it, including fields the feed leaves out."""
+        fields = {}
+        for m0 in ("M0_0", "M0_1", "M0_2"):
+            fields[f"m0.{m0}.port"] = f"/dev/ttyACM{m0[-1]}"
+            fields[f"m0.{m0}.mode"] = "SERIAL_COMM"
+            fields[f"m0.{m0}.firmware"] = "1.4.0"
+        fields.update(reward_led=state == "DELIVER_REWARD", punishment_led=False, house_led=True,
+                      house_led_brightness=100, pump=state == "DELIVER_REWARD", beam=random.random() < 0.2,
+                      trainer_state=state, trial=trial, operation=None, operation_state=None,
+                      operation_progress=None, loop_lag_ms=0)
+        fields["summary"] = {"trials": trial, "correct": correct, "omissions": 0,
+                             "accuracy": correct / trial if trial else None}
+        return fields
+
+    def run_trainer(self):
+        trial = correct = 0
+        while not self.stop_event.is_set():
+            trial += 1
+            self.trial_started[trial] = time.monotonic()
+            correct += random.random() < 0.7
+            for state in TRAINER_STATES:
+                fields = self.sample(trial, state, correct)
+                if random.random() < 0.02:
+                    fields["m0.M0_1.port"] = None  # Board dropped off
+                # Beam and LED flicker between states, as the 10 Hz sampler would see it
+                for _ in range(2):
+                    self.state.update(fields)
+                    fields = dict(fields, beam=not fields["beam"])
+                    if self.stop_event.wait(self.trial_interval / len(TRAINER_STATES) / 2):
+                        return
+
+def main():
+    parser = argparse.ArgumentParser(description="Run simulated chambers and follow them with the fleet dashboard links")
+    parser.add_argument("--chambers", type=int, default=8, help="Number of simulated chambers")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to follow the fleet")
+    parser.add_argument("--trial-interval", type=float, default=1.0, help="Seconds per simulated trial")
+    parser.add_argument("--serve", action="store_true", help="Only run the chambers, until interrupted")
+    args = parser.parse_args()
+
+    chambers = [SimulatedChamber(i, args.trial_interval) for i in range(args.chambers)]
+    [chamber.start() for chamber in chambers]
+    print(f"Started {len(chambers)} simulated chambers on ports {BASE_PORT}-{BASE_PORT + len(chambers) - 1}")
+    if args.serve:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            [chamber.stop() for chamber in chambers]
+        return
+
+    FleetDashboard.OFFLINE_AFTER = 3.0  # Notice the stopped chamber within the run
+    fleet = Fleet([f"127.0.0.1:{chamber.port}" for chamber in chambers], poll_timeout=2.0)
+
+    # Record when each link first sees each trial
+    seen = {link: {} for link in fleet.links}
+    def watch():
+        while True:
+            for link in fleet.links:
+                trial = link.fields.get("trial")
+                if trial is not None and trial not in seen[link]:
+                    seen[link][trial] = time.monotonic()
+            time.sleep(0.001)
+    threading.Thread(target=watch, daemon=True).start()
+
+    fleet.start()
+    time.sleep(args.duration / 2)
+    chambers[-1].stop()
+    print(f"Stopped {chambers[-1].name} at {args.duration / 2:.0f}s")
+    time.sleep(args.duration / 2)
+    fleet.stop()
+
+    full_size = len(json.dumps(chambers[0].state.snapshot(), separators=(",", ":")))
+    print(f"\n{'Chamber':<10} {'Responses':>9} {'Bytes/s':>8} {'Latency p50':>12} {'p95':>8}  Alarms")
+    latencies = []
+    for chamber, link in zip(chambers, fleet.links):
+        delays = [seen[link][trial] - started for trial, started in chamber.trial_started.items() if trial in seen[link]]
+        latencies += delays
+        p50 = statistics.median(delays) * 1000 if delays else float("nan")
+        p95 = sorted(delays)[int(0.95 * (len(delays) - 1))] * 1000 if delays else float("nan")
+        print(f"{link.name or link.host:<10} {link.responses:>9} {link.bytes_received / args.duration:>8.0f} "
+              f"{p50:>10.1f}ms {p95:>6.1f}ms  {'; '.join(link.alarms()) or '-'}")
+
+    print(f"\nFleet delta feed: {fleet.bytes_received / args.duration:.0f} bytes/s for {len(chambers)} chambers "
+          f"(median trial latency {statistics.median(latencies) * 1000:.1f} ms)")
+    responses = sum(link.responses for link in fleet.links)
+    print(f"Full state at the same update rate: {full_size * responses / args.duration:.0f} bytes/s; "
+          f"polled at 1 Hz: {full_size * len(chambers)} bytes/s (both before HTTP overhead)")
+    [chamber.stop() for chamber in chambers[:-1]]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Controller modules import each other by bare name, as when run from the Controller directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Controller"))
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from BinaryEventLog import BinaryEventLogWriter, BinaryEventLogReader, convert_json_to_binary
+
+EVENTS = [
+    {"t_ns": 100, "event": "StartTraining", "data": None},
+    {"t_ns": 200, "event": "StartTrial", "data": 1},
+    {"t_ns": 300, "event": "Touch", "data": {"x": 120, "y": 45}},
+    {"t_ns": 400, "event": "Image", "data": "A01"},
+    {"t_ns": 500, "event": "RewardDuration", "data": 1.5},
+    {"t_ns": 600, "event": "Big", "data": 1 << 70},
+    {"t_ns": 700, "event": "Unicode", "data": "größe ✓"},
+    {"t_ns": 800, "event": "StartTrial", "data": 2},
+    {"t_ns": 900, "event": "Flag", "data": True},
+]
+
+def read_back(path):
+    with BinaryEventLogReader(path) as reader:
+        events = reader.read()
+        return reader.header, [(int(row["t_ns"]), reader.strings[row["code"]], reader.payload(row), int(row["trial"]))
+                               for row in events]
+
+def test_round_trip_across_chunks(tmp_path):
+    path = str(tmp_path / "session.nc4b")
+    writer = BinaryEventLogWriter(path, chunk_rows=4)
+    writer.append({"header": {"rodent": "R1"}})
+    for record in EVENTS:
+        writer.append(record)
+    writer.close()
+
+    header, rows = read_back(path)
+    assert header == {"rodent": "R1"}
+    assert [(t, event, data) for t, event, data, _ in rows] == [(r["t_ns"], r["event"], r["data"]) for r in EVENTS]
+    assert [trial for *_, trial in rows] == [-1, 1, 1, 1, 1, 1, 1, 2, 2]
+
+def test_reopened_writer_appends(tmp_path):
+    path = str(tmp_path / "session.nc4b")
+    for record in EVENTS[:3], EVENTS[3:]:
+        writer = BinaryEventLogWriter(path)
+        for r in record:
+            writer.append(r)
+        writer.close()
+    _, rows = read_back(path)
+    assert [data for _, _, data, _ in rows] == [r["data"] for r in EVENTS]
+
+def test_distinct_payloads_do_not_overflow(tmp_path):
+    # Per-trial dicts and touch coordinates are distinct on nearly every event; only event names are tabled
+    path = str(tmp_path / "long.nc4b")
+    count = 70000
+    writer = BinaryEventLogWriter(path)
+    for i in range(count):
+        writer.append({"t_ns": i, "event": "Touch", "data": {"x": i, "trial": i // 10}})
+        writer.append({"t_ns": i, "event": "Label", "data": f"label {i}"})
+    writer.close()
+
+    with BinaryEventLogReader(path) as reader:
+        events = reader.read()
+        assert len(events) == 2 * count
+        assert reader.strings == ["Touch", "Label"]
+        assert reader.payload(events[-2]) == {"x": count - 1, "trial": (count - 1) // 10}
+        assert reader.payload(events[-1]) == f"label {count - 1}"
+
+def test_too_many_event_names_raises(tmp_path):
+    writer = BinaryEventLogWriter(str(tmp_path / "names.nc4b"))
+    with pytest.raises(OverflowError):
+        for i in range(0x10001):
+            writer.append({"t_ns": i, "event": f"Event{i}", "data": None})
+    writer.close()
+
+def test_convert_json_lines(tmp_path):
+    json_path = tmp_path / "session_data.json"
+    json_path.write_text("\n".join(json.dumps(r) for r in [{"header": {"trainer": "PRL"}}] + EVENTS) + "\n")
+    header, rows = read_back(convert_json_to_binary(str(json_path)))
+    assert header == {"trainer": "PRL"}
+    assert [data for _, _, data, _ in rows] == [r["data"] for r in EVENTS]
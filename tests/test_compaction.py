@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analysis.Compaction import compact, query_partitions, PartitionReader
+
+def write_session(directory, name, events):
+    path = directory / name
+    header = {"header": {"chamber": "Chamber0", "trainer": "PRL", "rodent": name.split("_")[-2]}}
+    path.write_text("\n".join(json.dumps(r) for r in [header] + events) + "\n")
+    return str(path)
+
+def session_events(n):
+    return [{"t_ns": i * 1000, "event": "StartTrial" if i % 5 == 0 else "Touch",
+             "data": i // 5 + 1 if i % 5 == 0 else {"x": i, "y": -i}} for i in range(n)]
+
+def payloads(reader, session):
+    return [(int(row["t_ns"]), reader.strings[row["code"]], reader.payload(row), int(row["trial"]))
+            for row in reader.read_session(session)]
+
+def expected(events):
+    trial = -1
+    rows = []
+    for r in events:
+        if r["event"] == "StartTrial":
+            trial = r["data"]
+        rows.append((r["t_ns"], r["event"], r["data"], trial))
+    return rows
+
+def test_partition_round_trip(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    first = session_events(12) + [{"t_ns": 20000, "event": "Label", "data": "größe ✓"},
+                                  {"t_ns": 21000, "event": "Flag", "data": True},
+                                  {"t_ns": 22000, "event": "Big", "data": 1 << 70},
+                                  {"t_ns": 23000, "event": "Duration", "data": 1.5},
+                                  {"t_ns": 24000, "event": "EndTraining", "data": None}]
+    write_session(data, "2026-01-05_10-00-00_Chamber0_PRL_R1_data.json", first)
+    assert compact(str(data), before_month="2026-02", min_age=0)["sessions"] == 1
+
+    # A later run appends to the month's partition and skips what is already in it
+    second = session_events(7)
+    write_session(data, "2026-01-20_10-00-00_Chamber0_PRL_R2_data.json", second)
+    stats = compact(str(data), before_month="2026-02", min_age=0)
+    assert (stats["sessions"], stats["skipped"]) == (1, 1)
+
+    with PartitionReader(str(data / "partitions" / "2026-01" / "Chamber0.nc4p")) as reader:
+        sessions = reader.sessions()
+        assert [(s["rodent"], s["trainer"], s["date"], s["rows"]) for s in sessions] == \
+            [("R1", "PRL", "2026-01-05", len(first)), ("R2", "PRL", "2026-01-20", len(second))]
+        assert payloads(reader, sessions[0]) == expected(first)
+        assert payloads(reader, sessions[1]) == expected(second)
+        assert reader.sessions(rodent="R2", start_date="2026-01-10") == sessions[1:]
+
+    assert [s["rodent"] for s, _ in query_partitions(str(data / "partitions"), rodent="R2")] == ["R2"]
+    assert list(query_partitions(str(data / "partitions"), chamber="Chamber1")) == []
+
+def test_bad_session_is_skipped(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    good = write_session(data, "2026-01-05_10-00-00_Chamber0_PRL_R1_data.json", session_events(20))
+    bad = write_session(data, "2026-01-06_10-00-00_Chamber0_PRL_R2_data.json",
+                        [{"t_ns": "not a time", "event": "StartTrial", "data": 1}])
+    later = write_session(data, "2026-02-03_10-00-00_Chamber0_PRL_R1_data.json", session_events(10))
+
+    stats = compact(str(data), before_month="2026-03", min_age=0, archive=True)
+    assert (stats["sessions"], stats["failed"], stats["partitions"]) == (2, 1, 2)
+    assert os.path.exists(bad)  # left in place, not archived
+    assert not os.path.exists(good) and not os.path.exists(later)
+    assert not any(name.endswith(".tmp") for _, _, names in os.walk(data) for name in names)
+
+    with PartitionReader(str(data / "partitions" / "2026-01" / "Chamber0.nc4p")) as reader:
+        assert [s["source"] for s in reader.footer["sessions"]] == [os.path.basename(good)]
+    assert [s["source"] for s, _ in query_partitions(str(data / "partitions"))] == \
+        [os.path.basename(good), os.path.basename(later)]
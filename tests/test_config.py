@@ -0,0 +1,50 @@
+import os
+import stat
+
+import pytest
+
+pytest.importorskip("yaml")
+
+import Config as config_module
+from Config import Config
+
+def test_save_keeps_file_mode(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("a: 1\n")
+    os.chmod(path, 0o644)
+
+    config = Config(config_file=str(path), save_delay=0)
+    config["a"] = 2
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert config.file_values == {"a": 2}
+
+def test_failed_save_is_retried(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    path.write_text("a: 1\n")
+    config = Config(config_file=str(path), save_delay=0)
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(config_module.os, "replace", fail)
+    config["a"] = 2
+    assert config.dirty and config.save_timer is not None
+    assert config.file_values == {"a": 1}  # The file still holds the old value
+    assert path.read_text() == "a: 1\n"
+
+    monkeypatch.undo()
+    config.flush()
+    assert not config.dirty and config.save_timer is None
+    assert config.file_values == {"a": 2}
+    assert "a: 2" in path.read_text()
+
+def test_new_file_gets_umask_mode(tmp_path):
+    path = tmp_path / "config.yaml"
+    umask = os.umask(0o027)
+    config_module._new_file_mode = None  # read again, with this umask
+    try:
+        config = Config(config_file=str(path), save_delay=0)
+        config["a"] = 1
+    finally:
+        os.umask(umask)
+        config_module._new_file_mode = None
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
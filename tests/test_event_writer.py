@@ -0,0 +1,87 @@
+import csv
+import json
+import time
+
+from EventWriter import EventWriter, CsvRowWriter
+
+class FlakyFile:
+    """Wraps the writer's file: writes part of the data, then fails while `down` is set."""
+    def __init__(self, file):
+        self.file = file
+        self.down = False
+        self.partial = None  # bytes the next write gets through before failing
+
+    def write(self, data):
+        if self.partial is not None:
+            written, self.partial = self.file.write(data[:self.partial]), None
+            return written
+        if self.down:
+            raise OSError("share is down")
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+RECORDS = [{"t_ns": i, "event": "Touch", "data": {"x": i, "label": "größe"}} for i in range(10)]
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_json_lines_drained_on_stop(tmp_path):
+    path = str(tmp_path / "session_data.json")
+    writer = EventWriter(path, batch_size=3, flush_interval=10)
+    writer.start()
+    for record in RECORDS:
+        writer.write(record)
+    writer.stop()  # long before flush_interval: stop() drains what is queued
+
+    assert not writer.is_open
+    assert read_lines(path) == RECORDS
+    assert writer.get_metrics()["events_written"] == len(RECORDS)
+
+def test_failed_write_is_retried_without_duplicates(tmp_path):
+    path = str(tmp_path / "session_data.json")
+    writer = EventWriter(path, flush_interval=0.01)
+    writer.start()
+    flaky = writer.file = FlakyFile(writer.file)
+
+    flaky.partial = 7  # part of the first line reaches the file, then the share goes down
+    flaky.down = True
+    for record in RECORDS[:5]:
+        writer.write(record)
+    deadline = time.monotonic() + 5
+    while writer.write_errors == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    flaky.down = False
+    for record in RECORDS[5:]:
+        writer.write(record)
+    writer.stop()
+
+    assert writer.write_errors >= 1
+    assert read_lines(path) == RECORDS
+
+def test_pending_lost_if_share_still_down_at_stop(tmp_path, caplog):
+    path = str(tmp_path / "session_data.json")
+    writer = EventWriter(path, flush_interval=0.01, stop_retry=0.05)
+    writer.start()
+    writer.file = FlakyFile(writer.file)
+    writer.file.down = True
+    writer.write(RECORDS[0])
+    writer.stop()
+
+    assert not writer.is_open
+    assert writer.pending == (json.dumps(RECORDS[0]) + "\n").encode("utf-8")
+    assert "could not be written" in caplog.text
+    assert read_lines(path) == []
+
+def test_csv_rows(tmp_path):
+    path = str(tmp_path / "session_trials.csv")
+    writer = CsvRowWriter(path, ["trial", "correct"])
+    writer.start()
+    writer.write({"trial": 1, "correct": True, "ignored": 0})
+    writer.write({"trial": 2, "correct": False})
+    writer.stop()
+
+    with open(path, newline="") as f:
+        assert list(csv.DictReader(f)) == [{"trial": "1", "correct": "True"}, {"trial": "2", "correct": "False"}]
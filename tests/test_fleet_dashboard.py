@@ -0,0 +1,26 @@
+import io
+import json
+
+import FleetDashboard
+from FleetDashboard import ChamberLink, STALL_ALARM
+
+def feed(link, monkeypatch, changes, version):
+    body = json.dumps({"epoch": "e1", "version": version, "chamber": "Chamber0", "changes": changes}).encode()
+    monkeypatch.setattr(FleetDashboard.urllib.request, "urlopen", lambda url, timeout: io.BytesIO(body))
+    link.poll()
+
+def stalled(link):
+    now = link.trial_changed + STALL_ALARM + 1
+    link.last_seen = now  # still online
+    return [alarm for alarm in link.alarms(now) if alarm.startswith("no new trial")]
+
+def test_stall_alarm_only_while_a_session_runs(monkeypatch):
+    link = ChamberLink("chamber0")
+    feed(link, monkeypatch, {"trainer_state": "IDLE", "session_running": False, "trial": 0}, 1)
+    assert stalled(link) == []  # loaded but idle
+
+    feed(link, monkeypatch, {"trainer_state": "START_TRAINING", "session_running": True}, 2)
+    assert len(stalled(link)) == 1  # running, with no new trial since the session started
+
+    feed(link, monkeypatch, {"trainer_state": "END_TRAINING", "session_running": False}, 3)
+    assert stalled(link) == []  # finished
@@ -0,0 +1,22 @@
+from HardwareEvents import ChangeLog, drain_all
+
+def test_changes_keep_their_own_t_ns():
+    led, m0 = ChangeLog("reward_led"), ChangeLog("M0_0")
+    assert led.record("on", t_ns=10) == 10
+    m0.record("<- TOUCH", t_ns=15)
+    led.record("off", t_ns=20)
+    m0.record("<- TOUCH", t_ns=25)
+
+    assert drain_all([led, m0]) == [
+        {"t_ns": 10, "device": "reward_led", "state": "on"},
+        {"t_ns": 15, "device": "M0_0", "state": "<- TOUCH"},
+        {"t_ns": 20, "device": "reward_led", "state": "off"},
+        {"t_ns": 25, "device": "M0_0", "state": "<- TOUCH"},
+    ]
+    assert drain_all([led, m0]) == []
+
+def test_capacity_drops_oldest():
+    log = ChangeLog("buzzer", capacity=2)
+    for t_ns in range(3):
+        log.record("on", t_ns=t_ns)
+    assert [t_ns for t_ns, _ in log.drain()] == [1, 2]
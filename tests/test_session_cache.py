@@ -0,0 +1,85 @@
+import json
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analysis.SessionCache import SessionCache, STALE_TMP_AGE
+
+def write_session(path, trials=3):
+    records = [{"header": {"trainer": "PRL", "rodent": "R1"}}]
+    for trial in range(1, trials + 1):
+        records += [{"t_ns": trial * 10**9, "event": "StartTrial", "data": trial},
+                    {"t_ns": trial * 10**9 + 5, "event": "TrialData", "data": {"outcome": "correct", "trial": trial}}]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    return str(path)
+
+def npz_files(cache):
+    return sorted(name for name in os.listdir(cache.cache_dir) if name.endswith(".npz"))
+
+def test_hit_returns_the_parsed_session(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache"))
+    path = write_session(tmp_path / "a_data.json")
+
+    records, payloads, header = cache.get_events(path, ("TrialData",))
+    cached = cache.get_events(path, ("TrialData",))
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached[0].dtype == records.dtype and cached[0].tobytes() == records.tobytes()  # NaN values included
+    assert cached[1] == payloads == {1: {"outcome": "correct", "trial": 1}, 3: {"outcome": "correct", "trial": 2},
+                                     5: {"outcome": "correct", "trial": 3}}
+    assert cached[2] == header == {"trainer": "PRL", "rodent": "R1"}
+
+    # Other payload events are another entry
+    cache.get_events(path, ())
+    assert cache.misses == 2
+
+def test_changed_source_misses_and_replaces_its_entry(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache"))
+    path = write_session(tmp_path / "a_data.json")
+    cache.get_events(path)
+    old_entries = npz_files(cache)
+
+    write_session(tmp_path / "a_data.json", trials=5)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    records, _, _ = cache.get_events(path)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert len(records) == 10
+    assert len(npz_files(cache)) == 1 and npz_files(cache) != old_entries
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache"))
+    paths = [write_session(tmp_path / f"{name}_data.json") for name in "abc"]
+    for path in paths:
+        cache.get_events(path)
+    entries = {path: cache._entry_path(path, ())[1] for path in paths}
+    for age, path in zip((30, 20, 10), paths):  # a is the least recently used
+        os.utime(entries[path], ns=(time.time_ns() - age * 10**9,) * 2)
+    cache.get_events(paths[0])  # a hit makes it the most recently used
+
+    cache.max_bytes = cache.size_bytes() - 1
+    cache.evict()
+    assert os.path.exists(entries[paths[0]]) and os.path.exists(entries[paths[2]])
+    assert not os.path.exists(entries[paths[1]])
+
+def test_leftover_temporary_files(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache"))
+    cache.get_events(write_session(tmp_path / "a_data.json"))
+    entry_bytes = cache.size_bytes()
+    stale = os.path.join(cache.cache_dir, "tmpstale.tmp")
+    in_progress = os.path.join(cache.cache_dir, "tmpnew.tmp")
+    for path in stale, in_progress:
+        with open(path, "wb") as f:
+            f.write(b"\0" * 1000)
+    old = time.time_ns() - (STALE_TMP_AGE + 60) * 10**9
+    os.utime(stale, ns=(old, old))
+
+    # The interrupted write's file is removed; the one in progress counts towards the limit but is kept
+    assert cache.size_bytes() == entry_bytes + 1000
+    assert not os.path.exists(stale)
+    cache.max_bytes = 0
+    cache.evict()
+    assert os.path.exists(in_progress)
+    assert npz_files(cache) == []
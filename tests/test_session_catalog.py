@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from analysis.SessionCatalog import SessionCatalog
+
+def write_session(directory, name, trials=3):
+    path = directory / name
+    records = [{"header": {"chamber": "Chamber0", "rodent": "R1"}}, {"t_ns": 0, "event": "StartTraining", "data": None}]
+    for trial in range(1, trials + 1):
+        records += [{"t_ns": trial * 10**9, "event": "StartTrial", "data": trial},
+                    {"t_ns": trial * 10**9 + 5, "event": "CorrectTouch" if trial % 2 else "IncorrectTouch", "data": None}]
+    records.append({"t_ns": 10 * 10**9, "event": "EndTraining", "data": None})
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    return str(path)
+
+@pytest.fixture
+def catalog(tmp_path):
+    with SessionCatalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        yield catalog
+
+def paths(catalog):
+    return sorted(row["path"] for row in catalog.sessions(limit=100))
+
+def test_scan_is_incremental(tmp_path, catalog):
+    data = tmp_path / "data"
+    data.mkdir()
+    path = write_session(data, "2026-01-05_10-00-00_Chamber0_PRL_R1_data.json")
+
+    assert catalog.scan([str(data)])["added"] == 1
+    assert catalog.scan([str(data)])["unchanged"] == 1
+    row = catalog.sessions()[0]
+    assert (row["path"], row["trainer"], row["num_trials"], row["correct"], row["incorrect"]) == (path, "PRL", 3, 2, 1)
+    assert row["accuracy"] == pytest.approx(2 / 3)
+    assert row["completed"] == 1
+
+    os.remove(path)
+    assert catalog.scan([str(data)])["removed"] == 1
+    assert paths(catalog) == []
+
+def test_scan_keeps_rows_of_other_directories(tmp_path, catalog):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    in_a = write_session(a, "2026-01-05_10-00-00_Chamber0_PRL_R1_data.json")
+    in_b = write_session(b, "2026-01-06_10-00-00_Chamber1_PRL_R2_data.json")
+    catalog.scan([str(a)])
+    stats = catalog.scan([str(b)])
+    assert stats["removed"] == 0
+    assert paths(catalog) == sorted([in_a, in_b])
+
+    # A directory that is not there (e.g. an unmounted share) removes nothing either
+    catalog.scan([str(tmp_path / "missing")])
+    assert paths(catalog) == sorted([in_a, in_b])
+
+def test_archived_sessions_stay_listed(tmp_path, catalog):
+    pytest.importorskip("numpy")
+    from analysis.Compaction import compact
+
+    data = tmp_path / "data"
+    data.mkdir()
+    path = write_session(data, "2026-01-05_10-00-00_Chamber0_PRL_R1_data.json")
+    log = data / "20260105_100000_Chamber0_session_log.log"
+    log.write_text("session log\n")
+    catalog.scan([str(data)])
+    assert len(catalog.logs()) == 1
+
+    stats = compact(str(data), before_month="2026-02", min_age=0, archive=True)
+    assert stats["archived"] == 2
+    assert not os.path.exists(path) and not log.exists()
+
+    assert catalog.scan([str(data)])["removed"] == 0
+    assert paths(catalog) == [path]
+    assert len(catalog.logs()) == 1
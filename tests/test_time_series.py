@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from TimeSeriesStore import TimeSeriesStore
+
+LEVELS = ((1, 60), (10, 30))
+T0 = 1_700_000_000  # a multiple of 10, so slots start on round numbers
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "series"), levels=LEVELS)
+    yield store
+    store.close()
+
+def test_record_and_query(store):
+    for i, value in enumerate([1.0, 3.0, 2.0, 6.0]):
+        store.record("cpu", value, T0 + i * 0.5)  # two values per second
+    store.record("cpu", 10.0, T0 + 15)
+
+    assert store.query("cpu", T0, T0 + 2, level=0) == [(T0, 1.0, 2.0, 3.0), (T0 + 1, 2.0, 4.0, 6.0)]
+    assert store.query("cpu", T0, T0 + 20, level=1) == [(T0, 1.0, 3.0, 6.0), (T0 + 10, 10.0, 10.0, 10.0)]
+    assert store.query("cpu", T0 + 5, T0 + 20, level=0) == [(T0 + 15, 10.0, 10.0, 10.0)]
+    assert store.names() == ["cpu"]
+
+def test_level_for_range(store):
+    series = store.get("cpu")
+    assert series.level_for(T0, T0 + 60) == 0
+    assert series.level_for(T0, T0 + 120) == 1
+    assert series.level_for(T0, T0 + 10**6) == 1
+
+def test_ring_drops_old_slots(store):
+    store.record("cpu", 1.0, T0)
+    store.record("cpu", 2.0, T0 + 60)  # same slot of the 60-slot ring, a minute later
+    assert store.query("cpu", T0 - 1, T0 + 60, level=0) == [(T0 + 60, 2.0, 2.0, 2.0)]
+
+def test_reopened_store_resumes(tmp_path):
+    directory = str(tmp_path / "series")
+    store = TimeSeriesStore(directory, levels=LEVELS)
+    store.record("temp", 4.0, T0)
+    store.close()
+
+    store = TimeSeriesStore(directory, levels=LEVELS)
+    assert store.names() == ["temp"]
+    store.record("temp", 8.0, T0 + 0.5)
+    assert store.query("temp", T0, T0 + 1, level=0) == [(T0, 4.0, 6.0, 8.0)]
+    store.close()
+
+    # A different layout starts the file over
+    store = TimeSeriesStore(directory, levels=((1, 30),))
+    assert store.query("temp", T0, T0 + 1, level=0) == []
+    store.close()
+
+def test_query_unknown_series(store):
+    assert store.query("missing", T0, T0 + 10) == []
+    assert store.names() == []
+    assert os.listdir(store.directory) == []
@@ -0,0 +1,31 @@
+import threading
+
+from Tracing import Tracer
+
+def run(tracer, name, barrier=None):
+    def body():
+        with tracer.span("work", "test"):
+            if barrier is not None:
+                barrier.wait()  # both spans are open at once
+    thread = threading.Thread(target=body, name=name)
+    thread.start()
+    return thread
+
+def span_tids(tracer):
+    return sorted(event["tid"] for event in tracer.events() if event["ph"] == "X")
+
+def test_concurrent_threads_of_a_group_get_separate_tracks():
+    tracer = Tracer()
+    barrier = threading.Barrier(2)
+    threads = [run(tracer, f"Thread-{i}", barrier) for i in (3, 4)]
+    [thread.join() for thread in threads]
+    first, second = span_tids(tracer)
+    assert first != second  # the spans overlap in time, so they must not share a tid
+    assert sorted(tracer.tracks) == ["Thread", "Thread (2)"]
+
+def test_sequential_timer_threads_share_a_track():
+    tracer = Tracer()
+    for i in range(3):
+        run(tracer, f"Thread-{i}").join()
+    assert list(tracer.tracks) == ["Thread"]
+    assert len(set(span_tids(tracer))) == 1
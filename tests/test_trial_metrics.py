@@ -0,0 +1,138 @@
+import csv
+import json
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analysis.Export import export_session
+from analysis.TrialMetrics import analyze_session, trainer_events, TRIAL_DTYPE
+from analysis.TrialReducer import TrialReducer, TRIAL_FIELDS
+
+S = 1000000000
+
+def write_session(path, trainer, events):
+    with open(path, "w") as f:
+        f.write(json.dumps({"header": {"trainer": trainer, "rodent": "R1"}}) + "\n")
+        for t, event, data in events:
+            f.write(json.dumps({"t_ns": 5 * S + int(t * S), "event": event, "data": data}) + "\n")
+
+def csv_rows(path):
+    def value(name, text):
+        kind = dict(TRIAL_DTYPE)[name]
+        if kind == "?":
+            return text == "True"
+        if kind.startswith("<U"):
+            return text
+        return float(text) if text else math.nan
+
+    with open(path, newline="") as f:
+        return [tuple(value(name, row[name]) for name, _ in TRIAL_DTYPE) for row in csv.DictReader(f)]
+
+def table_rows(table):
+    return [tuple(float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v for v in row)
+            for row in table.tolist()]
+
+def assert_rows_equal(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        for u, v in zip(x, y):
+            assert u == v or (isinstance(u, float) and math.isnan(u) and math.isnan(v)) or u == pytest.approx(v)
+
+SESSION = [
+    (0.0, "StartTraining", None),
+    (0.5, "CorrectTouch", None),  # before the first trial: ignored
+    (1.0, "StartTrial", 1),
+    (1.2, "LeftScreenTouched", None),
+    (1.5, "CorrectTouch ", None),
+    (1.6, "DeliverRewardStart", None),
+    (2.0, "BeamBreakDuringReward", None),
+    (2.5, "EndTrial", None),
+    (2.7, "IncorrectTouch", None),  # after EndTrial: not part of any trial
+    (2.8, "BeamBreakDuringITI", None),
+    (3.0, "StartTrial", 2),
+    (3.4, "RightScreenTouched", None),
+    (3.5, "IncorrectTouch", None),
+    (3.6, "PunishStart", None),
+    (4.0, "EndTrial", None),
+    (5.0, "StartTrial", 2),  # correction trial
+    (5.1, "BeamBreakDuringITI", None),
+    (5.2, "BeamBreakDuringITI", None),
+    (6.0, "TouchTimeout ", None),
+    (6.1, "TrialData", {"outcome": "incorrect", "corrections": 3, "rt": 0.75}),
+    (7.0, "StartTrial", 3),  # no EndTrial: ends at the session's last event
+    (7.5, "CorrectTouch", None),
+    (8.0, "StopTraining", None),
+]
+
+@pytest.mark.parametrize("trainer", ["Simple_Discrimination", "Complex_Discrimination", "Habituation"])
+def test_trial_table_agrees_with_export(tmp_path, trainer):
+    data_path = str(tmp_path / "session_data.json")
+    write_session(data_path, trainer, SESSION)
+
+    table = analyze_session(data_path)["trials"]
+    exported = csv_rows(export_session(data_path))
+    assert len(table) == 4
+    assert_rows_equal(table_rows(table), exported)
+
+def test_trial_table_rows(tmp_path):
+    data_path = str(tmp_path / "session_data.json")
+    write_session(data_path, "Simple_Discrimination", SESSION)
+    table = analyze_session(data_path)["trials"]
+
+    assert table["trial"].tolist() == [1, 2, 2, 3]
+    assert table["start_s"].tolist() == pytest.approx([1.0, 3.0, 5.0, 7.0])
+    assert table["end_s"].tolist() == pytest.approx([2.5, 4.0, 7.0, 8.0])
+    assert table["correct"].tolist() == [True, False, False, True]
+    assert table["incorrect"].tolist() == [False, True, True, False]  # trial 1 ignores the touch after EndTrial
+    assert table["omission"].tolist() == [False, False, False, False]  # TrialData outcome overrides the timeout
+    assert table["corrections"].tolist() == [0, 0, 3, 0]
+    assert table["iti_extensions"].tolist() == [0, 0, 2, 0]
+    assert table["side"].tolist() == ["LEFT", "RIGHT", "", ""]
+    assert table["reward_latency_s"][0] == pytest.approx(0.4)
+    assert table["response_latency_s"][2] == pytest.approx(0.75)
+
+def random_session(rng, trainer):
+    names = sorted({name for names in trainer_events(trainer).values() for name in names} | {"Other"})
+    events, t, number = [], 0.0, 1
+    for _ in range(rng.randrange(1, 200)):
+        t += rng.random()
+        event = rng.choice(names)
+        data = None
+        if event in ("StartTrial", "TrialInitiationReady"):
+            number += rng.random() < 0.7  # repeated numbers are correction trials
+            data = number if rng.random() < 0.9 else None
+        elif event == "TrialData":
+            data = {"outcome": rng.choice(["correct", "incorrect", "timeout"]), "corrections": rng.randrange(3),
+                    "rt": rng.random()}
+        events.append((t, event, data))
+    return events
+
+@pytest.mark.parametrize("trainer", ["Simple_Discrimination", "Complex_Discrimination", "Habituation", "MustInitiate"])
+def test_trial_table_matches_reducer(tmp_path, trainer):
+    # The vectorized table and the record-at-a-time reducer implement the same trial rules
+    rng = random.Random(trainer)
+    for n in range(50):
+        events = random_session(rng, trainer)
+        data_path = str(tmp_path / f"session_{n}_data.json")
+        write_session(data_path, trainer, events)
+
+        reducer = TrialReducer(trainer)
+        rows = [reducer.add({"t_ns": 5 * S + int(t * S), "event": event, "data": data}) for t, event, data in events]
+        rows = [row for row in rows + [reducer.finish()] if row is not None]
+        expected = [tuple(math.nan if row[name] is None else row[name] for name in TRIAL_FIELDS) for row in rows]
+        assert_rows_equal(table_rows(analyze_session(data_path)["trials"]), expected)
+
+def test_annotations_stay_with_their_trial():
+    # Images are shown after StartTrial; trial 1 only completes at the next StartTrial, after the next images load
+    reducer = TrialReducer("Simple_Discrimination")
+    reducer.annotate(left_image="ignored")  # between trials
+    reducer.add({"t_ns": 0, "event": "StartTrial", "data": 1})
+    reducer.annotate(left_image="A01", right_image="B01")
+    row = reducer.add({"t_ns": S, "event": "StartTrial", "data": 2})
+    reducer.annotate(left_image="A02", right_image="B02")
+    assert (row["left_image"], row["right_image"]) == ("A01", "B01")
+    row = reducer.finish()
+    assert (row["left_image"], row["right_image"]) == ("A02", "B02")